@@ -0,0 +1,169 @@
+import queue
+import threading
+import uuid
+
+# 可订阅的余票列（与 CSV 字段一致）
+SEAT_COLUMNS = [
+    "business_class", "special_class", "first_class", "second_class",
+    "soft_sleeper", "hard_sleeper", "hard_seat", "no_seat"
+]
+
+# 每条规则最多缓存的未消费事件数，没有 SSE 连接时丢弃最旧的
+MAX_PENDING_EVENTS = 100
+
+
+def is_available(value):
+    """'有' or a positive count means tickets are on sale."""
+    if value is None:
+        return False
+    value = str(value).strip()
+    if not value or value in ("无", "*", "--", "nan"):
+        return False
+    if value.isdigit():
+        return int(value) > 0
+    return True
+
+
+class AlertRule:
+    """
+    One subscription. route is the crawler task key
+    (departure, destination, date, is_student, is_high_speed, strict_mode),
+    so crawlers of the same route with different options keep separate state.
+    """
+
+    def __init__(self, route, seat_classes, train_prefix="", depart_after=None, depart_before=None):
+        self.id = uuid.uuid4().hex
+        self.route = tuple(route)
+        self.seat_classes = list(seat_classes) or list(SEAT_COLUMNS)
+        self.train_prefix = train_prefix or ""
+        self.depart_after = depart_after
+        self.depart_before = depart_before
+        # 命中事件队列，由 SSE 连接消费
+        self.events = queue.Queue(maxsize=MAX_PENDING_EVENTS)
+
+        for seat in self.seat_classes:
+            if seat not in SEAT_COLUMNS:
+                raise ValueError(f"Unknown seat class: {seat}")
+
+    def push(self, event):
+        """Queue an event, dropping the oldest one when nobody has been consuming."""
+        while True:
+            try:
+                self.events.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.events.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def match_time(self, depart_time):
+        # "HH:MM" 为定长字符串（AlertRuleData 已补齐前导零），可直接按字典序比较
+        if self.depart_after and (not depart_time or depart_time < self.depart_after):
+            return False
+        if self.depart_before and (not depart_time or depart_time > self.depart_before):
+            return False
+        return True
+
+
+class AlertEngine:
+    """
+    Seat-availability alert rules indexed by route -> seat column -> train prefix.
+
+    Each poll result is diffed against the previous one for the same route, and
+    only cells that turned available are looked up in the index, so the cost of
+    a poll scales with the number of changes rather than rules x trains.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rules = {}
+        # route -> seat -> prefix -> {rule_id: rule}
+        self.index = {}
+        # route -> train_code -> set(available seat columns)
+        self.last_state = {}
+
+    def add_rule(self, rule):
+        with self.lock:
+            self.rules[rule.id] = rule
+            by_seat = self.index.setdefault(rule.route, {})
+            for seat in rule.seat_classes:
+                by_seat.setdefault(seat, {}).setdefault(rule.train_prefix, {})[rule.id] = rule
+
+            # 新规则先对当前快照评估一次
+            for train_code, (depart_time, seats) in self.last_state.get(rule.route, {}).items():
+                for seat in seats:
+                    if seat in rule.seat_classes and train_code.startswith(rule.train_prefix) and rule.match_time(depart_time):
+                        rule.push(self._event(train_code, depart_time, seat))
+        return rule
+
+    def remove_rule(self, rule_id):
+        with self.lock:
+            rule = self.rules.pop(rule_id, None)
+            if rule is None:
+                return False
+            by_seat = self.index.get(rule.route, {})
+            for seat in rule.seat_classes:
+                by_prefix = by_seat.get(seat, {})
+                by_prefix.get(rule.train_prefix, {}).pop(rule.id, None)
+                if not by_prefix.get(rule.train_prefix):
+                    by_prefix.pop(rule.train_prefix, None)
+                if not by_prefix:
+                    by_seat.pop(seat, None)
+            if not by_seat:
+                self.index.pop(rule.route, None)
+            return True
+
+    def get_rule(self, rule_id):
+        return self.rules.get(rule_id)
+
+    def on_poll(self, route, rows):
+        """
+        Evaluate one poll result (CSV-shaped rows) for a crawler task key.
+
+        A __NO_DATA__ poll leaves the previous state untouched, so trains that
+        reappear after it do not re-fire. Failed queries never reach here (see
+        TicketCrawler.query). Returns the number of events pushed.
+        """
+        new_state = {}
+        for row in rows:
+            train_code = row.get("train_code")
+            if not train_code or train_code == "__NO_DATA__":
+                continue
+            seats = {seat for seat in SEAT_COLUMNS if is_available(row.get(seat))}
+            new_state[train_code] = (row.get("depart_time"), seats)
+
+        if not new_state:
+            # 空结果多为上游瞬时异常，与上一次状态比较会在恢复后把所有有票车次重新报一遍
+            return 0
+
+        with self.lock:
+            old_state = self.last_state.get(route, {})
+            self.last_state[route] = new_state
+
+            by_seat = self.index.get(route)
+            if not by_seat:
+                return 0
+
+            pushed = 0
+            for train_code, (depart_time, seats) in new_state.items():
+                old_seats = old_state.get(train_code, (None, set()))[1]
+                for seat in seats - old_seats:
+                    by_prefix = by_seat.get(seat)
+                    if not by_prefix:
+                        continue
+                    # 只检查 train_code 的各个前缀，而不是遍历全部规则
+                    for i in range(len(train_code) + 1):
+                        for rule in by_prefix.get(train_code[:i], {}).values():
+                            if rule.match_time(depart_time):
+                                rule.push(self._event(train_code, depart_time, seat))
+                                pushed += 1
+            return pushed
+
+    @staticmethod
+    def _event(train_code, depart_time, seat):
+        return {"train_code": train_code, "depart_time": depart_time, "seat": seat}
+
+
+# Global instance
+alert_engine = AlertEngine()
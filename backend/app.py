@@ -6,9 +6,20 @@ import os
 import threading
 from flask_cors import CORS
 from operator import itemgetter
-from utils.data import AskData
-from crawler.ticket_crawler import TicketCrawler, start_polling_storage
+from queue import Empty
+from utils.data import AskData, AskRangeData, AlertRuleData
+from crawler.ticket_crawler import TicketCrawler, start_polling_storage, start_polling_range_storage, csv_path, CSV_FIELDNAMES, CSV_DTYPES, MIN_REQUEST_GAP
 from utils.constant import RESOURCE_DIR
+from utils.sse import SSEEncoder, gzip_stream, negotiate
+from utils.snapshot import snapshot_store
+from alert.alert_engine import AlertRule, alert_engine
+from station_id_normalization.station_refresh import refresh_stations
+from station_id_normalization.fetch_staton_name import StationFetchError
+from coordination.lease_store import create_lease_store
+from crawler.segment_search import SegmentSearcher, RateLimiter, SEAT_NAMES
+from crawler.itinerary_search import ItinerarySearcher
+from coordination.coordinated_polling import start_coordinated_polling, start_coordinated_range_polling, default_node_id
+from utils.log import get_logger, route_extra
 
 app = Flask(__name__)
 CORS(app, resources={
@@ -16,15 +27,30 @@ CORS(app, resources={
         "origins": ["http://localhost:5173", "http://127.0.0.1:5173", "http://localhost:3000"],
         "methods": ["GET", "POST", "OPTIONS"],
         "allow_headers": ["Content-Type", "Accept", "Cache-Control"],
-        "expose_headers": ["Content-Type"],
+        "expose_headers": ["Content-Type", "ETag", "Last-Modified"],
         "supports_credentials": True
     }
 })
 mode = "run"
+logger = get_logger("app")
 
 
 crawler_tasks = {}
 crawler_stop_flags = {}
+# task_key -> (该任务写入 CSV / 快照的 (departure, destination, date) 集合, 是否为区间任务)
+crawler_routes = {}
+# 复用区间爬虫的单日任务：区间 task_key -> 挂在其上的单日 task_key 集合
+range_subscribers = {}
+# 由告警规则启动的爬虫：task_key -> 依赖它的规则 id，最后一条规则删除时停止
+alert_crawlers = {}
+
+# 多 worker 部署：设置 TRANSIT_COORDINATION_DB（本机文件）后，同一路线只由持有租约的进程轮询
+lease_store = create_lease_store()
+node_id = default_node_id()
+
+# 一次性查询（拆段 / 中转）共用一个爬虫会话，首次使用时创建
+shared_searchers = {}
+shared_searchers_lock = threading.Lock()
 
 def switch_mode(mode = "run"):
     if mode == "test":
@@ -37,6 +63,130 @@ def switch_mode(mode = "run"):
         return -1
 
 
+class CrawlerConflict(Exception):
+    """The requested watch would share CSV / snapshot files with another running crawler."""
+
+
+def running_overlaps(task_key, routes):
+    """(task_key, is_range) of live crawlers other than task_key writing any of `routes`."""
+    routes = set(routes)
+    return [
+        (key, is_range) for key, (other_routes, is_range) in list(crawler_routes.items())
+        if key != task_key and key in crawler_tasks and crawler_tasks[key].is_alive() and routes & other_routes
+    ]
+
+
+def ensure_crawler(task_key, target, args, kwargs=None, routes=(), is_range=False):
+    """
+    Start a crawler thread for task_key unless one is already alive.
+
+    `routes` are the (departure, destination, date) keys whose CSV and snapshot
+    the task writes. A range watch recreates every per-date file it covers, so
+    it must not overlap any other running crawler; a single-date task whose
+    date is already covered by a range watch with the same options reuses it
+    (the range crawler writes the same per-date CSV). Raises CrawlerConflict
+    otherwise.
+    """
+    for key, other_is_range in running_overlaps(task_key, routes):
+        if is_range:
+            raise CrawlerConflict(f"Dates overlap a running crawler: {key}")
+        if other_is_range:
+            # 两种任务的 key 都以 (studentTicket, highSpeed, strictmode) 结尾
+            if key[-3:] != task_key[-3:]:
+                raise CrawlerConflict(f"Route is watched by a range crawler with other options: {key}")
+            logger.info("Reusing range crawler %s for %s", key, task_key)
+            range_subscribers.setdefault(key, set()).add(task_key)
+            return False
+
+    crawler_stop_flags[task_key] = False
+    if task_key not in crawler_tasks or not crawler_tasks[task_key].is_alive():
+        logger.info("Starting crawler for %s", task_key)
+        if lease_store is not None and target in (start_polling_storage, start_polling_range_storage):
+            target = start_coordinated_polling if target is start_polling_storage else start_coordinated_range_polling
+            args = (lease_store, node_id) + args
+        t = threading.Thread(
+            target=target,
+            args=args + (lambda: crawler_stop_flags.get(task_key, False),),
+            kwargs=kwargs or {},
+            daemon=True
+        )
+        t.start()
+        crawler_tasks[task_key] = t
+        crawler_routes[task_key] = (frozenset(routes), is_range)
+        if is_range:
+            range_subscribers[task_key] = set()
+        return True
+    return False
+
+
+def detach_from_range(matches):
+    """
+    Detach the single-date tasks matching `matches(key)` from the range crawlers they reuse.
+
+    The range crawler keeps running for its own watch; returns the detached keys.
+    """
+    detached = []
+    for range_key, keys in list(range_subscribers.items()):
+        for key in [key for key in keys if matches(key)]:
+            keys.discard(key)
+            detached.append(key)
+            logger.info("Detached %s from range crawler %s", key, range_key)
+    return detached
+
+
+def adaptive_kwargs(item):
+    """Adaptive polling options for the crawler, taken from AskData / AskRangeData."""
+    return {"adaptive": item.adaptive, "min_interval": item.minAskTime, "max_interval": item.maxAskTime}
+
+
+def parse_adaptive_args(args):
+    min_ask = args.get("minAskTime")
+    max_ask = args.get("maxAskTime")
+    return {
+        "adaptive": args.get("adaptive", "true") == 'true',
+        "minAskTime": int(min_ask) if min_ask else None,
+        "maxAskTime": int(max_ask) if max_ask else None,
+    }
+
+
+def sse_response(frames, use_gzip=False):
+    """Wrap an SSE frame generator, optionally gzip-compressed with per-frame flushes."""
+    headers = {
+        'Cache-Control': 'no-cache, no-store, must-revalidate',
+        'Pragma': 'no-cache',
+        'Expires': '0',
+        'X-Accel-Buffering': 'no',
+        'Connection': 'keep-alive',
+        'Content-Type': 'text/event-stream; charset=utf-8',
+        'Vary': 'Accept-Encoding'
+    }
+    if use_gzip:
+        frames = gzip_stream(frames)
+        headers['Content-Encoding'] = 'gzip'
+    return Response(stream_with_context(frames), mimetype='text/event-stream', headers=headers)
+
+
+def get_searcher(name):
+    with shared_searchers_lock:
+        if not shared_searchers:
+            crawler = TicketCrawler()
+            # 同一会话的全部上游请求共用一个速率预算
+            limiter = RateLimiter(MIN_REQUEST_GAP)
+            shared_searchers["segment"] = SegmentSearcher(crawler, limiter=limiter)
+            shared_searchers["itinerary"] = ItinerarySearcher(crawler, limiter=limiter)
+        return shared_searchers[name]
+
+
+def frame_to_records(data):
+    """Convert CSV rows to JSON-ready dicts, mapping NaN / empty strings to None."""
+    result = data.fillna('').to_dict(orient='records')
+    for row in result:
+        for key, value in row.items():
+            if value == '' or (isinstance(value, float) and pd.isna(value)):
+                row[key] = None
+    return result
+
+
 @app.route("/api/receive", methods=["GET"])
 def push_info():
     try:
@@ -54,32 +204,28 @@ def push_info():
             highSpeed=request.args.get("highSpeed") == 'true',
             studentTicket=request.args.get("studentTicket") == 'true',
             askTime=int(request.args.get("askTime", 10)),
-            strictmode=request.args.get("strictmode") == 'true'
+            strictmode=request.args.get("strictmode") == 'true',
+            **parse_adaptive_args(request.args)
         )
+        encoding, use_gzip = negotiate(request.args, request.headers)
+        encoder = SSEEncoder(encoding, CSV_FIELDNAMES)
 
         # Start crawler if not running
         task_key = (item.departure, item.destination, item.date, item.studentTicket, item.highSpeed, item.strictmode)
         
-        # Initialize stop flag
-        crawler_stop_flags[task_key] = False
-        
-        if task_key not in crawler_tasks or not crawler_tasks[task_key].is_alive():
-             print(f"Starting crawler for {task_key} with interval {item.askTime}s")
-             t = threading.Thread(
-                 target=start_polling_storage,
-                 args=(item.departure, item.destination, item.date, item.studentTicket, item.highSpeed, item.askTime, item.strictmode, lambda: crawler_stop_flags.get(task_key, False)),
-                 daemon=True
-             )
-             t.start()
-             crawler_tasks[task_key] = t
-        else:
-             print(f"Crawler already running for {task_key}. Ignoring new askTime {item.askTime}s if different.")
+        if not ensure_crawler(task_key, start_polling_storage,
+                              (item.departure, item.destination, item.date, item.studentTicket, item.highSpeed, item.askTime, item.strictmode),
+                              adaptive_kwargs(item), routes=[(item.departure, item.destination, item.date)]):
+             logger.info("Crawler already running for %s. Ignoring new askTime %ss if different.", task_key, item.askTime)
+        # 实时订阅接管了该爬虫，删除告警时不再停止它
+        alert_crawlers.pop(task_key, None)
         
         csv_dir = RESOURCE_DIR / "csv"
         
         def generate():
             count = 1
             filename = csv_dir / f"train_data_{item.date}_{item.departure}_{item.destination}.csv"
+            route = route_extra(item.departure, item.destination, item.date)
             last_sent_count = 0
             wait_count = 0
             max_wait = 60  # Maximum wait time in seconds for file to appear
@@ -88,25 +234,51 @@ def push_info():
             while not os.path.exists(filename):
                 wait_count += 1
                 if wait_count > max_wait:
-                    yield f"data: {{\"error\": \"Timeout waiting for crawler to start\"}}\n\n"
+                    yield encoder.message({"error": "Timeout waiting for crawler to start"})
                     return
                 # Send heartbeat comment to keep connection alive
                 yield ": heartbeat\n\n"
                 time.sleep(1)
             
-            print(f"SSE: File found at {filename}")
+            logger.info("SSE: File found at %s", filename)
 
             # Initialize count to 1, we will read from the beginning
             count = 1
+            # 最近一次告知前端的实际轮询间隔
+            reported_interval = None
+            snapshot_route = (item.departure, item.destination, item.date)
                 
             while True:
+                # 快照恰好是下一次轮询时直接发送，稳态下不再读取解析 CSV；
+                # 没有快照（爬虫在其他进程且未配置共享快照）或需要补发历史时仍走 CSV
+                snapshot = snapshot_store.get(snapshot_route)
+                if snapshot and snapshot.seq == count:
+                    if snapshot.no_data:
+                        logger.debug("SSE: No trains found for count=%d, sending __NO_DATA__ marker", count, extra=route)
+                        yield encoder.message({"__NO_DATA__": True})
+                    else:
+                        records = snapshot.records()
+                        logger.debug("SSE: Sending %d records for count=%d (snapshot)", len(records), count, extra=route)
+                        yield encoder.rows(records)
+                    count += 1
+                    if snapshot.interval != reported_interval:
+                        reported_interval = snapshot.interval
+                        yield encoder.event("interval", {"interval": round(reported_interval, 2)})
+                    continue
+
+                if snapshot and snapshot.seq < count:
+                    # 还没有新的轮询结果
+                    yield ": heartbeat\n\n"
+                    snapshot_store.wait(snapshot_route, count, min(item.askTime, reported_interval or item.askTime))
+                    continue
+
                 try:
                     if not os.path.exists(filename):
                          yield ": waiting\n\n"
                          time.sleep(item.askTime)
                          continue
 
-                    df = pd.read_csv(filename)
+                    df = pd.read_csv(filename, dtype=CSV_DTYPES)
                     if "count" in df.columns and not df.empty:
                         max_count = int(df["count"].max())
                         
@@ -118,25 +290,23 @@ def push_info():
                                 # Check if this is a "no data" marker
                                 if len(data) == 1 and data.iloc[0].get('train_code') == '__NO_DATA__':
                                     # No trains found, send special marker to frontend
-                                    print(f"SSE: No trains found for count={count}, sending __NO_DATA__ marker")
-                                    yield f'data: {{"__NO_DATA__": true}}\n\n'
+                                    logger.debug("SSE: No trains found for count=%d, sending __NO_DATA__ marker", count, extra=route)
+                                    yield encoder.message({"__NO_DATA__": True})
                                     count += 1
                                     continue
                                 
                                 # Convert to dict and handle NaN - replace NaN with None for valid JSON
-                                result = data.fillna('').to_dict(orient='records')
-                                # Replace empty strings with None for cleaner JSON
-                                for row in result:
-                                    for key, value in row.items():
-                                        if value == '' or (isinstance(value, float) and pd.isna(value)):
-                                            row[key] = None
-                                
-                                json_str = json.dumps(result, ensure_ascii=False)
-                                sse_message = f"data: {json_str}\n\n"
-                                print(f"SSE: Sending {len(result)} records for count={count}")
+                                result = frame_to_records(data)
+                                sse_message = encoder.rows(result)
+                                logger.debug("SSE: Sending %d records for count=%d", len(result), count, extra=route)
                                 yield sse_message
                                 last_sent_count = count
                                 count += 1
+
+                                snapshot = snapshot_store.get(snapshot_route)
+                                if snapshot and snapshot.interval != reported_interval:
+                                    reported_interval = snapshot.interval
+                                    yield encoder.event("interval", {"interval": round(reported_interval, 2)})
                                 continue  # Check if more data is available immediately
                         
                         # No new data yet, send heartbeat
@@ -146,31 +316,23 @@ def push_info():
                         yield ": waiting for data\n\n"
                     
                 except pd.errors.EmptyDataError:
-                    print("SSE: CSV file is empty, waiting...")
+                    logger.debug("SSE: CSV file is empty, waiting...", extra=route)
                     yield ": empty file\n\n"
                 except Exception as e:
-                    print(f"SSE Error reading CSV: {e}")
+                    logger.warning("SSE Error reading CSV: %s", e, extra=route)
                     yield ": error\n\n"
                 
-                time.sleep(item.askTime)
+                # 同进程或共享快照有新轮询时立即唤醒，否则相当于原来的 sleep
+                snapshot_store.wait(snapshot_route, count, min(item.askTime, reported_interval or item.askTime))
 
-        response = Response(
-            stream_with_context(generate()), 
-            mimetype='text/event-stream',
-            headers={
-                'Cache-Control': 'no-cache, no-store, must-revalidate',
-                'Pragma': 'no-cache',
-                'Expires': '0',
-                'X-Accel-Buffering': 'no',
-                'Connection': 'keep-alive',
-                'Content-Type': 'text/event-stream; charset=utf-8'
-            }
-        )
+        response = sse_response(generate(), use_gzip)
         return response
 
+    except CrawlerConflict as e:
+        return jsonify({"status": "error", "message": str(e)}), 409
     except Exception as e:
         if switch_mode(mode) == 0:
-            print("ERROR in /api/receive:", e)
+            logger.exception("ERROR in /api/receive")
             raise
         else:
             return jsonify({"status": "error", "message": str(e)}), 400
@@ -198,25 +360,20 @@ def push_info_by_code():
 
         task_key = (item.departure, item.destination, item.date, item.studentTicket, item.highSpeed, item.strictmode)
         
-        crawler_stop_flags[task_key] = False
-        
-        if task_key not in crawler_tasks or not crawler_tasks[task_key].is_alive():
-            print(f"Starting crawler for {task_key} with interval {item.askTime}s (Train Code Mode)")
-            t = threading.Thread(
-                target=start_polling_storage,
-                args=(item.departure, item.destination, item.date, item.studentTicket, item.highSpeed, item.askTime, item.strictmode, lambda: crawler_stop_flags.get(task_key, False)),
-                daemon=True
-            )
-            t.start()
-            crawler_tasks[task_key] = t
+        if ensure_crawler(task_key, start_polling_storage,
+                          (item.departure, item.destination, item.date, item.studentTicket, item.highSpeed, item.askTime, item.strictmode),
+                          routes=[(item.departure, item.destination, item.date)]):
+            logger.info("Started crawler for %s with interval %ss (Train Code Mode)", task_key, item.askTime)
         else:
-            print(f"Crawler already running for {task_key}. Reusing for Train Code Search.")
+            logger.info("Crawler already running for %s. Reusing for Train Code Search.", task_key)
+        alert_crawlers.pop(task_key, None)
         
         csv_dir = RESOURCE_DIR / "csv"
         
         def generate():
             count = 1
             filename = csv_dir / f"train_data_{item.date}_{item.departure}_{item.destination}.csv"
+            route = route_extra(item.departure, item.destination, item.date)
             last_sent_count = 0
             wait_count = 0
             max_wait = 60
@@ -229,7 +386,7 @@ def push_info_by_code():
                 yield ": heartbeat\n\n"
                 time.sleep(1)
             
-            print(f"SSE (TrainCode): File found at {filename}")
+            logger.info("SSE (TrainCode): File found at %s", filename)
 
             count = 1
                 
@@ -240,7 +397,7 @@ def push_info_by_code():
                         time.sleep(item.askTime)
                         continue
 
-                    df = pd.read_csv(filename)
+                    df = pd.read_csv(filename, dtype=CSV_DTYPES)
                     if "count" in df.columns and not df.empty:
                         max_count = int(df["count"].max())
                         
@@ -249,7 +406,7 @@ def push_info_by_code():
                             
                             if not data.empty:
                                 if len(data) == 1 and data.iloc[0].get('train_code') == '__NO_DATA__':
-                                    print(f"SSE (TrainCode): No trains found for count={count}, sending __NO_DATA__ marker")
+                                    logger.debug("SSE (TrainCode): No trains found for count=%d, sending __NO_DATA__ marker", count, extra=route)
                                     yield f'data: {{"__NO_DATA__": true}}\n\n'
                                 else:
                                     filtered_data = data[data['train_code'] == train_code_param]
@@ -262,7 +419,7 @@ def push_info_by_code():
                                     
                                     json_str = json.dumps(result, ensure_ascii=False)
                                     sse_message = f"data: {json_str}\n\n"
-                                    print(f"SSE (TrainCode): Sending {len(result)} records for count={count} (Train Code: {train_code_param})")
+                                    logger.debug("SSE (TrainCode): Sending %d records for count=%d (Train Code: %s)", len(result), count, train_code_param, extra=route)
                                     yield sse_message
                                 
                                 count += 1
@@ -273,23 +430,330 @@ def push_info_by_code():
                         yield ": waiting for data\n\n"
                     
                 except pd.errors.EmptyDataError:
-                    print("SSE (TrainCode): CSV file is empty, waiting...")
+                    logger.debug("SSE (TrainCode): CSV file is empty, waiting...", extra=route)
                     yield ": empty file\n\n"
                 except Exception as e:
-                    print(f"SSE (TrainCode) Error reading CSV: {e}")
+                    logger.warning("SSE (TrainCode) Error reading CSV: %s", e, extra=route)
                     yield ": error\n\n"
                 
                 time.sleep(item.askTime)
 
         return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'Connection': 'keep-alive', 'Content-Type': 'text/event-stream; charset=utf-8'})
 
+    except CrawlerConflict as e:
+        return jsonify({"status": "error", "message": str(e)}), 409
     except Exception as e:
         if switch_mode(mode) == 0:
-            print("ERROR in /api/receive_by_code:", e)
+            logger.exception("ERROR in /api/receive_by_code")
             raise
         else:
             return jsonify({"status": "error", "message": str(e)}), 400
 
+@app.route("/api/receive_range", methods=["GET"])
+def push_info_range():
+    """Watch one route over a date range with one crawler and one SSE stream."""
+    try:
+        start_param = request.args.get("startDate")
+        end_param = request.args.get("endDate")
+
+        if not start_param or not end_param:
+            return jsonify({"error": "Missing params"}), 400
+
+        item = AskRangeData(
+            startDate=start_param,
+            endDate=end_param,
+            departure=request.args.get("departure"),
+            destination=request.args.get("destination"),
+            highSpeed=request.args.get("highSpeed") == 'true',
+            studentTicket=request.args.get("studentTicket") == 'true',
+            askTime=int(request.args.get("askTime", 10)),
+            strictmode=request.args.get("strictmode") == 'true',
+            **parse_adaptive_args(request.args)
+        )
+        dates = item.dates()
+        encoding, use_gzip = negotiate(request.args, request.headers)
+        encoder = SSEEncoder(encoding, CSV_FIELDNAMES)
+
+        task_key = (item.departure, item.destination, item.startDate, item.endDate, item.studentTicket, item.highSpeed, item.strictmode)
+        if not ensure_crawler(task_key, start_polling_range_storage, (item.departure, item.destination, dates, item.studentTicket, item.highSpeed, item.askTime, item.strictmode), adaptive_kwargs(item),
+                              routes=[(item.departure, item.destination, date) for date in dates], is_range=True):
+            logger.info("Range crawler already running for %s.", task_key)
+
+        def generate():
+            filenames = {date: csv_path(date, item.departure, item.destination) for date in dates}
+            # 每个日期各自维护下一条待发送的 count
+            counts = {date: 1 for date in dates}
+            wait_count = 0
+            max_wait = 60
+
+            while not any(os.path.exists(f) for f in filenames.values()):
+                wait_count += 1
+                if wait_count > max_wait:
+                    yield encoder.message({"error": "Timeout waiting for crawler to start"})
+                    return
+                yield ": heartbeat\n\n"
+                time.sleep(1)
+
+            while True:
+                sent = False
+                for date, filename in filenames.items():
+                    try:
+                        if not os.path.exists(filename):
+                            continue
+
+                        df = pd.read_csv(filename, dtype=CSV_DTYPES)
+                        if "count" not in df.columns or df.empty:
+                            continue
+
+                        max_count = int(df["count"].max())
+                        while counts[date] <= max_count:
+                            data = df[df["count"] == counts[date]]
+                            if not data.empty:
+                                if len(data) == 1 and data.iloc[0].get('train_code') == '__NO_DATA__':
+                                    payload = {"date": date, "count": counts[date], "__NO_DATA__": True}
+                                else:
+                                    payload = {"date": date, "count": counts[date], "data": encoder.table(frame_to_records(data))}
+                                snapshot = snapshot_store.get((item.departure, item.destination, date))
+                                if snapshot:
+                                    payload["interval"] = round(snapshot.interval, 2)
+                                yield encoder.message(payload)
+                                sent = True
+                            counts[date] += 1
+
+                    except pd.errors.EmptyDataError:
+                        continue
+                    except Exception as e:
+                        logger.warning("SSE (Range) Error reading CSV for %s: %s", date, e, extra=route_extra(item.departure, item.destination, date))
+                        yield ": error\n\n"
+
+                if not sent:
+                    yield ": heartbeat\n\n"
+                time.sleep(1)
+
+        return sse_response(generate(), use_gzip)
+
+    except CrawlerConflict as e:
+        return jsonify({"status": "error", "message": str(e)}), 409
+    except Exception as e:
+        if switch_mode(mode) == 0:
+            logger.exception("ERROR in /api/receive_range")
+            raise
+        else:
+            return jsonify({"status": "error", "message": str(e)}), 400
+
+@app.route("/api/stop_range", methods=["POST"])
+def stop_crawler_range():
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({"error": "Missing request body"}), 400
+
+        task_key = (
+            data.get("departure"),
+            data.get("destination"),
+            data.get("startDate"),
+            data.get("endDate"),
+            data.get("studentTicket", False),
+            data.get("highSpeed", False),
+            data.get("strictmode", False)
+        )
+
+        if task_key in crawler_stop_flags:
+            crawler_stop_flags[task_key] = True
+            range_subscribers.pop(task_key, None)
+            logger.info("Stop signal sent for range crawler: %s", task_key)
+            return jsonify({"status": "success", "message": "Stop signal sent"}), 200
+        return jsonify({"status": "warning", "message": "Crawler not found"}), 200
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+@app.route("/api/alerts", methods=["POST"])
+def create_alert():
+    """Register a server-side seat-availability alert and make sure its route is polled."""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({"error": "Missing request body"}), 400
+
+        item = AlertRuleData(**data)
+        task_key = (item.departure, item.destination, item.date, item.studentTicket, item.highSpeed, item.strictmode)
+        rule = AlertRule(
+            route=task_key,
+            seat_classes=item.seatClasses,
+            train_prefix=item.trainPrefix,
+            depart_after=item.departAfter,
+            depart_before=item.departBefore
+        )
+
+        started = ensure_crawler(task_key, start_polling_storage, (item.departure, item.destination, item.date, item.studentTicket, item.highSpeed, item.askTime, item.strictmode),
+                                 routes=[(item.departure, item.destination, item.date)])
+        alert_engine.add_rule(rule)
+        # 只接管自己启动的爬虫；已被 SSE 订阅使用的爬虫仍由前端通过 /api/stop 停止
+        if started or task_key in alert_crawlers:
+            alert_crawlers.setdefault(task_key, set()).add(rule.id)
+
+        return jsonify({"status": "success", "id": rule.id}), 200
+    except CrawlerConflict as e:
+        return jsonify({"status": "error", "message": str(e)}), 409
+    except Exception as e:
+        if switch_mode(mode) == 0:
+            raise
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+@app.route("/api/alerts/stream", methods=["GET"])
+def stream_alert():
+    """Push only the events matching one alert rule."""
+    rule = alert_engine.get_rule(request.args.get("id"))
+    if rule is None:
+        return jsonify({"status": "error", "message": "Alert not found"}), 404
+
+    def generate():
+        departure, destination, date = rule.route[:3]
+        while alert_engine.get_rule(rule.id) is not None:
+            try:
+                event = rule.events.get(timeout=15)
+            except Empty:
+                yield ": heartbeat\n\n"
+                continue
+            payload = dict(event, departure=departure, destination=destination, date=date)
+            yield f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no', 'Connection': 'keep-alive', 'Content-Type': 'text/event-stream; charset=utf-8'})
+
+@app.route("/api/alerts/remove", methods=["POST"])
+def remove_alert():
+    try:
+        data = request.get_json()
+        if not data or not data.get("id"):
+            return jsonify({"error": "Missing params"}), 400
+        if alert_engine.remove_rule(data["id"]):
+            for task_key, rule_ids in list(alert_crawlers.items()):
+                rule_ids.discard(data["id"])
+                if not rule_ids:
+                    del alert_crawlers[task_key]
+                    crawler_stop_flags[task_key] = True
+                    logger.info("Last alert removed, stop signal sent for crawler: %s", task_key)
+            return jsonify({"status": "success", "message": "Alert removed"}), 200
+        return jsonify({"status": "warning", "message": "Alert not found"}), 200
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+@app.route("/api/stations/refresh", methods=["POST"])
+def refresh_station_index():
+    """Conditionally re-fetch station data and hot-swap the running index."""
+    try:
+        diff = refresh_stations()
+        if diff is None:
+            return jsonify({"status": "success", "modified": False}), 200
+        return jsonify({
+            "status": "success",
+            "modified": True,
+            "added": diff["added"],
+            "removed": diff["removed"],
+            "renamed": {code: list(names) for code, names in diff["renamed"].items()},
+            "elapsed_ms": diff["elapsed_ms"]
+        }), 200
+    except StationFetchError as e:
+        # 上游失败，不能报告为“未修改”
+        return jsonify({"status": "error", "message": str(e)}), 502
+    except Exception as e:
+        if switch_mode(mode) == 0:
+            raise
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+@app.route("/api/snapshot", methods=["GET"])
+def get_snapshot():
+    """
+    Latest poll result of a route for non-streaming clients.
+
+    Does not start a crawler. The strong ETag / Last-Modified come from the poll
+    sequence, so caches can revalidate with If-None-Match and get a 304.
+    """
+    date_param = request.args.get("date")
+    dep_param = request.args.get("departure")
+    dest_param = request.args.get("destination")
+
+    if not date_param or not dep_param or not dest_param:
+        return jsonify({"error": "Missing params"}), 400
+
+    snapshot = snapshot_store.get((dep_param, dest_param, date_param))
+    if snapshot is None:
+        return jsonify({"status": "warning", "message": "No snapshot for this route"}), 404
+
+    headers = {
+        'ETag': snapshot.etag,
+        'Last-Modified': snapshot.last_modified,
+        # 下一次轮询前内容不会变化
+        'Cache-Control': f'public, max-age={max(int(snapshot.interval or 0), 1)}',
+    }
+
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match:
+        # If-None-Match 按弱比较（RFC 9110 13.1.2）：压缩代理常把 ETag 改写为 W/"..."
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        if if_none_match.strip() == "*" or snapshot.etag in [tag[2:] if tag.startswith("W/") else tag for tag in tags]:
+            return Response(status=304, headers=headers)
+    elif request.if_modified_since and int(snapshot.updated_at) <= request.if_modified_since.timestamp():
+        return Response(status=304, headers=headers)
+
+    return Response(snapshot.body(), mimetype='application/json', headers=headers)
+
+@app.route("/api/segment_search", methods=["GET"])
+def segment_search():
+    """One-shot A->B search that also reports seats only sold on longer segments of the same train."""
+    try:
+        date_param = request.args.get("date")
+        dep_param = request.args.get("departure")
+        dest_param = request.args.get("destination")
+
+        if not date_param or not dep_param or not dest_param:
+            return jsonify({"error": "Missing params"}), 400
+
+        seat_param = request.args.get("seatClasses")
+        seat_classes = seat_param.split(",") if seat_param else None
+        for seat in seat_classes or []:
+            if seat not in SEAT_NAMES:
+                return jsonify({"error": f"Unknown seat class: {seat}"}), 400
+
+        results = get_searcher("segment").search(
+            dep_param, dest_param, date_param,
+            is_student=request.args.get("studentTicket") == 'true',
+            is_high_speed=request.args.get("highSpeed") == 'true',
+            seat_classes=seat_classes
+        )
+        return jsonify({"status": "success", "data": results}), 200
+    except Exception as e:
+        if switch_mode(mode) == 0:
+            raise
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+@app.route("/api/itinerary", methods=["GET"])
+def itinerary_search():
+    """Two-leg itineraries A->hub->B, joined on connection time and ranked."""
+    try:
+        date_param = request.args.get("date")
+        dep_param = request.args.get("departure")
+        dest_param = request.args.get("destination")
+
+        if not date_param or not dep_param or not dest_param:
+            return jsonify({"error": "Missing params"}), 400
+
+        hubs_param = request.args.get("hubs")
+        results = get_searcher("itinerary").search(
+            dep_param, dest_param, date_param,
+            hubs=hubs_param.split(",") if hubs_param else None,
+            is_student=request.args.get("studentTicket") == 'true',
+            is_high_speed=request.args.get("highSpeed") == 'true',
+            min_connection=int(request.args.get("minConnection", 20)),
+            max_wait=int(request.args.get("maxWait", 240)),
+            limit=int(request.args.get("limit", 20))
+        )
+        return jsonify({"status": "success", "data": results}), 200
+    except Exception as e:
+        if switch_mode(mode) == 0:
+            raise
+        return jsonify({"status": "error", "message": str(e)}), 400
+
 @app.route("/api/stop_train_code", methods=["POST"])
 def stop_crawler_by_code():
     try:
@@ -302,7 +766,9 @@ def stop_crawler_by_code():
         strictmode = False
         
         task_key = (departure, destination, date, student, high_speed, strictmode)
-        
+
+        if detach_from_range(lambda key: key == task_key):
+            return jsonify({"status": "success", "message": "Detached from range crawler"}), 200
         if task_key in crawler_stop_flags:
             crawler_stop_flags[task_key] = True
             return jsonify({"status": "success", "message": "Stop signal sent"}), 200
@@ -327,21 +793,29 @@ def stop_crawler():
         
         task_key = (departure, destination, date, student, high_speed, strictmode)
         
+        # 复用区间爬虫的单日任务只解除挂载，区间爬虫继续运行
+        if detach_from_range(lambda key: key == task_key):
+            return jsonify({"status": "success", "message": "Detached from range crawler"}), 200
         if task_key in crawler_stop_flags:
             crawler_stop_flags[task_key] = True
-            print(f"Stop signal sent for crawler: {task_key}")
+            logger.info("Stop signal sent for crawler: %s", task_key)
             return jsonify({"status": "success", "message": "Stop signal sent"}), 200
         else:
+            if detach_from_range(lambda key: key[:3] == (departure, destination, date)):
+                return jsonify({"status": "success", "message": "Detached from range crawler"}), 200
             # Try to find a matching crawler with partial key match
-            for key in crawler_stop_flags.keys():
+            for key in list(crawler_stop_flags.keys()):
+                # 区间任务的 key[2] 是起始日期，不参与单日匹配
+                if crawler_routes.get(key, ((), False))[1]:
+                    continue
                 if key[0] == departure and key[1] == destination and key[2] == date:
                     crawler_stop_flags[key] = True
-                    print(f"Stop signal sent for crawler (partial match): {key}")
+                    logger.info("Stop signal sent for crawler (partial match): %s", key)
                     return jsonify({"status": "success", "message": "Stop signal sent"}), 200
             
             return jsonify({"status": "warning", "message": "Crawler not found"}), 200
     except Exception as e:
-        print(f"Error stopping crawler: {e}")
+        logger.warning("Error stopping crawler: %s", e)
         return jsonify({"status": "error", "message": str(e)}), 400
 
 
@@ -0,0 +1,39 @@
+import json
+
+from benchmarks.fixtures.record import FIXTURE_DIR
+from benchmarks.harness import benchmark
+from crawler.ticket_crawler import TicketCrawler
+from station_id_normalization.station_id_link import indexer
+
+
+def load_fixture(name, copies=1):
+    with open(FIXTURE_DIR / name, encoding="utf-8") as f:
+        data = json.load(f)["data"]
+    data["result"] = data["result"] * copies
+    return data
+
+
+def parser():
+    # parse_result 不依赖网络会话，跳过 __init__ 里的 Cookie 初始化
+    crawler = TicketCrawler.__new__(TicketCrawler)
+    indexer.load_data()
+    return crawler
+
+
+@benchmark("crawler.parse_result[route]")
+def parse_route():
+    crawler, data = parser(), load_fixture("left_ticket_route.json")
+    return lambda: crawler.parse_result(data, False)
+
+
+@benchmark("crawler.parse_result[large x10]")
+def parse_large():
+    crawler, data = parser(), load_fixture("left_ticket_large.json", copies=10)
+    return lambda: crawler.parse_result(data, False)
+
+
+@benchmark("crawler.parse_result[large x10, high speed, strict]")
+def parse_large_filtered():
+    crawler, data = parser(), load_fixture("left_ticket_large.json", copies=10)
+    codes = (indexer.get_code("广州南"), indexer.get_code("光明城"))
+    return lambda: crawler.parse_result(data, True, strict_query_codes=codes)
@@ -0,0 +1,152 @@
+"""
+Crawl-loop overhead with logging off vs on.
+
+Runs start_polling_storage against an in-memory 12306 response (no network,
+no sleeping) so each poll is parse_result + CSV append + snapshot/alert
+publish plus whatever the logger costs. The "slow sink" cases make every
+write take SLOW_WRITE seconds to show a blocked stdout (pipe, terminal)
+stalling the crawl thread with a synchronous handler but not with the queue.
+
+Usage (from backend/):
+    python benchmarks/bench_logging.py [--polls 200] [--trains 60]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from crawler import ticket_crawler
+from crawler.ticket_crawler import TicketCrawler, start_polling_storage, csv_path
+from station_id_normalization.station_id_link import indexer
+from utils.constant import JSON_DIR
+from utils.log import setup_logging, shutdown_logging
+
+FROM_STATION = "北京南"
+TO_STATION = "上海虹桥"
+BENCH_DATE = "2099-01-01"
+SLOW_WRITE = 0.0005
+
+
+def fake_payload(trains):
+    """A leftTicket/query body with `trains` rows in the upstream "|" layout."""
+    result = []
+    for i in range(trains):
+        parts = [""] * 36
+        parts[2] = f"24000G{i:04d}0"
+        parts[3] = f"G{i + 1}"
+        parts[6], parts[7] = "VNP", "AOH"
+        parts[8] = f"{6 + i % 16:02d}:{i % 60:02d}"
+        parts[9] = f"{11 + i % 12:02d}:{i % 60:02d}"
+        parts[10] = "04:48"
+        parts[30], parts[31], parts[32] = "有", str(i % 20), "无"
+        result.append("|".join(parts))
+    return {"data": {"result": result, "map": {"VNP": FROM_STATION, "AOH": TO_STATION}}}
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.text = str(payload)[:200]
+
+    def json(self):
+        return self.payload
+
+
+class FakeSession:
+    def __init__(self, payload):
+        self.response = FakeResponse(payload)
+
+    def get(self, url, params=None, timeout=None):
+        return self.response
+
+
+def crawler_class(payload):
+    class BenchCrawler(TicketCrawler):
+        def __init__(self):
+            self.session = FakeSession(payload)
+            self.station_codes_map = JSON_DIR / "station.json"
+            indexer.load_data(self.station_codes_map)
+            self.query_url = "https://kyfw.12306.cn/otn/leftTicket/queryG"
+            self.stop_list_url = "https://kyfw.12306.cn/otn/czxx/queryByTrainNo"
+    return BenchCrawler
+
+
+class NullSink:
+    def write(self, text):
+        pass
+
+    def flush(self):
+        pass
+
+
+class SlowSink(NullSink):
+    def write(self, text):
+        time.sleep(SLOW_WRITE)
+
+
+def use_queued(level, sink):
+    shutdown_logging()
+    setup_logging(stream=sink, level=level)
+
+
+def use_sync(level, sink):
+    """The pre-queue behaviour: formatting and I/O on the calling thread, like print."""
+    shutdown_logging()
+    root = logging.getLogger("transit")
+    handler = logging.StreamHandler(sink)
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s"))
+    root.handlers = [handler]
+    root.setLevel(level)
+
+
+def run_polls(polls):
+    remaining = [polls]
+
+    def should_stop():
+        remaining[0] -= 1
+        return remaining[0] < 0
+
+    start = time.perf_counter()
+    start_polling_storage(FROM_STATION, TO_STATION, BENCH_DATE, interval=0, should_stop=should_stop)
+    return (time.perf_counter() - start) / polls
+
+
+CASES = [
+    ("off", lambda: use_queued(logging.CRITICAL + 1, NullSink())),
+    ("queued INFO", lambda: use_queued(logging.INFO, NullSink())),
+    ("queued DEBUG (sampled)", lambda: use_queued(logging.DEBUG, NullSink())),
+    ("queued DEBUG, slow sink", lambda: use_queued(logging.DEBUG, SlowSink())),
+    ("sync DEBUG, slow sink", lambda: use_sync(logging.DEBUG, SlowSink())),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--polls", type=int, default=200)
+    parser.add_argument("--trains", type=int, default=60)
+    args = parser.parse_args()
+
+    ticket_crawler.TicketCrawler = crawler_class(fake_payload(args.trains))
+    try:
+        CASES[0][1]()
+        run_polls(5)  # 预热：加载车站表、pandas 等
+        baseline = None
+        print(f"{'case':<26} {'ms/poll':>9} {'overhead':>9}")
+        for name, configure in CASES:
+            configure()
+            per_poll = run_polls(args.polls)
+            baseline = baseline or per_poll
+            print(f"{name:<26} {per_poll * 1000:>9.3f} {(per_poll / baseline - 1) * 100:>8.1f}%")
+    finally:
+        shutdown_logging()
+        filename = csv_path(BENCH_DATE, FROM_STATION, TO_STATION)
+        if filename.exists():
+            filename.unlink()
+
+
+if __name__ == "__main__":
+    main()
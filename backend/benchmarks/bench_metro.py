@@ -0,0 +1,106 @@
+import atexit
+import os
+import random
+import shutil
+import tempfile
+
+from benchmarks.fixtures.metro_db import build_metro_db
+from benchmarks.harness import SkipBenchmark, benchmark
+
+_network = {}
+
+
+def network():
+    """RoutingModule over a GZ+SZ fixture DB, built once per run."""
+    if not _network:
+        try:
+            # pybind11 模块，需先构建 transit-routing-engine 并加入 PYTHONPATH
+            from DBManager import RoutingModule
+        except ImportError:
+            raise SkipBenchmark("DBManager extension not importable (build with -DBUILD_PYTHON_BINDINGS=ON)")
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        atexit.register(os.remove, path)
+        nodes = build_metro_db(path)
+        _network.update(router=RoutingModule(path), nodes=nodes, path=path)
+    return _network["router"], _network["nodes"]
+
+
+def shard_dir():
+    path = tempfile.mkdtemp(prefix="metro-shards-")
+    atexit.register(shutil.rmtree, path, True)
+    return path
+
+
+def city_pairs(nodes, city, count, seed=7):
+    rng = random.Random(seed)
+    local = [node for node in nodes if node[1].startswith(city)]
+    return [(rng.choice(local), rng.choice(local)) for _ in range(count)]
+
+
+def single_queries(city):
+    router, nodes = network()
+    pairs = city_pairs(nodes, city, 20)
+
+    def run():
+        for (from_station, from_line), (to_station, to_line) in pairs:
+            router.queryTime(from_station, from_line, to_station, to_line)
+    return run
+
+
+@benchmark("metro.queryTime[GZ x20]")
+def query_gz():
+    return single_queries("GZ")
+
+
+@benchmark("metro.queryTime[SZ x20]")
+def query_sz():
+    return single_queries("SZ")
+
+
+@benchmark("metro.queryTimeBatch[GZ+SZ x200]")
+def query_batch():
+    import numpy as np
+
+    router, nodes = network()
+    pairs = city_pairs(nodes, "GZ", 100) + city_pairs(nodes, "SZ", 100)
+    ids = router.resolveNodes([name for pair in pairs for name in pair]).reshape(-1, 2)
+    ids = np.ascontiguousarray(ids)
+    return lambda: router.queryTimeBatch(ids, 0)
+
+
+@benchmark("metro.queryTimesFrom[GZ]")
+def query_from():
+    router, nodes = network()
+    station, line = next(node for node in nodes if node[1].startswith("GZ"))
+    return lambda: router.queryTimesFrom(station, line)
+
+
+@benchmark("metro.sharded.queryTime[GZ x20]")
+def sharded_query_gz():
+    _, nodes = network()
+    from DBManager import ShardedRoutingModule
+
+    router = ShardedRoutingModule(_network["path"], shard_dir())
+    pairs = city_pairs(nodes, "GZ", 20)
+
+    def run():
+        for (from_station, from_line), (to_station, to_line) in pairs:
+            router.queryTime(from_station, from_line, to_station, to_line)
+    return run
+
+
+@benchmark("metro.sharded.cold_start[SZ]")
+def sharded_cold_start():
+    _, nodes = network()
+    from DBManager import ShardedRoutingModule
+
+    shards = shard_dir()
+    ShardedRoutingModule(_network["path"], shards).exportShards()
+    (from_station, from_line), (to_station, to_line) = city_pairs(nodes, "SZ", 1)[0]
+
+    def run():
+        # 新进程的代价：读目录 + 加载一个分片文件 + 一次查询
+        router = ShardedRoutingModule(_network["path"], shards)
+        router.queryTime(from_station, from_line, to_station, to_line)
+    return run
@@ -0,0 +1,96 @@
+import atexit
+import shutil
+import tempfile
+
+import pandas as pd
+
+from benchmarks.harness import benchmark
+from crawler.ticket_crawler import CSV_DTYPES, CSV_FIELDNAMES, csv_path
+from utils.snapshot import SharedSnapshotStore, SnapshotStore
+from utils.sse import SSEEncoder
+
+# resource/csv 中记录最多的一条路线（约 590 行）
+ROUTE = ("光明城", "广州南", "2026-01-22")
+CSV_FILE = csv_path(ROUTE[2], ROUTE[0], ROUTE[1])
+
+
+def latest_poll():
+    df = pd.read_csv(CSV_FILE, dtype=CSV_DTYPES)
+    return df[df["count"] == int(df["count"].max())]
+
+
+def sse_tick(encoding):
+    # 与 app.py 中 /api/receive 的 generate() 每轮所做的工作相同
+    from app import frame_to_records
+
+    encoder = SSEEncoder(encoding, CSV_FIELDNAMES)
+
+    def run():
+        df = pd.read_csv(CSV_FILE, dtype=CSV_DTYPES)
+        data = df[df["count"] == int(df["count"].max())]
+        return encoder.rows(frame_to_records(data))
+    return run
+
+
+@benchmark("sse.read_csv")
+def read_csv():
+    return lambda: pd.read_csv(CSV_FILE, dtype=CSV_DTYPES)
+
+
+@benchmark("sse.frame_to_records")
+def records():
+    from app import frame_to_records
+    data = latest_poll()
+    return lambda: frame_to_records(data)
+
+
+@benchmark("sse.tick[json]")
+def tick_json():
+    return sse_tick("json")
+
+
+@benchmark("sse.tick[columns]")
+def tick_columns():
+    return sse_tick("columns")
+
+
+@benchmark("sse.snapshot_body")
+def snapshot_body():
+    # 爬虫发布的是 CSV 字符串行（见 result_rows），这里保持一致
+    rows = latest_poll().fillna("").to_dict(orient="records")
+    store = SnapshotStore()
+    seq = [0]
+
+    def run():
+        # 每次都发布新序号，测量的是首次序列化而不是缓存命中
+        seq[0] += 1
+        store.publish(ROUTE, seq[0], rows, 5)
+        return store.get(ROUTE).body()
+    return run
+
+
+@benchmark("sse.shared_snapshot[get + records]")
+def shared_snapshot_tick():
+    # 多 worker 部署下每次有新轮询时各 worker 的代价：从映射文件复制 body 并解码
+    directory = tempfile.mkdtemp(prefix="snapshots-")
+    atexit.register(shutil.rmtree, directory, True)
+    rows = latest_poll().fillna("").to_dict(orient="records")
+    SharedSnapshotStore(directory).publish(ROUTE, 1, rows, 5)
+    reader = SharedSnapshotStore(directory)
+
+    def run():
+        # 清掉读者缓存，模拟写入计数刚变化后的第一次读取
+        reader.cache.clear()
+        return reader.get(ROUTE).records()
+    return run
+
+
+@benchmark("sse.shared_snapshot[unchanged]")
+def shared_snapshot_unchanged():
+    # 两次轮询之间的每个 tick：写入计数没变，直接复用缓存的快照
+    directory = tempfile.mkdtemp(prefix="snapshots-")
+    atexit.register(shutil.rmtree, directory, True)
+    rows = latest_poll().fillna("").to_dict(orient="records")
+    SharedSnapshotStore(directory).publish(ROUTE, 1, rows, 5)
+    reader = SharedSnapshotStore(directory)
+    return lambda: reader.get(ROUTE).records()
@@ -0,0 +1,55 @@
+import contextlib
+import io
+
+from benchmarks.harness import benchmark
+from station_id_normalization.convert_station_name import parse_station_names
+from station_id_normalization.station_id_link import StationIndexer, indexer, link
+from utils.constant import JS_DIR, JSON_DIR
+
+STATION_JSON = JSON_DIR / "station.json"
+NAMES = ["北京南", "上海虹桥", "广州南", "深圳北", "光明城", "东莞", "长沙南", "不存在的车站"]
+
+
+@benchmark("stations.load_data[cold]")
+def load_cold():
+    def run():
+        indexer._source = None  # 强制重新解析 station.json
+        with contextlib.redirect_stdout(io.StringIO()):
+            indexer.load_data(STATION_JSON)
+    return run
+
+
+@benchmark("stations.load_data[unchanged]")
+def load_unchanged():
+    indexer.load_data(STATION_JSON)
+    return lambda: indexer.load_data(STATION_JSON)
+
+
+@benchmark("stations.build_maps")
+def build_maps():
+    import json
+    with open(STATION_JSON, encoding="utf-8") as f:
+        data = json.load(f)
+    return lambda: StationIndexer.build_maps(data)
+
+
+@benchmark("stations.get_code[x8]")
+def get_code():
+    indexer.load_data(STATION_JSON)
+
+    def run():
+        for name in NAMES:
+            indexer.get_code(name)
+    return run
+
+
+@benchmark("stations.link")
+def link_pair():
+    indexer.load_data(STATION_JSON)
+    return lambda: link(str(STATION_JSON), "北京南", "上海虹桥")
+
+
+@benchmark("stations.parse_station_names[station_name.js]")
+def parse_names():
+    path = JS_DIR / "station_name.js"
+    return lambda: parse_station_names(path)
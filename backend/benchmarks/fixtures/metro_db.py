@@ -0,0 +1,65 @@
+import json
+import sqlite3
+
+from utils.constant import JSON_DIR
+
+METRO_DIR = JSON_DIR / "MetroInfo"
+CITY_FILES = {"GZ": "guangzhou", "SZ": "shenzhen", "FS": "foshan", "DG": "dongguan"}
+
+# MetroInfo 中没有区间时间，基准测试统一使用固定值
+TRAVEL_TIME = 2
+TRANSFER_TIME = 4
+
+SCHEMA = """
+CREATE TABLE STATIONS (CITY_NAME TEXT, STATION_ID INTEGER PRIMARY KEY, STATION_NAME TEXT);
+CREATE TABLE LINES (CITY_NAME TEXT, LINE_ID INTEGER PRIMARY KEY, LINE_NAME TEXT);
+CREATE TABLE STATION_LINE (CITY_NAME TEXT, STATION_LINE_ID INTEGER PRIMARY KEY, STATION_ID INTEGER, LINE_ID INTEGER);
+CREATE TABLE TRAVELEDGES (FROM_STATION INTEGER, TO_STATION INTEGER, TRAVEL_TIME INTEGER);
+CREATE TABLE TRANSFEREDGES (FROM_STATION INTEGER, TO_STATION INTEGER, TRANSFER_TIME INTEGER);
+"""
+
+
+def build_metro_db(path, cities=("GZ", "SZ")):
+    """
+    Write a routing DB for `cities` from resource/json/MetroInfo.
+
+    Returns the (station_name, line_name) pairs inserted, in file order.
+    """
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    stations = {}   # (city, name) -> (STATION_ID, name stored in the DB)
+    platforms = {}  # STATION_ID -> [STATION_LINE_ID]
+    nodes = []
+    for city in cities:
+        with open(METRO_DIR / city / f"{CITY_FILES[city]}.json", encoding="utf-8") as f:
+            lines = json.load(f)
+        for line in lines:
+            line_name = f"{city}{line['line']}"
+            line_id = conn.execute("INSERT INTO LINES (CITY_NAME, LINE_NAME) VALUES (?, ?)", (city, line_name)).lastrowid
+            previous = None
+            for station in line["station"]:
+                key = (city, station["name"])
+                if key not in stations:
+                    # MetroToolkit 按站名查找，跨城市同名站（如 GZ/SZ 的体育中心站）需加城市后缀
+                    name = station["name"]
+                    if any(stored == name for _, stored in stations.values()):
+                        name = f"{name}({city})"
+                    station_id = conn.execute("INSERT INTO STATIONS (CITY_NAME, STATION_NAME) VALUES (?, ?)",
+                                              (city, name)).lastrowid
+                    stations[key] = (station_id, name)
+                station_id, name = stations[key]
+
+                node = conn.execute("INSERT INTO STATION_LINE (CITY_NAME, STATION_ID, LINE_ID) VALUES (?, ?, ?)",
+                                    (city, station_id, line_id)).lastrowid
+                for other in platforms.setdefault(station_id, []):
+                    conn.executemany("INSERT INTO TRANSFEREDGES VALUES (?, ?, ?)",
+                                     [(other, node, TRANSFER_TIME), (node, other, TRANSFER_TIME)])
+                platforms[station_id].append(node)
+                if previous is not None:
+                    conn.executemany("INSERT INTO TRAVELEDGES VALUES (?, ?, ?)",
+                                     [(previous, node, TRAVEL_TIME), (node, previous, TRAVEL_TIME)])
+                previous = node
+                nodes.append((name, line_name))
+    conn.commit()
+    conn.close()
+    return nodes
@@ -0,0 +1,108 @@
+"""
+Record leftTicket responses used by bench_crawler.
+
+By default the fixtures are rebuilt offline from the crawl CSVs already in
+resource/csv (each distinct train is turned back into the upstream "|" row
+layout parse_result expects). With --live the real response for one route
+is saved instead.
+
+Usage (from backend/):
+    python benchmarks/fixtures/record.py
+    python benchmarks/fixtures/record.py --live 北京南 上海虹桥 2026-02-01
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from utils.constant import RESOURCE_DIR
+from station_id_normalization.station_id_link import indexer
+
+FIXTURE_DIR = Path(__file__).resolve().parent
+
+# parse_result 中的字段下标
+SEAT_INDEX = {
+    "business_class": 32, "special_class": 25, "first_class": 31, "second_class": 30,
+    "soft_sleeper": 23, "hard_sleeper": 28, "hard_seat": 29, "no_seat": 26,
+}
+
+
+def to_upstream(row):
+    parts = [""] * 36
+    parts[2] = f"{row['train_code']}00"
+    parts[3] = row["train_code"]
+    parts[6] = indexer.get_code(row["departure_station"]) or row["departure_station"]
+    parts[7] = indexer.get_code(row["destination_station"]) or row["destination_station"]
+    parts[8], parts[9], parts[10] = row["depart_time"], row["arrive_time"], row["during_time"]
+    for column, index in SEAT_INDEX.items():
+        parts[index] = row.get(column) or ""
+    return "|".join(parts)
+
+
+def response_body(rows):
+    result = [to_upstream(row) for row in rows]
+    station_map = {}
+    for row in rows:
+        for name in (row["departure_station"], row["destination_station"]):
+            code = indexer.get_code(name)
+            if code:
+                station_map[code] = name
+    return {"httpstatus": 200, "data": {"flag": "1", "map": station_map, "result": result}, "status": True}
+
+
+def read_rows(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return [row for row in csv.DictReader(f) if row["train_code"] and row["train_code"] != "__NO_DATA__"]
+
+
+def record_offline():
+    everything = {}
+    busiest = ([], None)
+    for path in sorted((RESOURCE_DIR / "csv").glob("train_data_*.csv")):
+        rows = read_rows(path)
+        if not rows:
+            continue
+        # 最后一次轮询即为该路线的一份完整响应
+        last = max(int(row["count"]) for row in rows)
+        poll = [row for row in rows if int(row["count"]) == last]
+        if len(poll) > len(busiest[0]):
+            busiest = (poll, path.name)
+        for row in rows:
+            everything.setdefault((row["train_code"], row["departure_station"], row["destination_station"]), row)
+
+    save("left_ticket_route.json", response_body(busiest[0]), busiest[1])
+    save("left_ticket_large.json", response_body(list(everything.values())), "all recorded routes")
+
+
+def record_live(from_station, to_station, date):
+    from crawler.ticket_crawler import TicketCrawler
+
+    crawler = TicketCrawler()
+    params = {
+        "leftTicketDTO.train_date": date,
+        "leftTicketDTO.from_station": indexer.get_code(from_station),
+        "leftTicketDTO.to_station": indexer.get_code(to_station),
+        "purpose_codes": "ADULT"
+    }
+    response = crawler.session.get(crawler.query_url, params=params, timeout=10)
+    response.raise_for_status()
+    save("left_ticket_live.json", response.json(), f"{from_station} -> {to_station} {date}")
+
+
+def save(name, body, source):
+    with open(FIXTURE_DIR / name, "w", encoding="utf-8") as f:
+        json.dump(body, f, ensure_ascii=False, separators=(",", ":"))
+    print(f"{name}: {len(body['data']['result'])} trains from {source}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record leftTicket fixtures")
+    parser.add_argument("--live", nargs=3, metavar=("FROM", "TO", "DATE"))
+    args = parser.parse_args()
+    if args.live:
+        record_live(*args.live)
+    else:
+        record_offline()
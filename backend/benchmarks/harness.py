@@ -0,0 +1,40 @@
+import time
+
+# name -> setup function; setup returns the zero-argument callable to time
+BENCHMARKS = {}
+
+
+class SkipBenchmark(Exception):
+    """Raised by a setup function when an optional dependency is missing."""
+
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def calibrate(fn, min_time=0.2):
+    """Smallest power-of-ten call count that runs for at least min_time (like timeit.autorange)."""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        if time.perf_counter() - start >= min_time or number >= 10 ** 6:
+            return number
+        number *= 10
+
+
+def measure(fn, repeat=5, min_time=0.2):
+    """Seconds per call: best and median over `repeat` rounds."""
+    number = calibrate(fn, min_time)
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        rounds.append((time.perf_counter() - start) / number)
+    rounds.sort()
+    return {"best": rounds[0], "median": rounds[len(rounds) // 2], "number": number}
@@ -0,0 +1,143 @@
+"""
+Run the benchmark suite and compare against an earlier commit.
+
+Each run is saved to benchmarks/results/<commit>.json (with a "-dirty" suffix
+for uncommitted trees) and compared with a previous result: by default the
+most recent file from a different commit, or the one named by --against.
+Any benchmark whose best time grew by more than --threshold is flagged and
+the runner exits with status 1.
+
+Usage (from backend/):
+    python benchmarks/run.py
+    python benchmarks/run.py -k stations --against 24ebde7
+    PYTHONPATH=transit-routing-engine/build python benchmarks/run.py -k metro
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.harness import BENCHMARKS, SkipBenchmark, measure
+from benchmarks import bench_crawler, bench_metro, bench_sse, bench_stations  # noqa: F401  注册基准测试
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+DEFAULT_THRESHOLD = 0.10
+
+
+def current_commit():
+    """Short HEAD hash, with -dirty when the tree has uncommitted changes."""
+    def git(*args):
+        return subprocess.run(["git", *args], capture_output=True, text=True, cwd=RESULTS_DIR.parent).stdout.strip()
+    commit = git("rev-parse", "--short", "HEAD") or "unknown"
+    return commit + ("-dirty" if git("status", "--porcelain", "--untracked-files=no") else "")
+
+
+def find_baseline(against, commit):
+    if against:
+        path = Path(against)
+        if not path.exists():
+            path = RESULTS_DIR / f"{against}.json"
+        return path if path.exists() else None
+    older = [p for p in RESULTS_DIR.glob("*.json") if p.stem != commit]
+    return max(older, key=lambda p: json.loads(p.read_text(encoding="utf-8"))["timestamp"], default=None)
+
+
+def run(selected, repeat, min_time):
+    results = {}
+    for name in selected:
+        try:
+            # 被测代码自身的 print 不应混进结果表
+            with contextlib.redirect_stdout(io.StringIO()):
+                fn = BENCHMARKS[name]()
+                results[name] = measure(fn, repeat, min_time)
+        except SkipBenchmark as e:
+            print(f"{name:<52} skipped: {e}")
+            continue
+        print(f"{name:<52} {format_time(results[name]['best']):>10}  (median {format_time(results[name]['median'])})")
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print the change of every shared benchmark; return the names that regressed."""
+    regressions = []
+    print(f"\nCompared with {baseline['commit']} (threshold {threshold:.0%}):")
+    for name, current in results.items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            continue
+        change = current["best"] / previous["best"] - 1
+        flag = ""
+        if change > threshold:
+            flag = "  <-- REGRESSION"
+            regressions.append(name)
+        print(f"{name:<52} {format_time(previous['best']):>10} -> {format_time(current['best']):>10} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def format_time(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f}{unit}"
+    return f"{seconds / 1e-9:.0f}ns"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run benchmarks and flag regressions")
+    parser.add_argument("-k", dest="keyword", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--against", help="Commit hash or result file to compare with")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed slowdown, 0.10 = 10%%")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="Seconds per round")
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--list", action="store_true")
+    args = parser.parse_args()
+
+    selected = sorted(name for name in BENCHMARKS if not args.keyword or args.keyword in name)
+    if args.list:
+        print("\n".join(selected))
+        return 0
+
+    commit = current_commit()
+    results = run(selected, args.repeat, args.min_time)
+    record = {
+        "commit": commit,
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()} ({os.cpu_count()} cpu)",
+        "results": results,
+    }
+
+    baseline_path = find_baseline(args.against, commit)
+    regressions = []
+    if baseline_path:
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+        if baseline["machine"] != record["machine"]:
+            print(f"\nWarning: baseline was recorded on {baseline['machine']}")
+        regressions = compare(results, baseline, args.threshold)
+    elif args.against:
+        print(f"\nNo stored result for {args.against}")
+
+    if not args.no_save:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        path = RESULTS_DIR / f"{commit}.json"
+        if path.exists():
+            # 同一提交多次运行时保留未重新测量的条目
+            previous = json.loads(path.read_text(encoding="utf-8"))["results"]
+            record["results"] = {**previous, **results}
+        path.write_text(json.dumps(record, indent=2), encoding="utf-8")
+
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) slower than {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
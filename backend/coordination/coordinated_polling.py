@@ -0,0 +1,255 @@
+import json
+import os
+import socket
+import sys
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows 没有 fcntl，此时每台机器只应运行一个 worker 进程
+    fcntl = None
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from crawler.ticket_crawler import start_polling_storage, start_polling_range_storage, csv_path, reset_route, append_rows, publish_poll, interruptible_sleep, last_count
+from coordination.lease_store import RouteLease
+from utils.log import get_logger
+
+logger = get_logger("coordination")
+
+# 租约有效期（秒），节点宕机后最多这么久即可被其他节点接管
+LEASE_TTL = 30
+
+
+def default_node_id():
+    return os.environ.get("TRANSIT_NODE_ID") or f"{socket.gethostname()}-{os.getpid()}"
+
+
+def route_id(from_station, to_station, date, is_student, is_high_speed, strict_mode):
+    return json.dumps([from_station, to_station, date, is_student, is_high_speed, strict_mode], ensure_ascii=False)
+
+
+class HostWriter:
+    """
+    Exclusive right to write a route's local files on this host.
+
+    CSV files and shared snapshots live at host-global paths, but every
+    worker process runs its own coordinated crawler. Only the process that
+    holds the flock on <csv>.lock for each of `filenames` writes them
+    (as lease owner or follower); the others stand by and take over when it
+    exits, since the kernel drops the lock with the process.
+    """
+
+    def __init__(self, filenames):
+        self.paths = [Path(f"{filename}.lock") for filename in filenames]
+        self.files = []
+
+    def acquire(self):
+        if fcntl is None or self.files:
+            return True
+        files = []
+        try:
+            for path in self.paths:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                files.append(open(path, "a+b"))
+                fcntl.flock(files[-1], fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            for f in files:
+                f.close()
+            return False
+        self.files = files
+        return True
+
+    def release(self):
+        for f in self.files:
+            f.close()
+        self.files = []
+
+
+def wait_for_host_writer(writer, should_stop, period):
+    """
+    Block until this process may write the route's files.
+
+    Returns None if should_stop fired, else True when another local process
+    wrote the files before us (resume them) and False on a clean start.
+    """
+    took_over = False
+    while not writer.acquire():
+        took_over = True
+        if interruptible_sleep(period, should_stop):
+            return None
+    return took_over
+
+
+class ResultFollower:
+    """Cursor over the owner's results of one route in the shared store."""
+
+    def __init__(self, store, route, lease_ttl):
+        self.store = store
+        self.route = route
+        self.lease_ttl = lease_ttl
+        self.cursor = None
+        # owner 最近公布的轮询间隔，决定跟随者多久拉取一次
+        self.interval = None
+
+    def fetch(self):
+        """New results as [(rows, interval)], oldest first."""
+        results = self.store.fetch_results(self.route, self.cursor, grace=self.lease_ttl)
+        if self.cursor is None and not results:
+            # 刚加入且没有当前结果：从现有最新一条之后开始，不回放旧结果
+            self.cursor = self.store.latest_id(self.route) or 0
+        polls = []
+        for poll_id, _, _, interval, _, rows in results:
+            self.cursor = poll_id
+            self.interval = interval or self.interval
+            polls.append((rows, interval))
+        return polls
+
+    def resume(self):
+        """Start after the newest stored result (its predecessor on this host already wrote it)."""
+        self.cursor = self.store.latest_id(self.route) or 0
+
+    def skip(self, poll_id):
+        """Move the cursor past a result this node published itself."""
+        self.cursor = poll_id
+
+    def period(self, default):
+        return min(self.interval or default, self.lease_ttl / 3)
+
+
+def start_coordinated_polling(store, node_id, from_station, to_station, date, is_student=False, is_high_speed=False, interval=5, strict_mode=False,
+                              should_stop=None, lease_ttl=LEASE_TTL, **kwargs):
+    """
+    Drop-in replacement for start_polling_storage when several replicas run.
+
+    The node holding the route lease runs the real crawler and publishes each
+    poll to the shared store; every other node follows, copying new results
+    into its local CSV / snapshot store so its own subscribers are served.
+    When the owner's lease expires a follower takes over. Of the worker
+    processes on one host only one (see HostWriter) takes part at a time.
+    """
+    route = route_id(from_station, to_station, date, is_student, is_high_speed, strict_mode)
+    lease = RouteLease(store, route, node_id, lease_ttl)
+    follower = ResultFollower(store, route, lease_ttl)
+    options = (is_student, is_high_speed, strict_mode)
+    filename = csv_path(date, from_station, to_station)
+    writer = HostWriter([filename])
+
+    def stopped():
+        return bool(should_stop and should_stop())
+
+    took_over = wait_for_host_writer(writer, should_stop, lease_ttl / 3)
+    if took_over is None:
+        return
+    if took_over and filename.exists():
+        # 本机上一个写入进程已退出：在它的 CSV 之后续写，不重复它已写入的结果
+        count = last_count(filename) + 1
+        follower.resume()
+    else:
+        reset_route(filename, (from_station, to_station, date))
+        count = 1
+
+    def on_poll(seq, rows, current_interval):
+        follower.skip(store.publish_result(route, node_id, seq, rows, current_interval))
+
+    try:
+        while not stopped():
+            if lease.acquire():
+                logger.info("[%s] 获得租约，开始轮询: %s -> %s %s", node_id, from_station, to_station, date)
+                count = start_polling_storage(
+                    from_station, to_station, date, is_student, is_high_speed, interval, strict_mode,
+                    lambda: stopped() or not lease.hold(),
+                    start_count=count, reset_file=False, on_poll=on_poll, **kwargs
+                )
+                if not stopped():
+                    logger.warning("[%s] 租约丢失，转为跟随: %s -> %s %s", node_id, from_station, to_station, date)
+                continue
+
+            # 跟随者：按游标拉取 owner 自上次以来的全部结果写入本地
+            for rows, current_interval in follower.fetch():
+                for row in rows:
+                    row["count"] = count
+                append_rows(filename, rows)
+                publish_poll((from_station, to_station, date), count, rows, current_interval, options)
+                count += 1
+
+            if interruptible_sleep(follower.period(interval), should_stop):
+                break
+    finally:
+        lease.release()
+        writer.release()
+
+
+class RangeCoordinator:
+    """
+    Per-date leases for a range watch (see start_polling_range_storage).
+
+    Each date uses the same lease and result stream as a single-date watch
+    of that route, so range and single-date watches on different replicas
+    share upstream polls too. The range crawler only queries dates whose
+    lease it holds and follows the others.
+    """
+
+    def __init__(self, store, node_id, from_station, to_station, is_student, is_high_speed, strict_mode, lease_ttl=LEASE_TTL):
+        self.store = store
+        self.node_id = node_id
+        self.lease_ttl = lease_ttl
+        self.route = lambda date: route_id(from_station, to_station, date, is_student, is_high_speed, strict_mode)
+        self.leases = {}
+        self.followers = {}
+        self.resumed = False
+
+    def _lease(self, date):
+        if date not in self.leases:
+            self.leases[date] = RouteLease(self.store, self.route(date), self.node_id, self.lease_ttl)
+            self.followers[date] = ResultFollower(self.store, self.route(date), self.lease_ttl)
+            if self.resumed:
+                self.followers[date].resume()
+        return self.leases[date]
+
+    def owns(self, date):
+        """True if this node should query the date itself (holds or just took its lease)."""
+        return self._lease(date).hold()
+
+    def renew(self):
+        """Keep held leases alive between a date's polls; lost ones fall back to following."""
+        for lease in self.leases.values():
+            if lease.renew_at:
+                lease.hold()
+
+    def published(self, date, seq, rows, interval):
+        self.followers[date].skip(self.store.publish_result(self.route(date), self.node_id, seq, rows, interval))
+
+    def follow(self, date):
+        """The owner's new results for date as [(rows, interval)]."""
+        self._lease(date)
+        return self.followers[date].fetch()
+
+    def follow_period(self, date, default):
+        return self.followers[date].period(default)
+
+    def release(self):
+        for lease in self.leases.values():
+            lease.release()
+
+
+def start_coordinated_range_polling(store, node_id, from_station, to_station, dates, is_student=False, is_high_speed=False, interval=5, strict_mode=False,
+                                    should_stop=None, lease_ttl=LEASE_TTL, **kwargs):
+    """Drop-in replacement for start_polling_range_storage when several replicas run."""
+    coordinator = RangeCoordinator(store, node_id, from_station, to_station, is_student, is_high_speed, strict_mode, lease_ttl)
+    writer = HostWriter([csv_path(date, from_station, to_station) for date in dates])
+    took_over = wait_for_host_writer(writer, should_stop, lease_ttl / 3)
+    if took_over is None:
+        return
+    coordinator.resumed = took_over
+
+    def stopped():
+        # 睡眠期间也要续约，否则长间隔的日期会在两次查询之间丢掉租约
+        coordinator.renew()
+        return bool(should_stop and should_stop())
+
+    try:
+        start_polling_range_storage(from_station, to_station, dates, is_student, is_high_speed, interval, strict_mode,
+                                    stopped, coordinator=coordinator, reset_files=not took_over, **kwargs)
+    finally:
+        coordinator.release()
+        writer.release()
@@ -0,0 +1,186 @@
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from utils.log import get_logger
+
+logger = get_logger("coordination")
+
+# 每条路线在共享库中保留的最近轮询结果数，供跟随者按游标补齐
+RESULT_HISTORY = 50
+
+
+class LeaseStore:
+    """
+    Route ownership leases plus the owner's recent poll results, shared by all replicas.
+
+    coordinated_polling only uses these methods; a backend that replicas on
+    several hosts can reach (a database server, Redis, ...) subclasses this
+    and is returned from create_lease_store().
+    """
+
+    def acquire(self, route, owner, ttl):
+        """Take or renew the lease on route; True if owner holds it afterwards. Must be atomic."""
+        raise NotImplementedError
+
+    def release(self, route, owner):
+        """Give up owner's lease on route and drop the route's stored results."""
+        raise NotImplementedError
+
+    def publish_result(self, route, owner, seq, rows, interval):
+        """Append one poll result; return its id, increasing across owners."""
+        raise NotImplementedError
+
+    def fetch_results(self, route, after_id=None, grace=0):
+        """[(id, owner, seq, interval, updated_at, rows)] after after_id, or only the current latest one."""
+        raise NotImplementedError
+
+    def latest_id(self, route):
+        """Id of the newest stored result, None if there is none."""
+        raise NotImplementedError
+
+
+class SQLiteLeaseStore(LeaseStore):
+    """
+    LeaseStore in one SQLite database file, for replicas on a single host.
+
+    The worker processes or containers of one machine point at the same
+    file on a local disk. WAL mode keeps readers off the writers' lock but
+    needs shared memory between the processes, so the file must not sit on
+    a network filesystem (NFS, SMB, ...): leases would stop being exclusive
+    across hosts. Each operation opens its own short-lived connection, so
+    one instance can be used from any number of crawler threads.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS ROUTE_LEASES ("
+                "ROUTE TEXT PRIMARY KEY, OWNER TEXT NOT NULL, EXPIRES_AT REAL NOT NULL)"
+            )
+            # ID 自增且跨 owner 单调，跟随者以它为游标，换主后也不会漏拉或重复
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS ROUTE_POLLS ("
+                "ID INTEGER PRIMARY KEY AUTOINCREMENT, ROUTE TEXT NOT NULL, OWNER TEXT NOT NULL, "
+                "SEQ INTEGER NOT NULL, INTERVAL REAL, UPDATED_AT REAL NOT NULL, ROWS TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ROUTE_POLLS_ROUTE ON ROUTE_POLLS (ROUTE, ID)")
+
+    @contextmanager
+    def _connection(self):
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+        finally:
+            conn.close()
+
+    def acquire(self, route, owner, ttl):
+        """Take or renew the lease on route; True if owner holds it afterwards."""
+        now = time.time()
+        try:
+            with self._connection() as conn:
+                # 单条 UPSERT 即为原子操作：仅当租约属于自己或已过期时才会改写
+                conn.execute(
+                    "INSERT INTO ROUTE_LEASES (ROUTE, OWNER, EXPIRES_AT) VALUES (?, ?, ?) "
+                    "ON CONFLICT(ROUTE) DO UPDATE SET OWNER = excluded.OWNER, EXPIRES_AT = excluded.EXPIRES_AT "
+                    "WHERE ROUTE_LEASES.OWNER = excluded.OWNER OR ROUTE_LEASES.EXPIRES_AT < ?",
+                    (route, owner, now + ttl, now)
+                )
+                row = conn.execute("SELECT OWNER FROM ROUTE_LEASES WHERE ROUTE = ?", (route,)).fetchone()
+            return row is not None and row[0] == owner
+        except sqlite3.Error as e:
+            logger.warning("Lease acquire failed for %s: %s", route, e)
+            return False
+
+    def release(self, route, owner):
+        """Give up the lease; an owner stopping cleanly also drops its results so nobody replays them."""
+        with self._connection() as conn:
+            conn.execute(
+                "DELETE FROM ROUTE_POLLS WHERE ROUTE = ? AND EXISTS "
+                "(SELECT 1 FROM ROUTE_LEASES WHERE ROUTE = ? AND OWNER = ?)",
+                (route, route, owner)
+            )
+            conn.execute("DELETE FROM ROUTE_LEASES WHERE ROUTE = ? AND OWNER = ?", (route, owner))
+
+    def publish_result(self, route, owner, seq, rows, interval):
+        """Append one poll result; returns its id (the followers' cursor)."""
+        with self._connection() as conn:
+            poll_id = conn.execute(
+                "INSERT INTO ROUTE_POLLS (ROUTE, OWNER, SEQ, INTERVAL, UPDATED_AT, ROWS) VALUES (?, ?, ?, ?, ?, ?)",
+                (route, owner, seq, interval, time.time(), json.dumps(rows, ensure_ascii=False))
+            ).lastrowid
+            conn.execute(
+                "DELETE FROM ROUTE_POLLS WHERE ROUTE = ? AND ID <= "
+                "(SELECT ID FROM ROUTE_POLLS WHERE ROUTE = ? ORDER BY ID DESC LIMIT 1 OFFSET ?)",
+                (route, route, RESULT_HISTORY)
+            )
+        return poll_id
+
+    def fetch_results(self, route, after_id=None, grace=0):
+        """
+        Results as [(id, owner, seq, interval, updated_at, rows)], oldest first.
+
+        With after_id, every result published since that cursor. Without
+        one (a follower joining), only the latest result, and only while it
+        is current: no more than its interval + grace seconds old, so the
+        leftovers of a crashed owner are not replayed as fresh polls.
+        """
+        with self._connection() as conn:
+            if after_id is not None:
+                rows = conn.execute(
+                    "SELECT ID, OWNER, SEQ, INTERVAL, UPDATED_AT, ROWS FROM ROUTE_POLLS "
+                    "WHERE ROUTE = ? AND ID > ? ORDER BY ID",
+                    (route, after_id)
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT ID, OWNER, SEQ, INTERVAL, UPDATED_AT, ROWS FROM ROUTE_POLLS "
+                    "WHERE ROUTE = ? AND UPDATED_AT + COALESCE(INTERVAL, 0) + ? >= ? ORDER BY ID DESC LIMIT 1",
+                    (route, grace, time.time())
+                ).fetchall()
+        return [(poll_id, owner, seq, interval, updated_at, json.loads(data))
+                for poll_id, owner, seq, interval, updated_at, data in rows]
+
+    def latest_id(self, route):
+        """Cursor of the newest stored result (None if there is none)."""
+        with self._connection() as conn:
+            row = conn.execute("SELECT MAX(ID) FROM ROUTE_POLLS WHERE ROUTE = ?", (route,)).fetchone()
+        return row[0]
+
+
+def create_lease_store():
+    """SQLiteLeaseStore when TRANSIT_COORDINATION_DB is set (a local file path), else None (no coordination)."""
+    path = os.environ.get("TRANSIT_COORDINATION_DB")
+    return SQLiteLeaseStore(path) if path else None
+
+
+class RouteLease:
+    """One node's view of its lease on a route; renews at a third of the TTL."""
+
+    def __init__(self, store, route, owner, ttl):
+        self.store = store
+        self.route = route
+        self.owner = owner
+        self.ttl = ttl
+        self.renew_at = 0.0
+
+    def acquire(self):
+        if self.store.acquire(self.route, self.owner, self.ttl):
+            self.renew_at = time.time() + self.ttl / 3
+            return True
+        self.renew_at = 0.0
+        return False
+
+    def hold(self):
+        """Cheap check used from the crawler's should_stop; renews when due."""
+        if self.renew_at and time.time() < self.renew_at:
+            return True
+        return self.acquire()
+
+    def release(self):
+        self.store.release(self.route, self.owner)
+        self.renew_at = 0.0
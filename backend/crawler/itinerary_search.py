@@ -0,0 +1,80 @@
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
+
+from crawler.segment_search import RateLimiter
+
+# 大湾区常用换乘枢纽
+DEFAULT_HUBS = ["广州南", "深圳北", "广州", "长沙南"]
+
+
+def to_minutes(hhmm):
+    hours, minutes = hhmm.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def leg_times(train):
+    """(depart, arrive) in minutes from midnight of the travel date; arrive may pass 24:00."""
+    depart = to_minutes(train["出发时间"])
+    return depart, depart + to_minutes(train["历时"])
+
+
+def join_legs(first_legs, second_legs, min_connection=20, max_wait=240):
+    """
+    Join A->hub with hub->B trains on arrival / departure time.
+
+    Second legs are sorted by departure once; each first leg then finds its
+    feasible connections with two binary searches, so a join costs
+    O((n + m) log m + matches) and is cheap enough for every poll tick.
+    """
+    second = sorted(((leg_times(train)[0], train) for train in second_legs), key=lambda item: item[0])
+    second_departs = [depart for depart, _ in second]
+
+    itineraries = []
+    for first in first_legs:
+        depart, arrive = leg_times(first)
+        lo = bisect_left(second_departs, arrive + min_connection)
+        hi = bisect_right(second_departs, arrive + max_wait)
+        for second_depart, train in second[lo:hi]:
+            final_arrive = second_depart + to_minutes(train["历时"])
+            itineraries.append({
+                "legs": [first, train],
+                "换乘站": train["出发站"],
+                "换乘时间": second_depart - arrive,
+                "总历时": final_arrive - depart,
+                "有票": bool(first["余票"]) and bool(train["余票"]),
+            })
+    return itineraries
+
+
+def rank_itineraries(itineraries, limit=20):
+    # 两程都有票优先，其次总历时最短，再次换乘等待最短
+    itineraries.sort(key=lambda it: (not it["有票"], it["总历时"], it["换乘时间"]))
+    return itineraries[:limit]
+
+
+class ItinerarySearcher:
+    """Two-leg A->hub->B rail itineraries for routes without a (good) direct train."""
+
+    def __init__(self, crawler, min_gap=1.0, max_workers=4, limiter=None):
+        self.crawler = crawler
+        self.limiter = limiter or RateLimiter(min_gap)
+        self.max_workers = max_workers
+
+    def _query(self, from_station, to_station, date, is_student, is_high_speed):
+        self.limiter.wait()
+        return self.crawler.query(from_station, to_station, date, is_student, is_high_speed, True) or []
+
+    def search(self, from_station, to_station, date, hubs=None, is_student=False, is_high_speed=False,
+               min_connection=20, max_wait=240, limit=20):
+        hubs = [hub for hub in (hubs or DEFAULT_HUBS) if hub not in (from_station, to_station)]
+
+        # 所有 A->hub 与 hub->B 查询并发执行，共享同一速率预算
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            first = {hub: pool.submit(self._query, from_station, hub, date, is_student, is_high_speed) for hub in hubs}
+            second = {hub: pool.submit(self._query, hub, to_station, date, is_student, is_high_speed) for hub in hubs}
+            legs = {hub: (first[hub].result(), second[hub].result()) for hub in hubs}
+
+        itineraries = []
+        for first_legs, second_legs in legs.values():
+            itineraries.extend(join_legs(first_legs, second_legs, min_connection, max_wait))
+        return rank_itineraries(itineraries, limit)
@@ -0,0 +1,98 @@
+from datetime import date as date_cls, datetime
+
+# 参与变化率统计的余票列
+SEAT_COLUMNS = [
+    "business_class", "special_class", "first_class", "second_class",
+    "soft_sleeper", "hard_sleeper", "hard_seat", "no_seat"
+]
+
+
+def interval_bounds(base_interval, min_interval=None, max_interval=None):
+    """[min, max] of an AdaptiveInterval; raises ValueError when the range is empty."""
+    base_interval = float(base_interval)
+    lower = float(min_interval) if min_interval else max(base_interval / 2, 2.0)
+    upper = float(max_interval) if max_interval else base_interval * 6
+    if lower > upper:
+        raise ValueError(f"Minimum polling interval {lower:g}s exceeds maximum {upper:g}s")
+    return lower, upper
+
+
+class AdaptiveInterval:
+    """
+    Per-route polling interval learned from how often availability changes.
+
+    After every poll the fraction of trains whose seat columns changed is folded
+    into an EWMA change rate. Volatile routes and routes close to departure
+    poll faster, quiet routes far out poll slower, always within
+    [min_interval, max_interval].
+    """
+
+    # 变化率达到该值时按最快频率轮询
+    HOT_CHANGE_RATE = 0.2
+
+    def __init__(self, base_interval, travel_date, min_interval=None, max_interval=None, alpha=0.3):
+        self.base_interval = float(base_interval)
+        self.min_interval, self.max_interval = interval_bounds(base_interval, min_interval, max_interval)
+        try:
+            self.travel_date = datetime.strptime(travel_date, "%Y-%m-%d").date()
+        except (TypeError, ValueError):
+            self.travel_date = None
+        self.alpha = alpha
+        self.change_rate = None
+        self.previous = None
+        self.interval = min(max(self.base_interval, self.min_interval), self.max_interval)
+
+    @staticmethod
+    def signature(rows):
+        return {
+            row.get("train_code"): tuple(row.get(seat) for seat in SEAT_COLUMNS)
+            for row in rows
+            if row.get("train_code") and row.get("train_code") != "__NO_DATA__"
+        }
+
+    def observe(self, rows, today=None):
+        """Fold one poll result into the change rate and return the next interval."""
+        current = self.signature(rows)
+        if self.previous is not None:
+            trains = self.previous.keys() | current.keys()
+            changed = sum(1 for train in trains if self.previous.get(train) != current.get(train))
+            fraction = changed / len(trains) if trains else 0.0
+            if self.change_rate is None:
+                self.change_rate = fraction
+            else:
+                self.change_rate = self.alpha * fraction + (1 - self.alpha) * self.change_rate
+        self.previous = current
+
+        self.interval = self._next_interval(today or date_cls.today())
+        return self.interval
+
+    def backoff(self):
+        """A failed poll: keep the learned change rate but double the interval (up to max_interval)."""
+        self.interval = min(self.interval * 2, self.max_interval)
+        return self.interval
+
+    def _next_interval(self, today):
+        # 变化率：0 -> x2，HOT_CHANGE_RATE 及以上 -> x0.5，中间按对数线性插值
+        if self.change_rate is None:
+            volatility_factor = 1.0
+        else:
+            hotness = min(self.change_rate / self.HOT_CHANGE_RATE, 1.0)
+            volatility_factor = 2 ** (1 - 2 * hotness)
+
+        # 距发车越近越频繁
+        days = (self.travel_date - today).days if self.travel_date else None
+        if days is None:
+            departure_factor = 1.0
+        elif days <= 1:
+            departure_factor = 0.5
+        elif days <= 3:
+            departure_factor = 0.75
+        elif days >= 14:
+            departure_factor = 2.0
+        elif days >= 7:
+            departure_factor = 1.5
+        else:
+            departure_factor = 1.0
+
+        interval = self.base_interval * volatility_factor * departure_factor
+        return min(max(interval, self.min_interval), self.max_interval)
@@ -0,0 +1,185 @@
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from utils.constant import RESOURCE_DIR
+
+# CSV 列名 -> parse_result 中的余票名称
+SEAT_NAMES = {
+    "business_class": "商务座",
+    "special_class": "特等座",
+    "first_class": "一等座",
+    "second_class": "二等座",
+    "soft_sleeper": "软卧",
+    "hard_sleeper": "硬卧",
+    "hard_seat": "硬座",
+    "no_seat": "无座",
+}
+
+# 经停站基本不变，默认缓存 7 天
+STOP_LIST_TTL = 7 * 24 * 3600
+
+
+class StopListCache:
+    """Persistent train_no -> stop list cache (SQLite) with a TTL."""
+
+    def __init__(self, path=None, ttl=STOP_LIST_TTL):
+        if path is None:
+            cache_dir = RESOURCE_DIR / "cache"
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            path = cache_dir / "stop_lists.db"
+        self.path = str(path)
+        self.ttl = ttl
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS STOP_LISTS ("
+                "TRAIN_NO TEXT PRIMARY KEY, STOPS TEXT NOT NULL, FETCHED_AT REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _connection(self):
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def get(self, train_no):
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT STOPS FROM STOP_LISTS WHERE TRAIN_NO = ? AND FETCHED_AT >= ?",
+                (train_no, time.time() - self.ttl)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, train_no, stops):
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO STOP_LISTS (TRAIN_NO, STOPS, FETCHED_AT) VALUES (?, ?, ?)",
+                (train_no, json.dumps(stops, ensure_ascii=False), time.time())
+            )
+
+
+class RateLimiter:
+    """Spaces out request start times by at least min_gap seconds across threads."""
+
+    def __init__(self, min_gap):
+        self.min_gap = min_gap
+        self.lock = threading.Lock()
+        self.next_slot = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.time()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.min_gap
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class SegmentSearcher:
+    """
+    Find seats on A->B that are only sold as a longer segment of the same train.
+
+    For every train on the direct A->B query, its stop list (cached) gives the
+    superset segments (earlier origin and/or later destination). Each distinct
+    segment is queried once, concurrently under the rate budget, and seats
+    missing on A->B but available on a covering segment are merged in.
+
+    Pass the same `limiter` to every searcher sharing one crawler session.
+    """
+
+    def __init__(self, crawler, cache=None, min_gap=1.0, max_workers=4, max_extend=3, max_queries=20, limiter=None):
+        self.crawler = crawler
+        self.cache = cache or StopListCache()
+        self.limiter = limiter or RateLimiter(min_gap)
+        self.max_workers = max_workers
+        # 向前/向后最多扩展的站数，以及单次搜索的上游查询上限
+        self.max_extend = max_extend
+        self.max_queries = max_queries
+
+    def stop_list(self, train, date):
+        train_no = train.get("列车编号")
+        if not train_no:
+            return []
+        stops = self.cache.get(train_no)
+        if stops is None:
+            self.limiter.wait()
+            stops = self.crawler.query_stop_list(train_no, train.get("出发站代码"), train.get("到达站代码"), date)
+            if stops:
+                self.cache.put(train_no, stops)
+        return stops or []
+
+    def candidate_segments(self, stops, from_station, to_station):
+        """Longer segments of one train covering from->to, as [(stops added, segment)] shortest first."""
+        if from_station not in stops or to_station not in stops:
+            return []
+        i, j = stops.index(from_station), stops.index(to_station)
+        if i >= j:
+            return []
+        segments = []
+        for a in range(i, max(i - self.max_extend, 0) - 1, -1):
+            for b in range(j, min(j + self.max_extend, len(stops) - 1) + 1):
+                if (a, b) != (i, j):
+                    segments.append(((i - a) + (b - j), (stops[a], stops[b])))
+        # 越短的区间票价越接近原需求，优先查询
+        segments.sort(key=lambda candidate: candidate[0])
+        return segments
+
+    def search(self, from_station, to_station, date, is_student=False, is_high_speed=False, seat_classes=None):
+        seat_names = [SEAT_NAMES[seat] for seat in (seat_classes or SEAT_NAMES)]
+        self.limiter.wait()
+        # 一次性查询：请求失败（None）按无结果处理
+        direct = self.crawler.query(from_station, to_station, date, is_student, is_high_speed, True) or []
+
+        # 只有缺少目标席别的车次才需要拆段
+        wanted = {
+            train["车次"]: [name for name in seat_names if name not in train["余票"]]
+            for train in direct
+        }
+        wanted = {code: names for code, names in wanted.items() if names}
+        trains = [train for train in direct if train["车次"] in wanted]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            stop_lists = dict(zip(
+                (train["车次"] for train in trains),
+                pool.map(lambda train: self.stop_list(train, date), trains)
+            ))
+
+            # 所有车次的候选区间放在一起按扩展站数排序后再截断，
+            # 否则排在前面的车次会用掉全部查询配额
+            candidates = sorted(
+                ((extend, segment, code)
+                 for code, stops in stop_lists.items()
+                 for extend, segment in self.candidate_segments(stops, from_station, to_station)),
+                key=lambda candidate: candidate[0]
+            )
+            # 区间 -> 需要在该区间里查看的车次；同一区间只查询一次
+            segment_trains = {}
+            for _, segment, code in candidates:
+                if segment in segment_trains or len(segment_trains) < self.max_queries:
+                    segment_trains.setdefault(segment, set()).add(code)
+            segments = list(segment_trains)
+
+            def query_segment(segment):
+                self.limiter.wait()
+                return self.crawler.query(segment[0], segment[1], date, is_student, is_high_speed, True) or []
+
+            segment_results = dict(zip(segments, pool.map(query_segment, segments)))
+
+        for train in direct:
+            train["拆段余票"] = {}
+        by_code = {train["车次"]: train for train in direct}
+        for segment, results in segment_results.items():
+            for seg_train in results:
+                code = seg_train["车次"]
+                if code not in segment_trains[segment]:
+                    continue
+                split = by_code[code]["拆段余票"]
+                for name in wanted[code]:
+                    if name in seg_train["余票"] and name not in split:
+                        split[name] = {"出发站": segment[0], "到达站": segment[1], "余票": seg_train["余票"][name]}
+        return direct
@@ -10,6 +10,12 @@ from datetime import datetime
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils.constant import JSON_DIR, RESOURCE_DIR
 from station_id_normalization.station_id_link import link, indexer
+from alert.alert_engine import alert_engine
+from utils.snapshot import snapshot_store
+from crawler.poll_interval import AdaptiveInterval
+from utils.log import get_logger, route_extra
+
+logger = get_logger("crawler")
 
 class TicketCrawler:
     def __init__(self):
@@ -25,20 +31,22 @@ class TicketCrawler:
         self.station_codes_map = JSON_DIR / "station.json"
         
         # 预加载车站数据（利用 StationIndexer 的单例机制）
-        print("正在加载车站信息...")
+        logger.info("正在加载车站信息...")
         indexer.load_data(self.station_codes_map)
         
         self.query_url = "https://kyfw.12306.cn/otn/leftTicket/queryG"
+        # 车次经停站查询接口
+        self.stop_list_url = "https://kyfw.12306.cn/otn/czxx/queryByTrainNo"
 
     def init_cookies(self):
         try:
-            print("正在初始化 Cookie (访问 init 页面)...")
+            logger.info("正在初始化 Cookie (访问 init 页面)...")
             # 访问查询页面以获取必要的 Cookie
             self.session.get("https://kyfw.12306.cn/otn/leftTicket/init", timeout=10)
-            print("Cookie 初始化成功")
-            print("当前 Cookies:", self.session.cookies.get_dict())
+            logger.info("Cookie 初始化成功")
+            logger.debug("当前 Cookies: %s", self.session.cookies.get_dict())
         except Exception as e:
-            print(f"Cookie 初始化失败: {e}")
+            logger.warning("Cookie 初始化失败: %s", e)
 
     def get_station_name(self, code):
         return indexer.get_name(code)
@@ -48,13 +56,20 @@ class TicketCrawler:
         return link(str(self.station_codes_map), start_station, destination_station)
     
     def query(self, from_station_name, to_station_name, date, is_student=False, is_high_speed=False, strict_mode=False):
+        """
+        Trains with remaining seats for one route and date.
+
+        Returns [] when the route has no matching trains and None when the
+        request itself failed (network error, non-200, non-JSON or malformed
+        response), so pollers do not mistake throttling for an empty route.
+        """
         # 使用字典解包(unpacking)语法直接获取值
         codes = self.get_station_code(from_station_name, to_station_name)
         from_code, to_code = codes.values()
-        
+        route = route_extra(from_station_name, to_station_name, date)
 
         if not from_code or not to_code:
-            print(f"错误: 找不到车站代码 - {from_station_name} 或 {to_station_name}")
+            logger.error("找不到车站代码 - %s 或 %s", from_station_name, to_station_name)
             return []
 
         params = {
@@ -65,13 +80,12 @@ class TicketCrawler:
         }
 
         try:
-            print(f"DEBUG: 请求 URL: {self.query_url}")
-            print(f"DEBUG: 请求参数: {params}")
+            logger.debug("请求 URL: %s 参数: %s", self.query_url, params, extra=route)
             # print(f"DEBUG: 当前 Headers: {self.session.headers}")
             
             response = self.session.get(self.query_url, params=params, timeout=10)
             
-            print(f"DEBUG: 响应状态码: {response.status_code}")
+            logger.debug("响应状态码: %s", response.status_code, extra=route)
             
             # 检查是否需要更新 URL (12306 动态 URL 机制)
             if response.status_code == 200:
@@ -81,29 +95,26 @@ class TicketCrawler:
                     
                     if "c_url" in data:
                         self.query_url = "https://kyfw.12306.cn/otn/" + data["c_url"]
-                        print(f"更新查询接口为: {self.query_url}")
+                        logger.info("更新查询接口为: %s", self.query_url)
                         # 使用新 URL 重试
                         return self.query(from_station_name, to_station_name, date, is_student, is_high_speed, strict_mode)
                     
                     if "data" in data and "result" in data["data"]:
                         return self.parse_result(data["data"], is_high_speed, strict_query_codes=(from_code, to_code) if strict_mode else None)
                     else:
-                        print("查询结果为空或格式错误")
-                        print(f"DEBUG: 完整响应: {data}")
-                        return []
+                        logger.warning("查询结果为空或格式错误", extra=route)
+                        logger.debug("完整响应: %s", data, extra=route)
+                        return None
                 except json.JSONDecodeError:
-                    print("解析响应失败")
-                    print(f"DEBUG: 响应内容不是 JSON: {response.text[:200]}")
-                    return []
+                    logger.warning("解析响应失败, 响应内容不是 JSON: %.200s", response.text, extra=route)
+                    return None
             else:
-                print(f"请求失败: {response.status_code}")
-                return []
+                logger.warning("请求失败: %s", response.status_code, extra=route)
+                return None
 
-        except Exception as e:
-            print(f"发生异常: {e}")
-            import traceback
-            traceback.print_exc()
-            return []
+        except Exception:
+            logger.exception("查询发生异常: %s -> %s %s", from_station_name, to_station_name, date)
+            return None
 
     def parse_result(self, data, is_high_speed, strict_query_codes=None):
         results = []
@@ -180,6 +191,9 @@ class TicketCrawler:
 
             train_info = {
                 "车次": train_no,
+                "列车编号": parts[2],
+                "出发站代码": from_station_code,
+                "到达站代码": to_station_code,
                 "出发站": from_station,
                 "到达站": to_station,
                 "出发时间": start_time,
@@ -192,6 +206,29 @@ class TicketCrawler:
             
         return results
 
+    def query_stop_list(self, train_no, from_code, to_code, date):
+        """
+        Fetch the stop list of one train (列车编号 from parse_result).
+
+        Returns station names in running order, or [] on failure.
+        """
+        params = {
+            "train_no": train_no,
+            "from_station_telecode": from_code,
+            "to_station_telecode": to_code,
+            "depart_date": date
+        }
+        try:
+            response = self.session.get(self.stop_list_url, params=params, timeout=10)
+            if response.status_code != 200:
+                logger.warning("经停站请求失败: %s", response.status_code)
+                return []
+            stops = response.json().get("data", {}).get("data", [])
+            return [stop["station_name"] for stop in stops if stop.get("station_name")]
+        except (requests.RequestException, ValueError, AttributeError) as e:
+            logger.warning("经停站查询异常 (%s): %s", train_no, e)
+            return []
+
 def start_polling(from_station, to_station, date, is_student=False, is_high_speed=False, interval=5, strict_mode=False):
     crawler = TicketCrawler()
     print(f"开始查询: {date} {from_station} -> {to_station} (高铁/动车: {is_high_speed}, 学生票: {is_student}, 严格模式: {strict_mode})")
@@ -220,132 +257,286 @@ def start_polling(from_station, to_station, date, is_student=False, is_high_spee
         print(f"随机等待 {sleep_time:.2f} 秒 (设定均值: {interval}s)...")
         time.sleep(sleep_time)
         count += 1
-def start_polling_storage(from_station, to_station, date, is_student=False, is_high_speed=False, interval=5, strict_mode=False, should_stop=None):
-    """
-    Start polling for train tickets and store results in CSV.
-    
-    Args:
-        should_stop: A callable that returns True when the crawler should stop
-    """
-    crawler = TicketCrawler()
-    count = 1
-    
-    # 构建CSV存储路径 / Build CSV storage path
-    csv_dir = RESOURCE_DIR / "csv"
-    if not csv_dir.exists():
-        csv_dir.mkdir(parents=True, exist_ok=True)
-        
-    filename = csv_dir / f"train_data_{date}_{from_station}_{to_station}.csv"
-    print(f"开始轮询存储: {filename} (高铁: {is_high_speed}, 学生: {is_student})")
-    
-    # 字段映射
-    fieldnames = [
-        "count", "train_code", "departure_station", "destination_station", "depart_time", "arrive_time", "during_time",
-        "business_class", "special_class", "first_class", "second_class", 
-        "soft_sleeper", "hard_sleeper", "hard_seat", "no_seat", "strict_mode", "hs"
-    ]
-    
+# CSV 字段映射
+CSV_FIELDNAMES = [
+    "count", "train_code", "departure_station", "destination_station", "depart_time", "arrive_time", "during_time",
+    "business_class", "special_class", "first_class", "second_class",
+    "soft_sleeper", "hard_sleeper", "hard_seat", "no_seat", "strict_mode", "hs"
+]
+# 读回 CSV 时除 count 外一律按字符串解析，与快照 / 共享结果中的行保持同一类型（如余票 "5" 而不是 5）
+CSV_DTYPES = {field: str for field in CSV_FIELDNAMES if field != "count"}
+
+# 同一会话内两次上游请求之间的最小间隔（秒）
+MIN_REQUEST_GAP = 1.0
+
+
+def csv_path(date, from_station, to_station):
+    return RESOURCE_DIR / "csv" / f"train_data_{date}_{from_station}_{to_station}.csv"
+
+
+def init_csv(filename):
+    """Create a fresh one-shot CSV file with only the header row."""
+    filename.parent.mkdir(parents=True, exist_ok=True)
+
     # 若文件已存在，先删除，保证为一次性文件
     if filename.exists():
         try:
             filename.unlink()
         except Exception as e:
-            print(f"删除旧文件失败: {e}")
+            logger.warning("删除旧文件失败: %s", e)
 
     # 写入表头
     with open(filename, mode='w', newline='', encoding='utf-8-sig') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDNAMES)
         writer.writeheader()
 
+
+def reset_route(filename, route):
+    """
+    Start a route over: a fresh CSV and no snapshot.
+
+    The two always go together, otherwise a snapshot left by an earlier run
+    (seq ahead of the new CSV) would be served and waited on as current.
+    """
+    init_csv(filename)
+    snapshot_store.reset(route)
+
+
+def last_count(filename):
+    """Highest poll count already written to a CSV (0 if none)."""
+    try:
+        with open(filename, newline='', encoding='utf-8-sig') as f:
+            return max((int(row["count"]) for row in csv.DictReader(f) if row.get("count")), default=0)
+    except FileNotFoundError:
+        return 0
+
+
+def result_rows(count, results, strict_mode):
+    """Convert one poll result to CSV rows, or a single __NO_DATA__ marker row when empty."""
+    if not results:
+        # 没有数据时，写入一条特殊的空记录，让前端知道查询已完成但无结果
+        row = {key: "" for key in CSV_FIELDNAMES}
+        row["count"] = count
+        row["train_code"] = "__NO_DATA__"  # 特殊标记表示无数据
+        row["strict_mode"] = "y" if strict_mode else "n"
+        return [row]
+
+    rows = []
+    for train in results:
+        rows.append({
+            "count": count,
+            "train_code": train.get('车次'),
+            "departure_station": train.get('出发站'),
+            "destination_station": train.get('到达站'),
+            "depart_time": train.get('出发时间'),
+            "arrive_time": train.get('到达时间'),
+            "during_time": train.get('历时'),
+            "business_class": train['余票'].get('商务座'),
+            "special_class": train['余票'].get('特等座'),
+            "first_class": train['余票'].get('一等座'),
+            "second_class": train['余票'].get('二等座'),
+            "soft_sleeper": train['余票'].get('软卧'),
+            "hard_sleeper": train['余票'].get('硬卧'),
+            "hard_seat": train['余票'].get('硬座'),
+            "no_seat": train['余票'].get('无座'),
+            "strict_mode": "y" if strict_mode else "n",
+            "hs": train.get('hs')
+        })
+    return rows
+
+
+def append_rows(filename, rows):
+    with open(filename, mode='a', newline='', encoding='utf-8-sig') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDNAMES)
+        writer.writerows(rows)
+
+
+def append_results(filename, count, results, strict_mode):
+    """Append one poll result to the CSV and return the rows written."""
+    rows = result_rows(count, results, strict_mode)
+    append_rows(filename, rows)
+    return rows
+
+
+def publish_poll(route, count, rows, interval, options):
+    """
+    Hand one poll result to the snapshot store (SSE, snapshot endpoint) and alert rules.
+
+    options is the crawler's (is_student, is_high_speed, strict_mode); alert
+    rules are keyed by route + options so differently filtered crawlers of one
+    route do not overwrite each other's last state.
+    """
+    snapshot_store.publish(route, count, rows, interval)
+    alert_engine.on_poll(tuple(route) + tuple(options), rows)
+
+
+def interruptible_sleep(sleep_time, should_stop=None, sleep_chunk=0.5):
+    """Sleep in small chunks; return True if should_stop fired meanwhile."""
+    slept = 0
+    while slept < sleep_time:
+        if should_stop and should_stop():
+            return True
+        time.sleep(min(sleep_chunk, sleep_time - slept))
+        slept += sleep_chunk
+    return False
+
+
+def start_polling_storage(from_station, to_station, date, is_student=False, is_high_speed=False, interval=5, strict_mode=False, should_stop=None,
+                          adaptive=False, min_interval=None, max_interval=None, start_count=1, reset_file=True, on_poll=None):
+    """
+    Start polling for train tickets and store results in CSV.
+    
+    Args:
+        should_stop: A callable that returns True when the crawler should stop
+        adaptive: Learn the interval from observed changes (see AdaptiveInterval),
+            bounded by min_interval / max_interval
+        start_count / reset_file: Continue an existing CSV instead of starting a new one
+        on_poll: Extra callback(count, rows, interval) after every poll
+
+    Returns:
+        The next count, so a caller can resume the same CSV later.
+    """
+    crawler = TicketCrawler()
+    scheduler = AdaptiveInterval(interval, date, min_interval, max_interval) if adaptive else None
+    current_interval = interval
+    count = start_count
+    
+    # 构建CSV存储路径 / Build CSV storage path
+    filename = csv_path(date, from_station, to_station)
+    route = route_extra(from_station, to_station, date)
+    logger.info("开始轮询存储: %s (高铁: %s, 学生: %s)", filename, is_high_speed, is_student)
+    if reset_file or not filename.exists():
+        reset_route(filename, (from_station, to_station, date))
+
     while True:
         # Check if should stop
         if should_stop and should_stop():
-            print(f"\n收到停止信号，停止轮询: {from_station} -> {to_station}")
-            break
+            logger.info("收到停止信号，停止轮询: %s -> %s", from_station, to_station)
+            return count
             
         try:
-            current_time = datetime.now().strftime("%H:%M:%S")
-            print(f"\n--- 第 {count} 次查询 ({current_time}) ---")
-            
+            logger.debug("--- 第 %d 次查询 ---", count, extra=route)
             results = crawler.query(from_station, to_station, date, is_student, is_high_speed, strict_mode)
-            
-            if results:
-                with open(filename, mode='a', newline='', encoding='utf-8-sig') as f:
-                    writer = csv.DictWriter(f, fieldnames=fieldnames)
-                    for train in results:
-                        row = {
-                            "count": count,
-                            "train_code": train.get('车次'),
-                            "departure_station": train.get('出发站'),
-                            "destination_station": train.get('到达站'),
-                            "depart_time": train.get('出发时间'),
-                            "arrive_time": train.get('到达时间'),
-                            "during_time": train.get('历时'),
-                            "business_class": train['余票'].get('商务座'),
-                            "special_class": train['余票'].get('特等座'),
-                            "first_class": train['余票'].get('一等座'),
-                            "second_class": train['余票'].get('二等座'),
-                            "soft_sleeper": train['余票'].get('软卧'),
-                            "hard_sleeper": train['余票'].get('硬卧'),
-                            "hard_seat": train['余票'].get('硬座'),
-                            "no_seat": train['余票'].get('无座'),
-                            "strict_mode": "y" if strict_mode else "n",
-                            "hs": train.get('hs')
-                        }
-                        writer.writerow(row)
-                print(f"已保存 {len(results)} 条数据到 {filename}")
+            if results is None:
+                # 请求失败（多为限流）：不写空记录、不计入变化率，退避后用同一 count 重试
+                logger.warning("第 %d 次查询失败，本次不记录", count, extra=route)
+                if scheduler:
+                    current_interval = scheduler.backoff()
             else:
-                # 没有数据时，写入一条特殊的空记录，让前端知道查询已完成但无结果
-                with open(filename, mode='a', newline='', encoding='utf-8-sig') as f:
-                    writer = csv.DictWriter(f, fieldnames=fieldnames)
-                    row = {
-                        "count": count,
-                        "train_code": "__NO_DATA__",  # 特殊标记表示无数据
-                        "departure_station": "",
-                        "destination_station": "",
-                        "depart_time": "",
-                        "arrive_time": "",
-                        "during_time": "",
-                        "business_class": "",
-                        "special_class": "",
-                        "first_class": "",
-                        "second_class": "",
-                        "soft_sleeper": "",
-                        "hard_sleeper": "",
-                        "hard_seat": "",
-                        "no_seat": "",
-                        "strict_mode": "y" if strict_mode else "n",
-                        "hs": ""
-                    }
-                    writer.writerow(row)
-                print("未查询到符合条件的车次，已写入空记录标记")
+                rows = append_results(filename, count, results, strict_mode)
+                if scheduler:
+                    current_interval = scheduler.observe(rows)
+                publish_poll((from_station, to_station, date), count, rows, current_interval, (is_student, is_high_speed, strict_mode))
+                if on_poll:
+                    on_poll(count, rows, current_interval)
+                if results:
+                    logger.info("已保存 %d 条数据到 %s", len(results), filename, extra=route)
+                else:
+                    logger.info("未查询到符合条件的车次，已写入空记录标记", extra=route)
+                count += 1
 
             # Check stop flag during sleep with smaller intervals for quicker response
-            sleep_time = random.uniform(interval * 0.7, interval)
-            print(f"等待 {sleep_time:.2f} 秒...")
-            
-            # Split sleep into smaller chunks to check stop flag more frequently
-            sleep_chunk = 0.5  # Check every 0.5 seconds
-            slept = 0
-            while slept < sleep_time:
-                if should_stop and should_stop():
-                    print(f"\n收到停止信号，停止轮询: {from_station} -> {to_station}")
-                    return
-                time.sleep(min(sleep_chunk, sleep_time - slept))
-                slept += sleep_chunk
-            
-            count += 1
+            sleep_time = random.uniform(current_interval * 0.7, current_interval)
+            logger.debug("等待 %.2f 秒...", sleep_time, extra=route)
+            if interruptible_sleep(sleep_time, should_stop):
+                logger.info("收到停止信号，停止轮询: %s -> %s", from_station, to_station)
+                return count
 
         except KeyboardInterrupt:
-            print("\n用户手动停止轮询")
-            break
-        except Exception as e:
-            print(f"轮询过程发生异常: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.info("用户手动停止轮询")
+            return count
+        except Exception:
+            logger.exception("轮询过程发生异常: %s -> %s", from_station, to_station)
             time.sleep(interval)
 
 
+def start_polling_range_storage(from_station, to_station, dates, is_student=False, is_high_speed=False, interval=5, strict_mode=False, should_stop=None,
+                                adaptive=False, min_interval=None, max_interval=None, coordinator=None, reset_files=True):
+    """
+    Poll one route across several dates with a single crawler session.
+
+    Every date is due again about `interval` seconds (or its adaptive interval)
+    after its last query; the most overdue date goes next, and consecutive
+    upstream requests stay at least MIN_REQUEST_GAP apart. Results are
+    written to the same per-date CSV files used by start_polling_storage.
+
+    Args:
+        dates: List of "YYYY-MM-DD" strings
+        should_stop: A callable that returns True when the crawler should stop
+        adaptive: Learn a separate interval per date (see AdaptiveInterval)
+        coordinator: Per-date leases across replicas (coordination.RangeCoordinator);
+            dates leased by another node are copied from its results instead of queried
+        reset_files: False continues existing per-date CSVs after their last count
+    """
+    if not dates:
+        return
+
+    crawler = TicketCrawler()
+    filenames = {date: csv_path(date, from_station, to_station) for date in dates}
+    counts = {date: 1 if reset_files else last_count(filename) + 1 for date, filename in filenames.items()}
+    for date, filename in filenames.items():
+        if reset_files or not filename.exists():
+            reset_route(filename, (from_station, to_station, date))
+
+    schedulers = {date: AdaptiveInterval(interval, date, min_interval, max_interval) for date in dates} if adaptive else {}
+    next_due = {date: 0.0 for date in dates}
+    last_request = 0.0
+    options = (is_student, is_high_speed, strict_mode)
+    logger.info("开始区间轮询: %s -> %s %s~%s (%d 天, 最小请求间隔 %.2fs)",
+                from_station, to_station, dates[0], dates[-1], len(dates), MIN_REQUEST_GAP)
+
+    while True:
+        if should_stop and should_stop():
+            logger.info("收到停止信号，停止区间轮询: %s -> %s", from_station, to_station)
+            return
+
+        date = min(dates, key=next_due.get)
+        now = time.time()
+        wait = max(next_due[date] - now, 0)
+        if coordinator is not None and not coordinator.owns(date):
+            # 其他副本持有该日期的租约：拷贝它的结果，不占用上游请求间隔
+            if wait > 0 and interruptible_sleep(wait, should_stop):
+                logger.info("收到停止信号，停止区间轮询: %s -> %s", from_station, to_station)
+                return
+            for rows, owner_interval in coordinator.follow(date):
+                for row in rows:
+                    row["count"] = counts[date]
+                append_rows(filenames[date], rows)
+                publish_poll((from_station, to_station, date), counts[date], rows, owner_interval, options)
+                counts[date] += 1
+            next_due[date] = time.time() + coordinator.follow_period(date, interval)
+            continue
+
+        wait = max(wait, last_request + MIN_REQUEST_GAP - now)
+        if wait > 0 and interruptible_sleep(wait, should_stop):
+            logger.info("收到停止信号，停止区间轮询: %s -> %s", from_station, to_station)
+            return
+
+        last_request = time.time()
+        current_interval = interval
+        try:
+            logger.debug("--- %s 第 %d 次查询 ---", date, counts[date], extra=route_extra(from_station, to_station, date))
+            results = crawler.query(from_station, to_station, date, is_student, is_high_speed, strict_mode)
+            if results is None:
+                logger.warning("%s 第 %d 次查询失败，本次不记录", date, counts[date], extra=route_extra(from_station, to_station, date))
+                if date in schedulers:
+                    current_interval = schedulers[date].backoff()
+            else:
+                rows = append_results(filenames[date], counts[date], results, strict_mode)
+                if date in schedulers:
+                    current_interval = schedulers[date].observe(rows)
+                publish_poll((from_station, to_station, date), counts[date], rows, current_interval, options)
+                if coordinator is not None:
+                    coordinator.published(date, counts[date], rows, current_interval)
+                counts[date] += 1
+        except KeyboardInterrupt:
+            logger.info("用户手动停止轮询")
+            return
+        except Exception:
+            logger.exception("区间轮询发生异常: %s -> %s (%s)", from_station, to_station, date)
+
+        next_due[date] = time.time() + random.uniform(current_interval * 0.7, current_interval)
+
 
 if __name__ == "__main__":
     FROM_STATION = "东莞东"
@@ -10,7 +10,10 @@ from utils.constant import BASE_DIR, JSON_DIR, JS_DIR
 def parse_station_names(file_path):
     with open(file_path, 'r', encoding='utf-8') as f:
         content = f.read()
+    return parse_station_content(content)
 
+
+def parse_station_content(content):
     # Extract the string content inside single quotes
     match = re.search(r"var station_names ='([^']+)';", content)
     if not match:
@@ -3,31 +3,82 @@ import re
 import json
 import os
 from utils.constant import BASE_DIR, JS_DIR
+
+
+class StationFetchError(Exception):
+    """station_name.js could not be downloaded (network error or bad status)."""
+
+
 class StationFetcher:
-    def __init__(self):
-        self.url = "https://kyfw.12306.cn/otn/resources/js/framework/station_name.js"
+    def __init__(self, url="https://kyfw.12306.cn/otn/resources/js/framework/station_name.js"):
+        self.url = url
         self.header = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
         self.output_dir = JS_DIR
+        # 缓存校验信息 (ETag / Last-Modified)，用于条件请求
+        self.meta_path = os.path.join(self.output_dir, "station_name.meta.json")
+        # 最近一次 200 响应的校验信息，内容应用成功后才由调用方 save_meta 落盘
+        self.validators = {}
 
-    def fetch(self):
+    def load_meta(self):
         try:
-            response = requests.get(self.url, headers=self.header, timeout=10)
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def save_meta(self, meta):
+        with open(self.meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=4)
+
+    def fetch(self, conditional=False):
+        """
+        Download station_name.js.
+
+        With conditional=True, sends If-None-Match / If-Modified-Since from the
+        last applied fetch and returns None on 304 Not Modified. The response's
+        validators are kept in self.validators; save them with save_meta() only
+        after the content has been applied, otherwise a failed apply would be
+        answered with 304 forever. Raises StationFetchError on failure.
+        """
+        headers = dict(self.header)
+        meta = self.load_meta() if conditional else {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+        try:
+            response = requests.get(self.url, headers=headers, timeout=10)
+            if response.status_code == 304:
+                return None
             response.raise_for_status()
             response.encoding = 'utf-8'
+
+            self.validators = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified")
+            }
             return response.text
         except requests.RequestException as e:
-            print(f"Error fetching station data: {e}")
-            return None
+            raise StationFetchError(f"Error fetching station data: {e}") from e
     def save_js(self,content,filename="station_name.js"):
         path = os.path.join(self.output_dir, filename)
-        with open(path, 'w', encoding='utf-8') as f:
+        # 先写临时文件再替换，避免读者看到写了一半的文件
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
             f.write(content)
+        os.replace(tmp_path, path)
     
-    def run(self):
-        content = self.fetch()
+    def run(self, conditional=False):
+        try:
+            content = self.fetch(conditional)
+        except StationFetchError as e:
+            print(e)
+            return None
         if content:
             self.save_js(content)
+            self.save_meta(self.validators)
+        return content
 
-    
\ No newline at end of file
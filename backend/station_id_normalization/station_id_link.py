@@ -1,22 +1,57 @@
 import json
 import os
 import sys
+import threading
+from types import MappingProxyType
+from typing import Mapping, NamedTuple
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils.constant import JSON_DIR
 from pathlib import Path
 
+class StationSnapshot(NamedTuple):
+    name_to_code: Mapping[str, str]
+    code_to_name: Mapping[str, str]
+
+
+EMPTY_SNAPSHOT = StationSnapshot(MappingProxyType({}), MappingProxyType({}))
+
+
 class StationIndexer:
+    """
+    Station name <-> code index shared by every crawler thread.
+
+    The two maps live in one immutable StationSnapshot that is replaced as a
+    whole (copy-on-write). Readers just grab the current reference and never
+    lock; writers serialize on _write_lock and only publish a new snapshot
+    when something actually changed.
+    """
     _instance = None
+    _instance_lock = threading.Lock()
 
     def __new__(cls):
         if cls._instance is None:
-            cls._instance = super(StationIndexer, cls).__new__(cls)
-            cls._instance.name_to_code = {}
-            cls._instance.code_to_name = {}
-            cls._instance.loaded = False
+            with cls._instance_lock:
+                if cls._instance is None:
+                    instance = super(StationIndexer, cls).__new__(cls)
+                    instance._snapshot = EMPTY_SNAPSHOT
+                    instance._write_lock = threading.Lock()
+                    instance._source = None
+                    instance.loaded = False
+                    cls._instance = instance
         return cls._instance
 
+    @property
+    def name_to_code(self):
+        return self._snapshot.name_to_code
+
+    @property
+    def code_to_name(self):
+        return self._snapshot.code_to_name
+
+    def snapshot(self):
+        return self._snapshot
+
     def load_data(self, json_path=None):
         if self.loaded and not json_path:
             return
@@ -28,38 +63,80 @@ class StationIndexer:
             print(f"Error: Station file not found at {json_path}")
             return
 
-        try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                for city in data:
-                    for station in city.get('stations', []):
-                        name = station.get('station')
-                        code = station.get('id')
-                        if name and code:
-                            self.name_to_code[name] = code
-                            self.code_to_name[code] = name
+        with self._write_lock:
+            # 同一文件未变化时不重复解析（每个 TicketCrawler 初始化都会调用）
+            source = (str(json_path), os.path.getmtime(json_path))
+            if self.loaded and self._source == source:
+                return
+
+            try:
+                with open(json_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                name_to_code, code_to_name = self.build_maps(data)
+                self._publish(name_to_code, code_to_name)
+                self._source = source
+                self.loaded = True
+                print(f"Index loaded: {len(name_to_code)} stations.")
+            except Exception as e:
+                print(f"Failed to load station index: {e}")
+
+    @staticmethod
+    def build_maps(data):
+        """Build fresh (name_to_code, code_to_name) dicts from station.json data."""
+        name_to_code = {}
+        code_to_name = {}
+        for city in data:
+            for station in city.get('stations', []):
+                name = station.get('station')
+                code = station.get('id')
+                if name and code:
+                    name_to_code[name] = code
+                    code_to_name[code] = name
+        return name_to_code, code_to_name
+
+    def swap(self, name_to_code, code_to_name):
+        with self._write_lock:
+            self._publish(name_to_code, code_to_name)
+            self._source = None
             self.loaded = True
-            print(f"Index loaded: {len(self.name_to_code)} stations.")
-        except Exception as e:
-            print(f"Failed to load station index: {e}")
+
+    def _publish(self, name_to_code, code_to_name):
+        # 新映射在外部完整构建后再整体替换引用，查询方不会看到构建中的字典
+        self._snapshot = StationSnapshot(MappingProxyType(name_to_code), MappingProxyType(code_to_name))
 
     def get_code(self, name):
         if not self.loaded:
             self.load_data()
-        return self.name_to_code.get(name)
+        return self._snapshot.name_to_code.get(name)
 
     def get_name(self, code):
         if not self.loaded:
             self.load_data()
-        return self.code_to_name.get(code, code)
+        return self._snapshot.code_to_name.get(code, code)
+
+    def _is_known(self, snapshot, map_info):
+        code_to_name = snapshot.code_to_name
+        name_to_code = snapshot.name_to_code
+        return all(code_to_name.get(code) == name and name_to_code.get(name) == code for code, name in map_info.items())
 
     def update_mapping(self, map_info):
         if not map_info:
             return
-        self.code_to_name.update(map_info)
-        # Simultaneously update reverse mapping
-        for code, name in map_info.items():
-            self.name_to_code[name] = code
+        # 预热后 map_info 基本都已收录，此时无锁直接返回
+        if self._is_known(self._snapshot, map_info):
+            return
+
+        with self._write_lock:
+            current = self._snapshot
+            if self._is_known(current, map_info):
+                return
+            code_to_name = dict(current.code_to_name)
+            name_to_code = dict(current.name_to_code)
+            code_to_name.update(map_info)
+            # Simultaneously update reverse mapping
+            for code, name in map_info.items():
+                name_to_code[name] = code
+            self._publish(name_to_code, code_to_name)
 
 # Global instance
 indexer = StationIndexer()
@@ -0,0 +1,76 @@
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.constant import JSON_DIR
+from station_id_normalization.fetch_staton_name import StationFetcher, StationFetchError
+from station_id_normalization.convert_station_name import parse_station_content
+from station_id_normalization.station_id_link import StationIndexer, indexer
+
+
+def diff_stations(old_code_to_name, new_code_to_name):
+    """Compare two code -> name maps and report added / removed / renamed stations."""
+    added = {code: name for code, name in new_code_to_name.items() if code not in old_code_to_name}
+    removed = {code: name for code, name in old_code_to_name.items() if code not in new_code_to_name}
+    renamed = {
+        code: (old_code_to_name[code], name)
+        for code, name in new_code_to_name.items()
+        if code in old_code_to_name and old_code_to_name[code] != name
+    }
+    return {"added": added, "removed": removed, "renamed": renamed}
+
+
+def write_station_json(data, output_path=None):
+    if output_path is None:
+        output_path = JSON_DIR / 'station.json'
+    tmp_path = str(output_path) + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+    os.replace(tmp_path, output_path)
+
+
+def refresh_stations(fetcher=None, station_indexer=None, output_path=None):
+    """
+    Conditionally re-fetch station_name.js and hot-swap the running index.
+
+    Returns None when upstream reports no change (304), otherwise the diff
+    produced by diff_stations plus the time spent applying it (ms). Raises
+    StationFetchError when the download fails or yields no stations; the
+    cache validators are only saved once the new index is live, so the next
+    refresh retries the download.
+    """
+    fetcher = fetcher or StationFetcher()
+    station_indexer = station_indexer or indexer
+
+    content = fetcher.fetch(conditional=True)
+    if content is None:
+        return None
+
+    begin = time.perf_counter()
+    data = parse_station_content(content)
+    if not data:
+        raise StationFetchError("No data extracted, keeping current station index.")
+
+    name_to_code, code_to_name = StationIndexer.build_maps(data)
+    if not station_indexer.loaded:
+        station_indexer.load_data()
+    diff = diff_stations(station_indexer.code_to_name, code_to_name)
+
+    fetcher.save_js(content)
+    write_station_json(data, output_path)
+    station_indexer.swap(name_to_code, code_to_name)
+    fetcher.save_meta(fetcher.validators)
+
+    diff["elapsed_ms"] = (time.perf_counter() - begin) * 1000
+    print(
+        f"Station index refreshed: +{len(diff['added'])} -{len(diff['removed'])} "
+        f"~{len(diff['renamed'])} in {diff['elapsed_ms']:.1f} ms"
+    )
+    return diff
+
+
+if __name__ == "__main__":
+    result = refresh_stations()
+    print("Not modified" if result is None else result)
@@ -0,0 +1,174 @@
+"""
+SegmentSearcher against a local stand-in for the 12306 endpoints.
+
+A small HTTP server answers leftTicket/queryG and czxx/queryByTrainNo for a
+few made-up trains through real stations; the real TicketCrawler is pointed
+at it. Covers the split-ticket merge, the persistent stop-list cache and
+its TTL, request spacing, and how the query cap is shared between trains.
+
+Usage (from backend/):
+    python -m pytest tests/test_segment_search.py
+"""
+import contextlib
+import io
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+
+from benchmarks.fixtures.record import response_body
+from crawler.segment_search import RateLimiter, SegmentSearcher, StopListCache
+from crawler.ticket_crawler import TicketCrawler
+from station_id_normalization.station_id_link import indexer
+from utils.constant import JSON_DIR
+
+# 车次 -> 经停站（运行顺序）
+TRAINS = {
+    "G1": ["广州南", "虎门", "深圳北", "福田"],
+    "G2": ["广州南", "虎门", "深圳北"],
+    "D3": ["光明城", "深圳北"],
+}
+# (车次, 出发, 到达) -> 有票的席别；未列出的区间无票
+SEATS = {
+    ("G1", "广州南", "深圳北"): {"second_class": "有"},
+    ("G1", "虎门", "福田"): {"second_class": "5", "first_class": "2"},
+    ("G2", "虎门", "深圳北"): {"second_class": "有"},
+}
+MIN_GAP = 0.2
+
+
+class StandIn(BaseHTTPRequestHandler):
+    calls = Counter()
+    started = []
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        StandIn.started.append(time.time())
+        if url.path.endswith("/leftTicket/queryG"):
+            StandIn.calls["query"] += 1
+            body = response_body(self.segment_rows(
+                indexer.get_name(params["leftTicketDTO.from_station"]),
+                indexer.get_name(params["leftTicketDTO.to_station"])
+            ))
+        elif url.path.endswith("/czxx/queryByTrainNo"):
+            StandIn.calls["stop_list"] += 1
+            stops = TRAINS[params["train_no"][:-2]]
+            body = {"data": {"data": [{"station_name": name} for name in stops]}}
+        else:
+            self.send_response(404)
+            self.end_headers()
+            return
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    @staticmethod
+    def segment_rows(from_station, to_station):
+        rows = []
+        for code, stops in TRAINS.items():
+            if from_station in stops and to_station in stops and stops.index(from_station) < stops.index(to_station):
+                row = {"train_code": code, "departure_station": from_station, "destination_station": to_station,
+                       "depart_time": "08:00", "arrive_time": "09:00", "during_time": "01:00"}
+                row.update(SEATS.get((code, from_station, to_station), {}))
+                rows.append(row)
+        return rows
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def crawler():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        indexer.load_data()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    # 跳过 __init__，不去 12306 初始化 Cookie
+    crawler = TicketCrawler.__new__(TicketCrawler)
+    crawler.session = requests.Session()
+    crawler.session.trust_env = False
+    crawler.station_codes_map = JSON_DIR / "station.json"
+    crawler.query_url = base_url + "/otn/leftTicket/queryG"
+    crawler.stop_list_url = base_url + "/otn/czxx/queryByTrainNo"
+    yield crawler
+    server.shutdown()
+    server.server_close()
+
+
+def search(crawler, cache):
+    StandIn.calls.clear()
+    StandIn.started.clear()
+    searcher = SegmentSearcher(crawler, cache=cache, limiter=RateLimiter(MIN_GAP))
+    results = searcher.search("虎门", "深圳北", "2026-02-01", seat_classes=["second_class"])
+    return {train["车次"]: train for train in results}
+
+
+def test_split_ticket_merge(crawler, tmp_path):
+    trains = search(crawler, StopListCache(str(tmp_path / "stop_lists.db")))
+
+    assert set(trains) == {"G1", "G2"}
+    # 直达无票的 G1 从覆盖该区间的更长区段拿到二等座
+    split = trains["G1"]["拆段余票"]["二等座"]
+    assert split["出发站"] in ("广州南", "虎门") and split["到达站"] in ("深圳北", "福田")
+    # G2 直达已有二等座，不需要拆段
+    assert trains["G2"]["拆段余票"] == {}
+    assert StandIn.calls["stop_list"] == 1
+    # 直达一次 + G1 的三个候选区段各一次
+    assert StandIn.calls["query"] == 1 + 3
+
+
+def test_requests_respect_min_gap(crawler, tmp_path):
+    search(crawler, StopListCache(str(tmp_path / "stop_lists.db")))
+    gaps = [b - a for a, b in zip(StandIn.started, StandIn.started[1:])]
+    assert min(gaps) >= MIN_GAP * 0.95
+
+
+def test_stop_list_cache(crawler, tmp_path):
+    path = str(tmp_path / "stop_lists.db")
+    search(crawler, StopListCache(path))
+    assert StandIn.calls["stop_list"] == 1
+
+    # 新实例读取同一文件：经停站来自持久缓存
+    search(crawler, StopListCache(path))
+    assert StandIn.calls["stop_list"] == 0
+
+    # 过期后重新请求
+    search(crawler, StopListCache(path, ttl=0))
+    assert StandIn.calls["stop_list"] == 1
+
+
+def test_query_cap_shared_between_trains():
+    stops = {code: [f"{code}-{k}" for k in range(3)] + ["A", "B"] + [f"{code}+{k}" for k in range(3)]
+             for code in ("T1", "T2", "T3")}
+    queried = []
+
+    class Crawler:
+        def query(self, from_station, to_station, *args):
+            if (from_station, to_station) == ("A", "B"):
+                return [{"车次": code, "列车编号": code + "00", "余票": {}} for code in stops]
+            queried.append((from_station, to_station))
+            return []
+
+    class Cache:
+        def get(self, train_no):
+            return stops[train_no[:-2]]
+
+        def put(self, *args):
+            pass
+
+    SegmentSearcher(Crawler(), cache=Cache(), limiter=RateLimiter(0), max_queries=6).search("A", "B", "2026-02-01")
+    # 每个车次只多走一站的两个区段优先于任何更长的区段
+    assert sorted(queried) == sorted(
+        [(f"{code}-2", "B") for code in stops] + [("A", f"{code}+0") for code in stops]
+    )
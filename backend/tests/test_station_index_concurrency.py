@@ -0,0 +1,133 @@
+"""
+Concurrency stress tests for the copy-on-write StationIndexer.
+
+Many threads call get_code / get_name / update_mapping on the global indexer
+while others keep reloading it, with a tiny GIL switch interval to force
+interleaving. Checks:
+  - no reader ever raises or sees a snapshot whose two maps disagree
+  - concurrent update_mapping calls never lose each other's entries
+  - merging already known map_info after warm-up publishes nothing new
+
+Usage (from backend/):
+    python -m pytest tests/test_station_index_concurrency.py
+"""
+import contextlib
+import io
+import itertools
+import sys
+import threading
+import time
+
+import pytest
+
+from station_id_normalization.station_id_link import indexer
+from utils.constant import JSON_DIR
+
+STATION_JSON = JSON_DIR / "station.json"
+NAMES = ["北京南", "上海虹桥", "广州南", "深圳北", "光明城", "东莞", "长沙南"]
+THREADS = 16
+SECONDS = 1.0
+
+
+def injected(writer, i):
+    # 测试写入的条目与真实车站不重名
+    return f"Z{writer:02d}{i:04d}", f"压测站{writer}-{i}"
+
+
+def reload_index():
+    indexer._source = None  # 强制重新解析 station.json
+    with contextlib.redirect_stdout(io.StringIO()):
+        indexer.load_data(STATION_JSON)
+
+
+class Stress:
+    def __init__(self, threads, seconds, reload):
+        self.threads = threads
+        self.seconds = seconds
+        self.reload = reload
+        self.stop = threading.Event()
+        self.errors = []
+        self.written = {}
+        self.lock = threading.Lock()
+
+    def fail(self, message):
+        with self.lock:
+            if len(self.errors) < 20:
+                self.errors.append(message)
+
+    def reader(self):
+        codes = [indexer.get_code(name) for name in NAMES]
+        while not self.stop.is_set():
+            try:
+                for name, code in zip(NAMES, codes):
+                    indexer.get_code(name)
+                    indexer.get_name(code)
+                snapshot = indexer.snapshot()
+                # 同一快照内压测条目必须双向一致
+                for code, name in itertools.islice(reversed(snapshot.code_to_name.items()), 50):
+                    if code.startswith("Z") and snapshot.name_to_code.get(name) != code:
+                        self.fail(f"torn snapshot: {code} -> {name} -> {snapshot.name_to_code.get(name)}")
+            except Exception as e:
+                self.fail(f"reader raised {e!r}")
+
+    def writer(self, writer):
+        i = 0
+        while not self.stop.is_set():
+            code, name = injected(writer, i)
+            try:
+                indexer.update_mapping({code: name})
+                # 上游 map 里大部分是已知条目
+                indexer.update_mapping({indexer.get_code(NAMES[i % len(NAMES)]): NAMES[i % len(NAMES)]})
+            except Exception as e:
+                self.fail(f"update_mapping raised {e!r}")
+            self.written[(writer, i)] = (code, name)
+            i += 1
+
+    def reloader(self):
+        while not self.stop.is_set():
+            reload_index()
+            time.sleep(0.01)
+
+    def run(self):
+        workers = [threading.Thread(target=self.reader) for _ in range(self.threads)]
+        workers += [threading.Thread(target=self.writer, args=(w,)) for w in range(self.threads // 4 or 1)]
+        if self.reload:
+            workers.append(threading.Thread(target=self.reloader))
+        for t in workers:
+            t.start()
+        time.sleep(self.seconds)
+        self.stop.set()
+        for t in workers:
+            t.join()
+        return self
+
+
+@pytest.fixture(autouse=True)
+def fresh_index():
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)
+    reload_index()
+    yield
+    sys.setswitchinterval(switch_interval)
+    reload_index()
+
+
+def test_concurrent_updates_are_not_lost():
+    stress = Stress(THREADS, SECONDS, reload=False).run()
+    assert stress.errors == []
+    snapshot = indexer.snapshot()
+    lost = [key for key, (code, name) in stress.written.items()
+            if snapshot.code_to_name.get(code) != name or snapshot.name_to_code.get(name) != code]
+    assert lost == []
+
+    # 预热后合并已知条目不应发布新快照
+    before = indexer.snapshot()
+    for code, name in list(stress.written.values())[:1000]:
+        indexer.update_mapping({code: name})
+    assert indexer.snapshot() is before
+
+
+def test_readers_during_reloads():
+    # 重新加载会整体替换映射，这里只检查一致性与异常
+    stress = Stress(THREADS, SECONDS, reload=True).run()
+    assert stress.errors == []
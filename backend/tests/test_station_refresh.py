@@ -0,0 +1,128 @@
+"""
+refresh_stations against a local stand-in for station_name.js.
+
+A small HTTP server plays the 12306 endpoint (ETag / Last-Modified, 304 on a
+matching If-None-Match) and walks the refresh through: first fetch, not
+modified, a broken upstream file, a changed file and an unreachable server.
+Output goes to a temporary directory; the repo's station files are only read.
+
+Usage (from backend/):
+    python -m pytest tests/test_station_refresh.py
+"""
+import contextlib
+import io
+import json
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from station_id_normalization.fetch_staton_name import StationFetcher, StationFetchError
+from station_id_normalization.station_id_link import indexer
+from station_id_normalization.station_refresh import refresh_stations
+from utils.constant import JS_DIR, JSON_DIR
+
+ADDED = "@csx|测试新站|CSX|ceshixinzhan|csxz|9999|9999|测试|||"
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """Serves `body` with `etag`; records the conditional headers it saw."""
+    body = ""
+    etag = None
+    requests = []
+
+    def do_GET(self):
+        StandIn.requests.append(self.headers.get("If-None-Match"))
+        if self.etag and self.headers.get("If-None-Match") == self.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        payload = self.body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/javascript; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("ETag", self.etag)
+        self.send_header("Last-Modified", formatdate(usegmt=True))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(body, etag):
+    StandIn.body, StandIn.etag = body, etag
+
+
+def quiet(func, *args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args)
+
+
+@pytest.fixture
+def server():
+    StandIn.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def fetcher(server, tmp_path):
+    fetcher = StationFetcher(f"http://127.0.0.1:{server.server_port}/station_name.js")
+    fetcher.output_dir = str(tmp_path)
+    fetcher.meta_path = str(tmp_path / "station_name.meta.json")
+    quiet(indexer.load_data)
+    yield fetcher
+    # 刷新会替换全局索引，测试结束后恢复为仓库里的车站数据
+    indexer._source = None
+    quiet(indexer.load_data, JSON_DIR / "station.json")
+
+
+def test_conditional_refresh(fetcher, tmp_path):
+    output_path = tmp_path / "station.json"
+    original = (JS_DIR / "station_name.js").read_text(encoding="utf-8")
+    code, name = "VAP", "北京北"
+    changed = original.replace(f"|{name}|{code}|", f"|{name}站|{code}|", 1).replace("';", ADDED + "';", 1)
+
+    def refresh():
+        return quiet(refresh_stations, fetcher, indexer, output_path)
+
+    def etag():
+        return fetcher.load_meta().get("etag")
+
+    serve(original, '"v1"')
+    assert refresh() is not None
+    assert etag() == '"v1"'
+
+    # 未变化的文件返回 304
+    assert refresh() is None
+    assert StandIn.requests[-1] == '"v1"'
+
+    # 没有车站的文件不能替换索引，也不能保存它的校验值
+    serve("var station_names_broken = '';", '"broken"')
+    with pytest.raises(StationFetchError):
+        refresh()
+    assert etag() == '"v1"'
+
+    serve(changed, '"v2"')
+    diff = refresh()
+    assert StandIn.requests[-1] == '"v1"'
+    assert "CSX" in diff["added"]
+    assert diff["renamed"].get(code) == (name, name + "站")
+    assert indexer.get_code("测试新站") == "CSX"
+    assert indexer.get_name(code) == name + "站"
+    # station.json 与 ETag 在替换成功后写入
+    assert etag() == '"v2"'
+    stations = json.loads(output_path.read_text(encoding="utf-8"))
+    assert any(s["id"] == "CSX" for city in stations for s in city["stations"])
+
+
+def test_unreachable_upstream(fetcher, server, tmp_path):
+    server.shutdown()
+    server.server_close()
+    with pytest.raises(StationFetchError):
+        quiet(refresh_stations, fetcher, indexer, tmp_path / "station.json")
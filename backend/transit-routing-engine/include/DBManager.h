@@ -5,6 +5,7 @@
 #include <vector>
 #include <sqlite3.h>
 #include <stdexcept>
+#include <functional>
 
 // 车站表
 struct Station {
@@ -44,10 +45,23 @@ struct TransferEdge
 	int to_station_line_id;
 	int transfer_time;
 };
+//跨城市连接边（两端车站属于不同城市的运行/换乘边）
+struct ConnectorEdge
+{
+	std::string from_city;
+	int from_station_line_id;
+	std::string to_city;
+	int to_station_line_id;
+	int time;
+	bool is_transfer;
+};
+
 class DBManager 
 {
 private:
 	sqlite3* db = nullptr;
+	// 执行查询，city 非空时绑定到 ?1，逐行回调
+	void forEachRow(const char* sql, const std::string* city, const std::function<void(sqlite3_stmt*)>& onRow);
 public:
 	explicit DBManager(const std::string& path);
 	~DBManager();
@@ -63,6 +77,14 @@ public:
 	std::vector<StationLine> get_StationLines();
 	std::vector<TravelEdge> get_TravelEdges();
 	std::vector<TransferEdge> get_TransferEdges();
+	// 按城市读取（分片加载用），边只包含两端都在该城市内的
+	std::vector<std::string> get_Cities();
+	std::vector<Station> get_Stations(const std::string& city);
+	std::vector<Line> get_Lines(const std::string& city);
+	std::vector<StationLine> get_StationLines(const std::string& city);
+	std::vector<TravelEdge> get_TravelEdges(const std::string& city);
+	std::vector<TransferEdge> get_TransferEdges(const std::string& city);
+	std::vector<ConnectorEdge> get_ConnectorEdges();
 };
 
 
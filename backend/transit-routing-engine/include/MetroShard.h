@@ -0,0 +1,67 @@
+#pragma once
+
+#include <string>
+#include <unordered_map>
+#include <utility>
+#include <vector>
+
+#include "DBManager.h"
+
+
+// 单个城市的线网图：可以独立从 DB 构建、序列化到文件、再从文件加载。
+// node 编号只在本分片内有效，跨城市的连接边由 ShardedMetroRouter 单独保存。
+class MetroShard {
+public:
+    struct Edge {
+        int to;
+        int weight;
+        int is_transfer;
+    };
+
+    static MetroShard fromDB(DBManager& db, const std::string& city);
+
+    // 二进制分片文件，格式版本不符时抛出 std::runtime_error
+    static MetroShard load(const std::string& path);
+    void save(const std::string& path) const;
+
+    const std::string& city() const { return city_; }
+    size_t nodeCount() const { return nodeStation.size(); }
+
+    // (车站名, 线路名) -> 本分片 node_id，不存在返回 -1
+    int nodeId(const std::string& station, const std::string& line) const;
+
+    // 全局 STATION_LINE_ID <-> 本分片 node_id（连接边用），不存在返回 -1
+    int nodeByStationLineId(int station_line_id) const;
+    int stationLineId(int node_id) const { return nodeStationLine[node_id]; }
+
+    std::pair<std::string, std::string> nodeName(int node_id) const;
+
+    // CSR 邻接表：node 的出边为 [edgesBegin, edgesEnd)
+    const Edge* edgesBegin(int node_id) const { return edges.data() + edgeOffsets[node_id]; }
+    const Edge* edgesEnd(int node_id) const { return edges.data() + edgeOffsets[node_id + 1]; }
+
+    // 常驻内存的估算值，用于 LRU 内存预算
+    size_t memoryBytes() const;
+
+private:
+    // 由序列化字段重建查找表
+    void buildIndex();
+
+    std::string city_;
+    std::vector<std::string> stationNames;
+    std::vector<std::string> lineNames;
+
+    // node_id -> 车站/线路下标、全局 STATION_LINE_ID
+    std::vector<int> nodeStation;
+    std::vector<int> nodeLine;
+    std::vector<int> nodeStationLine;
+
+    std::vector<int> edgeOffsets;
+    std::vector<Edge> edges;
+
+    // 查找表（不序列化）
+    std::unordered_map<std::string, int> stationIndex;
+    std::unordered_map<std::string, int> lineIndex;
+    std::unordered_map<long long, int> nodeIndex;
+    std::unordered_map<int, int> stationLineIndex;
+};
@@ -10,6 +10,16 @@
 
 class MetroToolkit {
 public:
+    // 等时圈查询结果
+    struct Reachable {
+        std::string station;
+        std::string line;
+        int time;
+    };
+
+    // (车站名, 线路名)
+    using StationLineName = std::pair<std::string, std::string>;
+
     explicit MetroToolkit(DBManager& db);
 
     // 查询接口（对外用）
@@ -17,14 +27,46 @@ public:
         const std::string& from_station,
         const std::string& from_line,
         const std::string& to_station,
-        const std::string& to_line);
+        const std::string& to_line) const;
 
     int queryTimeWithTransferPenalty(
         const std::string& from_station,
         const std::string& from_line,
         const std::string& to_station,
         const std::string& to_line,
-        int transfer_penalty);
+        int transfer_penalty) const;
+
+    // ===== 批量查询接口 =====
+    // 点对点批量：pairs 为 (from_node_id, to_node_id)，返回对应用时（不可达为 -1）
+    std::vector<int> queryTimeBatch(
+        const std::vector<std::pair<int, int>>& pairs,
+        int transfer_penalty = 0) const;
+
+    // 单源：一次搜索返回到所有 node 的用时（下标为 node_id，不可达为 -1）
+    std::vector<int> queryTimesFrom(
+        const std::string& from_station,
+        const std::string& from_line) const;
+
+    // 等时圈：time_budget 内可达的所有 (车站, 线路, 用时)，超出预算即停止搜索
+    std::vector<Reachable> queryIsochrone(
+        const std::string& from_station,
+        const std::string& from_line,
+        int time_budget) const;
+
+    // 多对多：返回 sources.size() x targets.size() 的用时表（不可达为 -1）
+    std::vector<std::vector<int>> queryTimeMatrix(
+        const std::vector<StationLineName>& sources,
+        const std::vector<StationLineName>& targets) const;
+
+    // node_id -> (车站名, 线路名)，用于解释 queryTimesFrom 的结果
+    size_t nodeCount() const { return nodes.size(); }
+    StationLineName nodeName(int node_id) const;
+
+    // (车站名, 线路名) -> node_id，供批量接口预先解析
+    int nodeId(const std::string& station, const std::string& line) const
+    {
+        return getNodeIdByName(station, line);
+    }
 private:
     // ===== 内部图结构 =====
     struct Node {
@@ -42,7 +84,17 @@ private:
     void buildGraph();
 
     // ===== 搜索 =====
-    int dijkstra(int start, int target) const;
+    int dijkstra(int start, int target, int transfer_penalty = 0) const;
+
+    // 单源搜索：填充 dist；time_budget < 0 表示不限，
+    // targets 非空时全部 settle 后提前结束
+    void dijkstraFrom(int start,
+        int time_budget,
+        const std::vector<int>& targets,
+        std::vector<int>& dist) const;
+
+    // 每个线程复用的 dist 缓冲区，避免每次查询重新分配
+    static std::vector<int>& scratchDist();
 
     // ===== 工具函数 =====
     int getNodeIdByName(const std::string& station,
@@ -60,7 +112,14 @@ private:
     // station_line_id -> node_id
     std::unordered_map<int, int> stationLineIdToNode;
 
+    // (station_id, line_id) -> node_id
+    std::unordered_map<long long, int> stationLineToNode;
+
     // name -> id 映射（查找加速）
     std::unordered_map<std::string, int> stationNameToId;
     std::unordered_map<std::string, int> lineNameToId;
+
+    // id -> name 反向映射（批量结果输出用）
+    std::unordered_map<int, std::string> stationIdToName;
+    std::unordered_map<int, std::string> lineIdToName;
 };
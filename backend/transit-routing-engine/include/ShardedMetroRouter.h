@@ -0,0 +1,96 @@
+#pragma once
+
+#include <list>
+#include <memory>
+#include <mutex>
+#include <string>
+#include <unordered_map>
+#include <vector>
+
+#include "DBManager.h"
+#include "MetroShard.h"
+
+
+// 按城市分片的路径查询：启动时只读取 线路->城市 目录和跨城连接边，
+// 每个城市的图在首次被查询用到时才从分片文件（缺失时从 DB 生成）加载，
+// 常驻分片超过内存预算时淘汰最久未使用的。
+class ShardedMetroRouter {
+public:
+    struct Stats {
+        size_t loaded_shards;
+        size_t resident_bytes;
+        size_t loads;
+        size_t evictions;
+    };
+
+    // memory_budget 为常驻分片的字节上限，0 表示不限
+    ShardedMetroRouter(DBManager& db, const std::string& shard_dir, size_t memory_budget = 0);
+
+    int queryTime(
+        const std::string& from_station,
+        const std::string& from_line,
+        const std::string& to_station,
+        const std::string& to_line) const;
+
+    int queryTimeWithTransferPenalty(
+        const std::string& from_station,
+        const std::string& from_line,
+        const std::string& to_station,
+        const std::string& to_line,
+        int transfer_penalty) const;
+
+    // 从 DB 重新生成全部分片文件（DB 更新后调用），已加载的分片随后按需重新加载
+    void exportShards();
+
+    std::vector<std::string> cities() const;
+    std::vector<std::string> loadedCities() const;
+    Stats stats() const;
+
+private:
+    using ShardPtr = std::shared_ptr<const MetroShard>;
+
+    struct Connector {
+        std::string to_city;
+        int to_station_line_id;
+        int weight;
+        bool is_transfer;
+    };
+
+    struct Resident {
+        ShardPtr shard;
+        std::list<std::string>::iterator lru_pos;
+        size_t bytes;
+    };
+
+    int search(const std::string& from_station,
+        const std::string& from_line,
+        const std::string& to_station,
+        const std::string& to_line,
+        int transfer_penalty) const;
+
+    const std::string& cityOfLine(const std::string& line) const;
+    std::string shardPath(const std::string& city) const;
+
+    // 取得分片（必要时加载），返回的 shared_ptr 在查询期间保证分片不被释放
+    ShardPtr acquire(const std::string& city) const;
+    MetroShard loadOrBuild(const std::string& city) const;
+    void evictLocked() const;
+
+private:
+    DBManager& db;
+    std::string shardDir;
+    size_t memoryBudget;
+
+    // 常驻目录：线路名 -> 城市，城市 -> (STATION_LINE_ID -> 连接边)
+    std::vector<std::string> cityNames;
+    std::unordered_map<std::string, std::string> lineCity;
+    std::unordered_map<std::string, std::unordered_map<int, std::vector<Connector>>> connectors;
+
+    // LRU 分片缓存，lru 头部为最近使用
+    mutable std::mutex cacheMutex;
+    mutable std::list<std::string> lru;
+    mutable std::unordered_map<std::string, Resident> resident;
+    mutable size_t residentBytes = 0;
+    mutable size_t loads = 0;
+    mutable size_t evictions = 0;
+};
@@ -0,0 +1,85 @@
+// BatchQueryBench.cpp
+// 批量查询 vs 循环单次查询 的耗时对比
+// 用法: batch-query-bench <db_path> [sources] [targets]
+#include <chrono>
+#include <iostream>
+#include <string>
+#include <vector>
+
+#include "DBManager.h"
+#include "MetroToolkit.h"
+
+using Clock = std::chrono::steady_clock;
+
+static double elapsedMs(Clock::time_point begin)
+{
+    return std::chrono::duration<double, std::milli>(Clock::now() - begin).count();
+}
+
+int main(int argc, char** argv)
+{
+    if (argc < 2) {
+        std::cerr << "Usage: " << argv[0] << " <db_path> [sources=20] [targets=5]" << std::endl;
+        return 1;
+    }
+
+    DBManager db(argv[1]);
+    MetroToolkit toolkit(db);
+
+    const size_t n = toolkit.nodeCount();
+    if (n == 0) {
+        std::cerr << "Empty graph" << std::endl;
+        return 1;
+    }
+    const size_t source_count = std::min<size_t>(argc > 2 ? std::stoul(argv[2]) : 20, n);
+    const size_t target_count = std::min<size_t>(argc > 3 ? std::stoul(argv[3]) : 5, n);
+
+    // 均匀取样作为源点 / 终点
+    std::vector<MetroToolkit::StationLineName> sources, targets;
+    for (size_t i = 0; i < source_count; ++i) {
+        sources.push_back(toolkit.nodeName(static_cast<int>(i * n / source_count)));
+    }
+    for (size_t i = 0; i < target_count; ++i) {
+        targets.push_back(toolkit.nodeName(static_cast<int>((i * n / target_count + n / 2) % n)));
+    }
+
+    // 1. 单源：一次 queryTimesFrom vs 对每个 node 调用 queryTime
+    const auto& [src_station, src_line] = sources.front();
+    auto begin = Clock::now();
+    for (size_t i = 0; i < n; ++i) {
+        auto [station, line] = toolkit.nodeName(static_cast<int>(i));
+        toolkit.queryTime(src_station, src_line, station, line);
+    }
+    double loop_ms = elapsedMs(begin);
+
+    begin = Clock::now();
+    auto times = toolkit.queryTimesFrom(src_station, src_line);
+    double batch_ms = elapsedMs(begin);
+
+    std::cout << "one-to-all (" << n << " nodes): loop " << loop_ms
+        << " ms, batch " << batch_ms << " ms" << std::endl;
+
+    // 2. 多对多：queryTimeMatrix vs 双层循环 queryTime
+    begin = Clock::now();
+    for (const auto& [fs, fl] : sources) {
+        for (const auto& [ts, tl] : targets) {
+            toolkit.queryTime(fs, fl, ts, tl);
+        }
+    }
+    loop_ms = elapsedMs(begin);
+
+    begin = Clock::now();
+    auto table = toolkit.queryTimeMatrix(sources, targets);
+    batch_ms = elapsedMs(begin);
+
+    std::cout << "many-to-many (" << source_count << "x" << target_count << "): loop " << loop_ms
+        << " ms, batch " << batch_ms << " ms" << std::endl;
+
+    // 3. 等时圈
+    begin = Clock::now();
+    auto reachable = toolkit.queryIsochrone(src_station, src_line, 40);
+    std::cout << "isochrone (40 min): " << reachable.size() << " nodes in "
+        << elapsedMs(begin) << " ms" << std::endl;
+
+    return 0;
+}
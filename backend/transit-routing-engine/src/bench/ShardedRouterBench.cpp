@@ -0,0 +1,81 @@
+// ShardedRouterBench.cpp
+// 整图 MetroToolkit vs 按城市分片的 ShardedMetroRouter：启动耗时、首次/重复查询耗时、常驻内存
+// 用法: sharded-router-bench <db_path> <shard_dir> [memory_budget_kb=0] [queries=200]
+#include <chrono>
+#include <filesystem>
+#include <iostream>
+#include <random>
+#include <string>
+#include <vector>
+
+#include "DBManager.h"
+#include "MetroToolkit.h"
+#include "ShardedMetroRouter.h"
+
+using Clock = std::chrono::steady_clock;
+
+static double elapsedMs(Clock::time_point begin)
+{
+    return std::chrono::duration<double, std::milli>(Clock::now() - begin).count();
+}
+
+static void printStats(const ShardedMetroRouter& router)
+{
+    auto stats = router.stats();
+    std::cout << "  resident: " << stats.loaded_shards << " shards, " << stats.resident_bytes / 1024
+        << " KB (loads " << stats.loads << ", evictions " << stats.evictions << ")" << std::endl;
+}
+
+int main(int argc, char** argv)
+{
+    if (argc < 3) {
+        std::cerr << "Usage: " << argv[0] << " <db_path> <shard_dir> [memory_budget_kb=0] [queries=200]" << std::endl;
+        return 1;
+    }
+
+    const std::string shard_dir = argv[2];
+    const size_t budget = argc > 3 ? std::stoul(argv[3]) * 1024 : 0;
+    const size_t query_count = argc > 4 ? std::stoul(argv[4]) : 200;
+
+    DBManager db(argv[1]);
+
+    auto begin = Clock::now();
+    MetroToolkit toolkit(db);
+    std::cout << "MetroToolkit startup (all cities): " << elapsedMs(begin) << " ms, "
+        << toolkit.nodeCount() << " nodes" << std::endl;
+
+    // 随机取样查询，按 MetroToolkit 的结果校验
+    std::mt19937 rng(7);
+    std::uniform_int_distribution<int> pick(0, static_cast<int>(toolkit.nodeCount()) - 1);
+    std::vector<std::pair<MetroToolkit::StationLineName, MetroToolkit::StationLineName>> queries;
+    for (size_t i = 0; i < query_count; ++i) {
+        queries.push_back({ toolkit.nodeName(pick(rng)), toolkit.nodeName(pick(rng)) });
+    }
+
+    std::filesystem::remove_all(shard_dir);
+    for (const char* phase : { "no shard files", "shard files on disk" }) {
+        std::cout << phase << ":" << std::endl;
+
+        begin = Clock::now();
+        ShardedMetroRouter router(db, shard_dir, budget);
+        std::cout << "  router startup: " << elapsedMs(begin) << " ms (" << router.cities().size() << " cities)" << std::endl;
+
+        const auto& [from, to] = queries.front();
+        begin = Clock::now();
+        router.queryTime(from.first, from.second, to.first, to.second);
+        std::cout << "  first query: " << elapsedMs(begin) << " ms" << std::endl;
+
+        size_t mismatches = 0;
+        begin = Clock::now();
+        for (const auto& [f, t] : queries) {
+            if (router.queryTime(f.first, f.second, t.first, t.second) != toolkit.queryTime(f.first, f.second, t.first, t.second)) {
+                ++mismatches;
+            }
+        }
+        std::cout << "  " << queries.size() << " queries (+ MetroToolkit check): " << elapsedMs(begin) << " ms, "
+            << mismatches << " mismatches" << std::endl;
+        printStats(router);
+    }
+
+    return 0;
+}
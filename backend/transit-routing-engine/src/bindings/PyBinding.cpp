@@ -1,6 +1,9 @@
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
+#include <pybind11/numpy.h>
 #include "DBManager.h"
+#include "MetroToolkit.h"
+#include "ShardedMetroRouter.h"
 
 namespace py = pybind11;
 
@@ -39,10 +42,143 @@ public:
 	std::vector<TransferEdge> get_TransferEdges() { return db_.get_TransferEdges(); }
 };
 
+/* ================= Routing ================= */
+
+// 查询期间释放 GIL，Flask 多线程可以并行调用；图在构造后只读
+class RoutingModule : public BaseNode {
+private:
+	MetroToolkit toolkit_;
+
+public:
+	explicit RoutingModule(const std::string& path)
+		: BaseNode(path), toolkit_(db_) {}
+
+	int queryTime(const std::string& from_station, const std::string& from_line,
+		const std::string& to_station, const std::string& to_line) const
+	{
+		return toolkit_.queryTime(from_station, from_line, to_station, to_line);
+	}
+
+	int queryTimeWithTransferPenalty(const std::string& from_station, const std::string& from_line,
+		const std::string& to_station, const std::string& to_line, int transfer_penalty) const
+	{
+		return toolkit_.queryTimeWithTransferPenalty(from_station, from_line, to_station, to_line, transfer_penalty);
+	}
+
+	py::array_t<int> queryTimesFrom(const std::string& from_station, const std::string& from_line) const
+	{
+		std::vector<int> dist;
+		{
+			py::gil_scoped_release release;
+			dist = toolkit_.queryTimesFrom(from_station, from_line);
+		}
+		return py::array_t<int>(dist.size(), dist.data());
+	}
+
+	std::vector<MetroToolkit::Reachable> queryIsochrone(const std::string& from_station,
+		const std::string& from_line, int time_budget) const
+	{
+		return toolkit_.queryIsochrone(from_station, from_line, time_budget);
+	}
+
+	py::array_t<int> queryTimeMatrix(const std::vector<MetroToolkit::StationLineName>& sources,
+		const std::vector<MetroToolkit::StationLineName>& targets) const
+	{
+		std::vector<std::vector<int>> table;
+		{
+			py::gil_scoped_release release;
+			table = toolkit_.queryTimeMatrix(sources, targets);
+		}
+
+		py::array_t<int> matrix({ sources.size(), targets.size() });
+		auto view = matrix.mutable_unchecked<2>();
+		for (size_t i = 0; i < table.size(); ++i) {
+			for (size_t j = 0; j < table[i].size(); ++j) {
+				view(i, j) = table[i][j];
+			}
+		}
+		return matrix;
+	}
+
+	// (station, line) 列表 -> node_id 数组，结果可反复传给 queryTimeBatch
+	py::array_t<int> resolveNodes(const std::vector<MetroToolkit::StationLineName>& names) const
+	{
+		py::array_t<int> ids(names.size());
+		auto view = ids.mutable_unchecked<1>();
+		for (size_t i = 0; i < names.size(); ++i) {
+			view(i) = toolkit_.nodeId(names[i].first, names[i].second);
+		}
+		return ids;
+	}
+
+	py::array_t<int> queryTimeBatch(py::array_t<int, py::array::c_style | py::array::forcecast> pairs,
+		int transfer_penalty) const
+	{
+		if (pairs.ndim() != 2 || pairs.shape(1) != 2) {
+			throw std::invalid_argument("pairs must be an (N, 2) array of node ids");
+		}
+
+		auto view = pairs.unchecked<2>();
+		std::vector<std::pair<int, int>> input(view.shape(0));
+		for (py::ssize_t i = 0; i < view.shape(0); ++i) {
+			input[i] = { view(i, 0), view(i, 1) };
+		}
+
+		std::vector<int> times;
+		{
+			py::gil_scoped_release release;
+			times = toolkit_.queryTimeBatch(input, transfer_penalty);
+		}
+		return py::array_t<int>(times.size(), times.data());
+	}
+
+	int nodeId(const std::string& station, const std::string& line) const { return toolkit_.nodeId(station, line); }
+	size_t nodeCount() const { return toolkit_.nodeCount(); }
+	MetroToolkit::StationLineName nodeName(int node_id) const { return toolkit_.nodeName(node_id); }
+};
+
+
+// 按城市分片懒加载；同一 DB 文件下可与 RoutingModule 共存
+class ShardedRoutingModule : public BaseNode {
+private:
+	ShardedMetroRouter router_;
+
+public:
+	ShardedRoutingModule(const std::string& path, const std::string& shard_dir, size_t memory_budget_mb)
+		: BaseNode(path), router_(db_, shard_dir, memory_budget_mb * 1024 * 1024) {}
+
+	int queryTime(const std::string& from_station, const std::string& from_line,
+		const std::string& to_station, const std::string& to_line) const
+	{
+		return router_.queryTime(from_station, from_line, to_station, to_line);
+	}
+
+	int queryTimeWithTransferPenalty(const std::string& from_station, const std::string& from_line,
+		const std::string& to_station, const std::string& to_line, int transfer_penalty) const
+	{
+		return router_.queryTimeWithTransferPenalty(from_station, from_line, to_station, to_line, transfer_penalty);
+	}
+
+	void exportShards() { router_.exportShards(); }
+	std::vector<std::string> cities() const { return router_.cities(); }
+	std::vector<std::string> loadedCities() const { return router_.loadedCities(); }
+
+	py::dict stats() const
+	{
+		auto s = router_.stats();
+		py::dict result;
+		result["loaded_shards"] = s.loaded_shards;
+		result["resident_bytes"] = s.resident_bytes;
+		result["loads"] = s.loads;
+		result["evictions"] = s.evictions;
+		return result;
+	}
+};
+
 
 PYBIND11_MODULE(DBManager, m)
 {
-	m.doc() = "Sqlite DBManage Module,including Input and Output classes";
+	m.doc() = "Sqlite DBManage Module,including Input and Output classes, plus RoutingModule for metro queries";
 
 	py::class_<Station>(m, "Station")
 		.def(py::init<>())
@@ -97,4 +233,45 @@ PYBIND11_MODULE(DBManager, m)
 		.def("get_StationLines", &OutputModule::get_StationLines)
 		.def("get_TravelEdges", &OutputModule::get_TravelEdges)
 		.def("get_TransferEdges", &OutputModule::get_TransferEdges);
+
+	py::class_<MetroToolkit::Reachable>(m, "Reachable")
+		.def_readonly("station", &MetroToolkit::Reachable::station)
+		.def_readonly("line", &MetroToolkit::Reachable::line)
+		.def_readonly("time", &MetroToolkit::Reachable::time);
+
+	py::class_<RoutingModule>(m, "RoutingModule", R"pbdoc(
+		RoutingModule class for metro travel time queries, including batch queries
+		)pbdoc")
+		.def(py::init<const std::string&>())
+		.def("queryTime", &RoutingModule::queryTime, py::call_guard<py::gil_scoped_release>())
+		.def("queryTimeWithTransferPenalty", &RoutingModule::queryTimeWithTransferPenalty,
+			py::call_guard<py::gil_scoped_release>())
+		.def("queryTimesFrom", &RoutingModule::queryTimesFrom,
+			"Single-source travel times to every node (-1 if unreachable), indexed by node id")
+		.def("queryIsochrone", &RoutingModule::queryIsochrone, py::call_guard<py::gil_scoped_release>(),
+			"All (station, line, time) reachable within time_budget, sorted by time")
+		.def("queryTimeMatrix", &RoutingModule::queryTimeMatrix,
+			"sources x targets travel time matrix as a numpy array (-1 if unreachable)")
+		.def("resolveNodes", &RoutingModule::resolveNodes,
+			"List of (station, line) to a numpy array of node ids")
+		.def("queryTimeBatch", &RoutingModule::queryTimeBatch, py::arg("pairs"), py::arg("transfer_penalty") = 0,
+			"Travel time for each row of an (N, 2) array of (from, to) node ids (-1 if unreachable)")
+		.def("nodeId", &RoutingModule::nodeId)
+		.def("nodeCount", &RoutingModule::nodeCount)
+		.def("nodeName", &RoutingModule::nodeName);
+
+	py::class_<ShardedRoutingModule>(m, "ShardedRoutingModule", R"pbdoc(
+		Metro travel time queries over per-city shards that load on first use
+		and are evicted least-recently-used beyond memory_budget_mb (0 = no limit)
+		)pbdoc")
+		.def(py::init<const std::string&, const std::string&, size_t>(),
+			py::arg("path"), py::arg("shard_dir"), py::arg("memory_budget_mb") = 0)
+		.def("queryTime", &ShardedRoutingModule::queryTime, py::call_guard<py::gil_scoped_release>())
+		.def("queryTimeWithTransferPenalty", &ShardedRoutingModule::queryTimeWithTransferPenalty,
+			py::call_guard<py::gil_scoped_release>())
+		.def("exportShards", &ShardedRoutingModule::exportShards, py::call_guard<py::gil_scoped_release>(),
+			"Rewrite every shard file from the database (call after the DB changes)")
+		.def("cities", &ShardedRoutingModule::cities)
+		.def("loadedCities", &ShardedRoutingModule::loadedCities, "Resident cities, most recently used first")
+		.def("stats", &ShardedRoutingModule::stats);
 }
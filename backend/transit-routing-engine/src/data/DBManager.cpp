@@ -305,3 +305,125 @@ std::vector<TransferEdge> DBManager::get_TransferEdges()
     sqlite3_finalize(stmt);
     return result;
 }
+
+// =======================
+// 按城市读取（分片）
+// =======================
+
+void DBManager::forEachRow(const char* sql, const std::string* city, const std::function<void(sqlite3_stmt*)>& onRow)
+{
+    sqlite3_stmt* stmt = nullptr;
+
+    int rc = sqlite3_prepare_v2(db, sql, -1, &stmt, nullptr);
+    if (rc != SQLITE_OK) {
+        throw std::runtime_error(sqlite3_errmsg(db));
+    }
+    if (city) {
+        sqlite3_bind_text(stmt, 1, city->c_str(), -1, SQLITE_TRANSIENT);
+    }
+
+    while ((rc = sqlite3_step(stmt)) == SQLITE_ROW) {
+        onRow(stmt);
+    }
+
+    if (rc != SQLITE_DONE) {
+        sqlite3_finalize(stmt);
+        throw std::runtime_error(sqlite3_errmsg(db));
+    }
+    sqlite3_finalize(stmt);
+}
+
+static std::string columnText(sqlite3_stmt* stmt, int col)
+{
+    const unsigned char* text = sqlite3_column_text(stmt, col);
+    return text ? reinterpret_cast<const char*>(text) : "";
+}
+
+std::vector<std::string> DBManager::get_Cities()
+{
+    std::vector<std::string> result;
+    forEachRow("SELECT DISTINCT CITY_NAME FROM STATION_LINE ORDER BY CITY_NAME;", nullptr,
+        [&](sqlite3_stmt* stmt) { result.push_back(columnText(stmt, 0)); });
+    return result;
+}
+
+std::vector<Station> DBManager::get_Stations(const std::string& city)
+{
+    std::vector<Station> result;
+    forEachRow("SELECT STATION_ID, STATION_NAME FROM STATIONS WHERE CITY_NAME = ?1;", &city,
+        [&](sqlite3_stmt* stmt) {
+            result.push_back({ city, sqlite3_column_int(stmt, 0), columnText(stmt, 1) });
+        });
+    return result;
+}
+
+std::vector<Line> DBManager::get_Lines(const std::string& city)
+{
+    std::vector<Line> result;
+    forEachRow("SELECT LINE_ID, LINE_NAME FROM LINES WHERE CITY_NAME = ?1;", &city,
+        [&](sqlite3_stmt* stmt) {
+            result.push_back({ city, sqlite3_column_int(stmt, 0), columnText(stmt, 1) });
+        });
+    return result;
+}
+
+std::vector<StationLine> DBManager::get_StationLines(const std::string& city)
+{
+    std::vector<StationLine> result;
+    forEachRow("SELECT STATION_LINE_ID, STATION_ID, LINE_ID FROM STATION_LINE WHERE CITY_NAME = ?1;", &city,
+        [&](sqlite3_stmt* stmt) {
+            result.push_back({ city, sqlite3_column_int(stmt, 0), sqlite3_column_int(stmt, 1), sqlite3_column_int(stmt, 2) });
+        });
+    return result;
+}
+
+std::vector<TravelEdge> DBManager::get_TravelEdges(const std::string& city)
+{
+    std::vector<TravelEdge> result;
+    forEachRow(
+        "SELECT e.FROM_STATION, e.TO_STATION, e.TRAVEL_TIME FROM TRAVELEDGES e "
+        "JOIN STATION_LINE a ON a.STATION_LINE_ID = e.FROM_STATION "
+        "JOIN STATION_LINE b ON b.STATION_LINE_ID = e.TO_STATION "
+        "WHERE a.CITY_NAME = ?1 AND b.CITY_NAME = ?1;", &city,
+        [&](sqlite3_stmt* stmt) {
+            result.push_back({ city, sqlite3_column_int(stmt, 0), sqlite3_column_int(stmt, 1), sqlite3_column_int(stmt, 2) });
+        });
+    return result;
+}
+
+std::vector<TransferEdge> DBManager::get_TransferEdges(const std::string& city)
+{
+    std::vector<TransferEdge> result;
+    forEachRow(
+        "SELECT e.FROM_STATION, e.TO_STATION, e.TRANSFER_TIME FROM TRANSFEREDGES e "
+        "JOIN STATION_LINE a ON a.STATION_LINE_ID = e.FROM_STATION "
+        "JOIN STATION_LINE b ON b.STATION_LINE_ID = e.TO_STATION "
+        "WHERE a.CITY_NAME = ?1 AND b.CITY_NAME = ?1;", &city,
+        [&](sqlite3_stmt* stmt) {
+            result.push_back({ city, sqlite3_column_int(stmt, 0), sqlite3_column_int(stmt, 1), sqlite3_column_int(stmt, 2) });
+        });
+    return result;
+}
+
+std::vector<ConnectorEdge> DBManager::get_ConnectorEdges()
+{
+    std::vector<ConnectorEdge> result;
+    forEachRow(
+        "SELECT a.CITY_NAME, e.FROM_STATION, b.CITY_NAME, e.TO_STATION, e.TRAVEL_TIME, 0 FROM TRAVELEDGES e "
+        "JOIN STATION_LINE a ON a.STATION_LINE_ID = e.FROM_STATION "
+        "JOIN STATION_LINE b ON b.STATION_LINE_ID = e.TO_STATION "
+        "WHERE a.CITY_NAME <> b.CITY_NAME "
+        "UNION ALL "
+        "SELECT a.CITY_NAME, e.FROM_STATION, b.CITY_NAME, e.TO_STATION, e.TRANSFER_TIME, 1 FROM TRANSFEREDGES e "
+        "JOIN STATION_LINE a ON a.STATION_LINE_ID = e.FROM_STATION "
+        "JOIN STATION_LINE b ON b.STATION_LINE_ID = e.TO_STATION "
+        "WHERE a.CITY_NAME <> b.CITY_NAME;", nullptr,
+        [&](sqlite3_stmt* stmt) {
+            result.push_back({
+                columnText(stmt, 0), sqlite3_column_int(stmt, 1),
+                columnText(stmt, 2), sqlite3_column_int(stmt, 3),
+                sqlite3_column_int(stmt, 4), sqlite3_column_int(stmt, 5) != 0
+            });
+        });
+    return result;
+}
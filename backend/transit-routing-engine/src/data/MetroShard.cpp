@@ -0,0 +1,249 @@
+#include "MetroShard.h"
+
+#include <cstdint>
+#include <fstream>
+#include <stdexcept>
+#include <type_traits>
+
+namespace {
+
+const char SHARD_MAGIC[4] = { 'M', 'S', 'H', 'D' };
+const uint32_t SHARD_VERSION = 1;
+
+long long nodeKey(int station, int line)
+{
+    return (static_cast<long long>(station) << 32) | static_cast<unsigned int>(line);
+}
+
+template <typename T>
+void writePod(std::ofstream& out, const T& value)
+{
+    static_assert(std::is_trivially_copyable<T>::value, "POD only");
+    out.write(reinterpret_cast<const char*>(&value), sizeof(T));
+}
+
+template <typename T>
+void readPod(std::ifstream& in, T& value)
+{
+    in.read(reinterpret_cast<char*>(&value), sizeof(T));
+    if (!in) throw std::runtime_error("Truncated shard file");
+}
+
+template <typename T>
+void writeVector(std::ofstream& out, const std::vector<T>& values)
+{
+    writePod(out, static_cast<uint64_t>(values.size()));
+    out.write(reinterpret_cast<const char*>(values.data()), sizeof(T) * values.size());
+}
+
+template <typename T>
+void readVector(std::ifstream& in, std::vector<T>& values)
+{
+    uint64_t size = 0;
+    readPod(in, size);
+    values.resize(size);
+    in.read(reinterpret_cast<char*>(values.data()), sizeof(T) * size);
+    if (!in) throw std::runtime_error("Truncated shard file");
+}
+
+void writeStrings(std::ofstream& out, const std::vector<std::string>& values)
+{
+    writePod(out, static_cast<uint64_t>(values.size()));
+    for (const auto& s : values) {
+        writePod(out, static_cast<uint32_t>(s.size()));
+        out.write(s.data(), s.size());
+    }
+}
+
+void readStrings(std::ifstream& in, std::vector<std::string>& values)
+{
+    uint64_t size = 0;
+    readPod(in, size);
+    values.resize(size);
+    for (auto& s : values) {
+        uint32_t length = 0;
+        readPod(in, length);
+        s.resize(length);
+        in.read(&s[0], length);
+        if (!in) throw std::runtime_error("Truncated shard file");
+    }
+}
+
+} // namespace
+
+// =======================
+// 从 DB 构建
+// =======================
+
+MetroShard MetroShard::fromDB(DBManager& db, const std::string& city)
+{
+    MetroShard shard;
+    shard.city_ = city;
+
+    // 全局 id -> 分片内下标
+    std::unordered_map<int, int> stationPos, linePos;
+    for (const auto& s : db.get_Stations(city)) {
+        stationPos[s.station_id] = static_cast<int>(shard.stationNames.size());
+        shard.stationNames.push_back(s.name);
+    }
+    for (const auto& l : db.get_Lines(city)) {
+        linePos[l.line_id] = static_cast<int>(shard.lineNames.size());
+        shard.lineNames.push_back(l.name);
+    }
+
+    std::unordered_map<int, int> nodeOf;
+    for (const auto& sl : db.get_StationLines(city)) {
+        nodeOf[sl.station_line_id] = static_cast<int>(shard.nodeStation.size());
+        shard.nodeStation.push_back(stationPos.at(sl.station_id));
+        shard.nodeLine.push_back(linePos.at(sl.line_id));
+        shard.nodeStationLine.push_back(sl.station_line_id);
+    }
+
+    // 先收集 (from, edge)，再按 from 排成 CSR
+    std::vector<std::pair<int, Edge>> all;
+    for (const auto& e : db.get_TravelEdges(city)) {
+        all.push_back({ nodeOf.at(e.from_station_line_id), { nodeOf.at(e.to_station_line_id), e.travel_time, 0 } });
+    }
+    for (const auto& e : db.get_TransferEdges(city)) {
+        all.push_back({ nodeOf.at(e.from_station_line_id), { nodeOf.at(e.to_station_line_id), e.transfer_time, 1 } });
+    }
+
+    shard.edgeOffsets.assign(shard.nodeCount() + 1, 0);
+    for (const auto& [from, e] : all) {
+        ++shard.edgeOffsets[from + 1];
+    }
+    for (size_t i = 1; i < shard.edgeOffsets.size(); ++i) {
+        shard.edgeOffsets[i] += shard.edgeOffsets[i - 1];
+    }
+    shard.edges.resize(all.size());
+    std::vector<int> cursor(shard.edgeOffsets.begin(), shard.edgeOffsets.end() - 1);
+    for (const auto& [from, e] : all) {
+        shard.edges[cursor[from]++] = e;
+    }
+
+    shard.buildIndex();
+    return shard;
+}
+
+// =======================
+// 序列化
+// =======================
+
+void MetroShard::save(const std::string& path) const
+{
+    // 先写临时文件再改名，其他进程不会读到写了一半的分片
+    const std::string tmp = path + ".tmp";
+    {
+        std::ofstream out(tmp, std::ios::binary | std::ios::trunc);
+        if (!out) throw std::runtime_error("Cannot write shard file: " + tmp);
+
+        out.write(SHARD_MAGIC, sizeof(SHARD_MAGIC));
+        writePod(out, SHARD_VERSION);
+        writeStrings(out, { city_ });
+        writeStrings(out, stationNames);
+        writeStrings(out, lineNames);
+        writeVector(out, nodeStation);
+        writeVector(out, nodeLine);
+        writeVector(out, nodeStationLine);
+        writeVector(out, edgeOffsets);
+        writeVector(out, edges);
+        if (!out) throw std::runtime_error("Cannot write shard file: " + tmp);
+    }
+    if (std::rename(tmp.c_str(), path.c_str()) != 0) {
+        std::remove(tmp.c_str());
+        throw std::runtime_error("Cannot replace shard file: " + path);
+    }
+}
+
+MetroShard MetroShard::load(const std::string& path)
+{
+    std::ifstream in(path, std::ios::binary);
+    if (!in) throw std::runtime_error("Cannot open shard file: " + path);
+
+    char magic[sizeof(SHARD_MAGIC)] = {};
+    uint32_t version = 0;
+    in.read(magic, sizeof(magic));
+    readPod(in, version);
+    if (std::string(magic, sizeof(magic)) != std::string(SHARD_MAGIC, sizeof(SHARD_MAGIC)) || version != SHARD_VERSION) {
+        throw std::runtime_error("Unsupported shard file: " + path);
+    }
+
+    MetroShard shard;
+    std::vector<std::string> city;
+    readStrings(in, city);
+    if (city.size() != 1) throw std::runtime_error("Corrupt shard file: " + path);
+    shard.city_ = city.front();
+    readStrings(in, shard.stationNames);
+    readStrings(in, shard.lineNames);
+    readVector(in, shard.nodeStation);
+    readVector(in, shard.nodeLine);
+    readVector(in, shard.nodeStationLine);
+    readVector(in, shard.edgeOffsets);
+    readVector(in, shard.edges);
+
+    if (shard.edgeOffsets.size() != shard.nodeCount() + 1 || shard.edgeOffsets.back() != static_cast<int>(shard.edges.size())) {
+        throw std::runtime_error("Corrupt shard file: " + path);
+    }
+
+    shard.buildIndex();
+    return shard;
+}
+
+void MetroShard::buildIndex()
+{
+    for (size_t i = 0; i < stationNames.size(); ++i) {
+        stationIndex[stationNames[i]] = static_cast<int>(i);
+    }
+    for (size_t i = 0; i < lineNames.size(); ++i) {
+        lineIndex[lineNames[i]] = static_cast<int>(i);
+    }
+    for (size_t i = 0; i < nodeCount(); ++i) {
+        nodeIndex[nodeKey(nodeStation[i], nodeLine[i])] = static_cast<int>(i);
+        stationLineIndex[nodeStationLine[i]] = static_cast<int>(i);
+    }
+}
+
+// =======================
+// 查找
+// =======================
+
+int MetroShard::nodeId(const std::string& station, const std::string& line) const
+{
+    auto s_it = stationIndex.find(station);
+    auto l_it = lineIndex.find(line);
+    if (s_it == stationIndex.end() || l_it == lineIndex.end()) {
+        return -1;
+    }
+
+    auto n_it = nodeIndex.find(nodeKey(s_it->second, l_it->second));
+    return n_it == nodeIndex.end() ? -1 : n_it->second;
+}
+
+int MetroShard::nodeByStationLineId(int station_line_id) const
+{
+    auto it = stationLineIndex.find(station_line_id);
+    return it == stationLineIndex.end() ? -1 : it->second;
+}
+
+std::pair<std::string, std::string> MetroShard::nodeName(int node_id) const
+{
+    if (node_id < 0 || node_id >= static_cast<int>(nodeCount())) {
+        throw std::out_of_range("node_id out of range");
+    }
+    return { stationNames[nodeStation[node_id]], lineNames[nodeLine[node_id]] };
+}
+
+size_t MetroShard::memoryBytes() const
+{
+    // 哈希表按每个元素约 (key + value + 节点指针 + 桶) 粗略估计
+    const size_t hashOverhead = 4 * sizeof(void*);
+
+    size_t bytes = sizeof(MetroShard) + city_.capacity();
+    for (const auto& s : stationNames) bytes += sizeof(std::string) + s.capacity() + sizeof(int) + hashOverhead + sizeof(std::string);
+    for (const auto& s : lineNames) bytes += sizeof(std::string) + s.capacity() + sizeof(int) + hashOverhead + sizeof(std::string);
+    bytes += (nodeStation.capacity() + nodeLine.capacity() + nodeStationLine.capacity() + edgeOffsets.capacity()) * sizeof(int);
+    bytes += edges.capacity() * sizeof(Edge);
+    bytes += nodeIndex.size() * (sizeof(long long) + sizeof(int) + hashOverhead);
+    bytes += stationLineIndex.size() * (2 * sizeof(int) + hashOverhead);
+    return bytes;
+}
@@ -3,6 +3,16 @@
 #include <queue>
 #include <stdexcept>
 #include <functional>
+#include <algorithm>
+
+namespace {
+
+long long stationLineKey(int station_id, int line_id)
+{
+    return (static_cast<long long>(station_id) << 32) | static_cast<unsigned int>(line_id);
+}
+
+} // namespace
 
 // =======================
 // 构造 & 初始化
@@ -14,10 +24,12 @@ MetroToolkit::MetroToolkit(DBManager& db_)
     // 预加载 name -> id
     for (const auto& s : db.get_Stations()) {
         stationNameToId[s.name] = s.station_id;
+        stationIdToName[s.station_id] = s.name;
     }
 
     for (const auto& l : db.get_Lines()) {
         lineNameToId[l.name] = l.line_id;
+        lineIdToName[l.line_id] = l.name;
     }
 
     buildGraph();
@@ -38,6 +50,7 @@ void MetroToolkit::buildGraph()
         int node_id = static_cast<int>(nodes.size());
         nodes.push_back({ sl.station_id, sl.line_id });
         stationLineIdToNode[sl.station_line_id] = node_id;
+        stationLineToNode[stationLineKey(sl.station_id, sl.line_id)] = node_id;
     }
 
     graph.resize(nodes.size());
@@ -64,7 +77,7 @@ void MetroToolkit::buildGraph()
 int MetroToolkit::queryTime(const std::string& from_station,
     const std::string& from_line,
     const std::string& to_station,
-    const std::string& to_line)
+    const std::string& to_line) const
 {
     int start = getNodeIdByName(from_station, from_line);
     int target = getNodeIdByName(to_station, to_line);
@@ -87,27 +100,29 @@ int MetroToolkit::getNodeIdByName(const std::string& station,
         throw std::runtime_error("Unknown station or line name");
     }
 
-    int station_id = s_it->second;
-    int line_id = l_it->second;
-
-    for (size_t i = 0; i < nodes.size(); ++i) {
-        if (nodes[i].station_id == station_id &&
-            nodes[i].line_id == line_id) {
-            return static_cast<int>(i);
-        }
+    auto n_it = stationLineToNode.find(stationLineKey(s_it->second, l_it->second));
+    if (n_it == stationLineToNode.end()) {
+        throw std::runtime_error("Station-line combination not found");
     }
 
-    throw std::runtime_error("Station-line combination not found");
+    return n_it->second;
 }
 
 // =======================
 // Dijkstra（核心复杂性）
 // =======================
 
-int MetroToolkit::dijkstra(int start, int target) const
+std::vector<int>& MetroToolkit::scratchDist()
+{
+    thread_local std::vector<int> dist;
+    return dist;
+}
+
+int MetroToolkit::dijkstra(int start, int target, int transfer_penalty) const
 {
     const int INF = std::numeric_limits<int>::max();
-    std::vector<int> dist(nodes.size(), INF);
+    auto& dist = scratchDist();
+    dist.assign(nodes.size(), INF);
 
     using State = std::pair<int, int>; // (dist, node)
     std::priority_queue<State, std::vector<State>, std::greater<>> pq;
@@ -127,7 +142,13 @@ int MetroToolkit::dijkstra(int start, int target) const
 
         for (const auto& e : graph[u]) {
             int v = e.to;
-            int nd = cur_dist + e.weight;
+
+            int cost = e.weight;
+            if (e.is_transfer) {
+                cost += transfer_penalty;
+            }
+
+            int nd = cur_dist + cost;
 
             if (nd < dist[v]) {
                 dist[v] = nd;
@@ -144,13 +165,35 @@ int MetroToolkit::queryTimeWithTransferPenalty(
     const std::string& from_line,
     const std::string& to_station,
     const std::string& to_line,
-    int transfer_penalty)
+    int transfer_penalty) const
 {
     int start = getNodeIdByName(from_station, from_line);
     int target = getNodeIdByName(to_station, to_line);
 
+    return dijkstra(start, target, transfer_penalty);
+}
+
+// =======================
+// 批量查询
+// =======================
+
+void MetroToolkit::dijkstraFrom(int start,
+    int time_budget,
+    const std::vector<int>& targets,
+    std::vector<int>& dist) const
+{
     const int INF = std::numeric_limits<int>::max();
-    std::vector<int> dist(nodes.size(), INF);
+    dist.assign(nodes.size(), INF);
+
+    // 目标集合：全部 settle 后即可提前结束
+    std::vector<char> is_target(targets.empty() ? 0 : nodes.size(), 0);
+    size_t remaining = 0;
+    for (int t : targets) {
+        if (!is_target[t]) {
+            is_target[t] = 1;
+            ++remaining;
+        }
+    }
 
     using State = std::pair<int, int>; // (dist, node)
     std::priority_queue<State, std::vector<State>, std::greater<>> pq;
@@ -162,21 +205,19 @@ int MetroToolkit::queryTimeWithTransferPenalty(
         auto [cur_dist, u] = pq.top();
         pq.pop();
 
-        if (u == target) {
-            return cur_dist;
-        }
-
         if (cur_dist > dist[u]) continue;
 
-        for (const auto& e : graph[u]) {
-            int v = e.to;
+        // 堆顶已超出预算，剩余节点只会更远
+        if (time_budget >= 0 && cur_dist > time_budget) break;
 
-            int cost = e.weight;
-            if (e.is_transfer) {
-                cost += transfer_penalty;
-            }
+        if (remaining > 0 && is_target[u]) {
+            is_target[u] = 0;
+            if (--remaining == 0) break;
+        }
 
-            int nd = cur_dist + cost;
+        for (const auto& e : graph[u]) {
+            int v = e.to;
+            int nd = cur_dist + e.weight;
 
             if (nd < dist[v]) {
                 dist[v] = nd;
@@ -184,6 +225,110 @@ int MetroToolkit::queryTimeWithTransferPenalty(
             }
         }
     }
+}
+
+std::vector<int> MetroToolkit::queryTimesFrom(
+    const std::string& from_station,
+    const std::string& from_line) const
+{
+    int start = getNodeIdByName(from_station, from_line);
+
+    std::vector<int> dist;
+    dijkstraFrom(start, -1, {}, dist);
+
+    const int INF = std::numeric_limits<int>::max();
+    for (auto& d : dist) {
+        if (d == INF) d = -1;
+    }
+    return dist;
+}
+
+std::vector<MetroToolkit::Reachable> MetroToolkit::queryIsochrone(
+    const std::string& from_station,
+    const std::string& from_line,
+    int time_budget) const
+{
+    if (time_budget < 0) {
+        throw std::invalid_argument("time_budget must be non-negative");
+    }
+
+    int start = getNodeIdByName(from_station, from_line);
+
+    auto& dist = scratchDist();
+    dijkstraFrom(start, time_budget, {}, dist);
+
+    std::vector<Reachable> result;
+    for (size_t i = 0; i < dist.size(); ++i) {
+        if (dist[i] <= time_budget) {
+            auto [station, line] = nodeName(static_cast<int>(i));
+            result.push_back({ station, line, dist[i] });
+        }
+    }
+
+    std::sort(result.begin(), result.end(),
+        [](const Reachable& a, const Reachable& b) { return a.time < b.time; });
+    return result;
+}
+
+std::vector<std::vector<int>> MetroToolkit::queryTimeMatrix(
+    const std::vector<StationLineName>& sources,
+    const std::vector<StationLineName>& targets) const
+{
+    std::vector<int> target_ids;
+    target_ids.reserve(targets.size());
+    for (const auto& [station, line] : targets) {
+        target_ids.push_back(getNodeIdByName(station, line));
+    }
+
+    const int INF = std::numeric_limits<int>::max();
+    std::vector<std::vector<int>> table;
+    table.reserve(sources.size());
+
+    // 每个源点只做一次搜索，所有目标 settle 后提前结束
+    auto& dist = scratchDist();
+    for (const auto& [station, line] : sources) {
+        int start = getNodeIdByName(station, line);
+        dijkstraFrom(start, -1, target_ids, dist);
+
+        std::vector<int> row;
+        row.reserve(target_ids.size());
+        for (int t : target_ids) {
+            row.push_back(dist[t] == INF ? -1 : dist[t]);
+        }
+        table.push_back(std::move(row));
+    }
+    return table;
+}
+
+std::vector<int> MetroToolkit::queryTimeBatch(
+    const std::vector<std::pair<int, int>>& pairs,
+    int transfer_penalty) const
+{
+    const int n = static_cast<int>(nodes.size());
+
+    std::vector<int> result;
+    result.reserve(pairs.size());
+    for (const auto& [start, target] : pairs) {
+        if (start < 0 || start >= n || target < 0 || target >= n) {
+            throw std::out_of_range("node_id out of range");
+        }
+        result.push_back(dijkstra(start, target, transfer_penalty));
+    }
+    return result;
+}
+
+MetroToolkit::StationLineName MetroToolkit::nodeName(int node_id) const
+{
+    if (node_id < 0 || node_id >= static_cast<int>(nodes.size())) {
+        throw std::out_of_range("node_id out of range");
+    }
+
+    const auto& n = nodes[node_id];
+    auto s_it = stationIdToName.find(n.station_id);
+    auto l_it = lineIdToName.find(n.line_id);
 
-    return -1;
+    return {
+        s_it == stationIdToName.end() ? std::to_string(n.station_id) : s_it->second,
+        l_it == lineIdToName.end() ? std::to_string(n.line_id) : l_it->second
+    };
 }
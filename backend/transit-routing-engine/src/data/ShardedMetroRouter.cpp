@@ -0,0 +1,256 @@
+#include "ShardedMetroRouter.h"
+
+#include <filesystem>
+#include <functional>
+#include <iostream>
+#include <limits>
+#include <queue>
+#include <stdexcept>
+#include <tuple>
+
+// =======================
+// 构造：只加载目录和连接边
+// =======================
+
+ShardedMetroRouter::ShardedMetroRouter(DBManager& db_, const std::string& shard_dir, size_t memory_budget)
+    : db(db_), shardDir(shard_dir), memoryBudget(memory_budget)
+{
+    std::filesystem::create_directories(shardDir);
+
+    cityNames = db.get_Cities();
+    for (const auto& city : cityNames) {
+        for (const auto& l : db.get_Lines(city)) {
+            lineCity[l.name] = city;
+        }
+    }
+
+    for (const auto& e : db.get_ConnectorEdges()) {
+        connectors[e.from_city][e.from_station_line_id].push_back(
+            { e.to_city, e.to_station_line_id, e.time, e.is_transfer });
+    }
+}
+
+// =======================
+// 对外查询接口
+// =======================
+
+int ShardedMetroRouter::queryTime(const std::string& from_station,
+    const std::string& from_line,
+    const std::string& to_station,
+    const std::string& to_line) const
+{
+    return search(from_station, from_line, to_station, to_line, 0);
+}
+
+int ShardedMetroRouter::queryTimeWithTransferPenalty(const std::string& from_station,
+    const std::string& from_line,
+    const std::string& to_station,
+    const std::string& to_line,
+    int transfer_penalty) const
+{
+    return search(from_station, from_line, to_station, to_line, transfer_penalty);
+}
+
+const std::string& ShardedMetroRouter::cityOfLine(const std::string& line) const
+{
+    auto it = lineCity.find(line);
+    if (it == lineCity.end()) {
+        throw std::runtime_error("Unknown station or line name");
+    }
+    return it->second;
+}
+
+// =======================
+// 跨分片 Dijkstra
+// =======================
+
+int ShardedMetroRouter::search(const std::string& from_station,
+    const std::string& from_line,
+    const std::string& to_station,
+    const std::string& to_line,
+    int transfer_penalty) const
+{
+    const int INF = std::numeric_limits<int>::max();
+
+    // 本次查询用到的分片（slot 下标）及各自的 dist
+    std::vector<ShardPtr> shards;
+    std::vector<std::vector<int>> dist;
+    std::unordered_map<std::string, int> slots;
+
+    auto slotOf = [&](const std::string& city) {
+        auto it = slots.find(city);
+        if (it != slots.end()) return it->second;
+        shards.push_back(acquire(city));
+        dist.emplace_back(shards.back()->nodeCount(), INF);
+        int slot = static_cast<int>(shards.size()) - 1;
+        slots.emplace(city, slot);
+        return slot;
+    };
+
+    const int from_slot = slotOf(cityOfLine(from_line));
+    const int to_slot = slotOf(cityOfLine(to_line));
+    const int start = shards[from_slot]->nodeId(from_station, from_line);
+    const int target = shards[to_slot]->nodeId(to_station, to_line);
+    if (start < 0 || target < 0) {
+        throw std::runtime_error("Station-line combination not found");
+    }
+
+    // 进入未加载城市的连接边先挂起入队，真正出队（确实需要）时才加载该分片
+    std::vector<const Connector*> pending;
+
+    using State = std::tuple<int, int, int>; // (dist, slot, node)，slot < 0 时 node 为 pending 下标
+    std::priority_queue<State, std::vector<State>, std::greater<>> pq;
+
+    dist[from_slot][start] = 0;
+    pq.push({ 0, from_slot, start });
+
+    while (!pq.empty()) {
+        auto [cur_dist, slot, u] = pq.top();
+        pq.pop();
+
+        if (slot < 0) {
+            const Connector& c = *pending[u];
+            slot = slotOf(c.to_city);
+            u = shards[slot]->nodeByStationLineId(c.to_station_line_id);
+            if (u < 0 || cur_dist >= dist[slot][u]) continue;
+            dist[slot][u] = cur_dist;
+        }
+
+        if (slot == to_slot && u == target) {
+            return cur_dist;
+        }
+
+        if (cur_dist > dist[slot][u]) continue;
+
+        const MetroShard& shard = *shards[slot];
+        auto& d = dist[slot];
+        for (auto e = shard.edgesBegin(u); e != shard.edgesEnd(u); ++e) {
+            int nd = cur_dist + e->weight + (e->is_transfer ? transfer_penalty : 0);
+            if (nd < d[e->to]) {
+                d[e->to] = nd;
+                pq.push({ nd, slot, e->to });
+            }
+        }
+
+        auto c_it = connectors.find(shard.city());
+        if (c_it == connectors.end()) continue;
+        auto n_it = c_it->second.find(shard.stationLineId(u));
+        if (n_it == c_it->second.end()) continue;
+
+        for (const auto& c : n_it->second) {
+            int nd = cur_dist + c.weight + (c.is_transfer ? transfer_penalty : 0);
+            auto s_it = slots.find(c.to_city);
+            if (s_it == slots.end()) {
+                pending.push_back(&c);
+                pq.push({ nd, -1, static_cast<int>(pending.size()) - 1 });
+                continue;
+            }
+            int v = shards[s_it->second]->nodeByStationLineId(c.to_station_line_id);
+            if (v >= 0 && nd < dist[s_it->second][v]) {
+                dist[s_it->second][v] = nd;
+                pq.push({ nd, s_it->second, v });
+            }
+        }
+    }
+
+    return -1;
+}
+
+// =======================
+// 分片缓存
+// =======================
+
+std::string ShardedMetroRouter::shardPath(const std::string& city) const
+{
+    return (std::filesystem::path(shardDir) / (city + ".shard")).string();
+}
+
+MetroShard ShardedMetroRouter::loadOrBuild(const std::string& city) const
+{
+    const std::string path = shardPath(city);
+    if (std::filesystem::exists(path)) {
+        try {
+            return MetroShard::load(path);
+        }
+        catch (const std::exception& e) {
+            std::cerr << "Rebuilding shard " << city << ": " << e.what() << std::endl;
+        }
+    }
+
+    MetroShard shard = MetroShard::fromDB(db, city);
+    shard.save(path);
+    return shard;
+}
+
+ShardedMetroRouter::ShardPtr ShardedMetroRouter::acquire(const std::string& city) const
+{
+    std::lock_guard<std::mutex> lock(cacheMutex);
+
+    auto it = resident.find(city);
+    if (it != resident.end()) {
+        lru.splice(lru.begin(), lru, it->second.lru_pos);
+        ShardPtr shard = it->second.shard;
+        // 之前因被查询持有而超出预算的分片，在这里补淘汰
+        evictLocked();
+        return shard;
+    }
+
+    // 加载期间持锁：同一城市不会被并发重复加载（DBManager 也不是线程安全的）
+    auto shard = std::make_shared<const MetroShard>(loadOrBuild(city));
+    const size_t bytes = shard->memoryBytes();
+    lru.push_front(city);
+    resident[city] = { shard, lru.begin(), bytes };
+    residentBytes += bytes;
+    ++loads;
+
+    evictLocked();
+    return shard;
+}
+
+void ShardedMetroRouter::evictLocked() const
+{
+    if (memoryBudget == 0) return;
+
+    // 从最久未使用的开始淘汰；正在被查询持有的分片（含刚加载的）跳过
+    auto pos = lru.end();
+    while (residentBytes > memoryBudget && pos != lru.begin()) {
+        --pos;
+        auto it = resident.find(*pos);
+        if (it->second.shard.use_count() > 1) continue;
+
+        residentBytes -= it->second.bytes;
+        ++evictions;
+        resident.erase(it);
+        pos = lru.erase(pos);
+    }
+}
+
+void ShardedMetroRouter::exportShards()
+{
+    std::lock_guard<std::mutex> lock(cacheMutex);
+    for (const auto& city : cityNames) {
+        MetroShard::fromDB(db, city).save(shardPath(city));
+    }
+
+    // 已持有旧分片的查询不受影响，之后的查询读取新文件
+    resident.clear();
+    lru.clear();
+    residentBytes = 0;
+}
+
+std::vector<std::string> ShardedMetroRouter::cities() const
+{
+    return cityNames;
+}
+
+std::vector<std::string> ShardedMetroRouter::loadedCities() const
+{
+    std::lock_guard<std::mutex> lock(cacheMutex);
+    return { lru.begin(), lru.end() };
+}
+
+ShardedMetroRouter::Stats ShardedMetroRouter::stats() const
+{
+    std::lock_guard<std::mutex> lock(cacheMutex);
+    return { resident.size(), residentBytes, loads, evictions };
+}
@@ -1,14 +1,81 @@
-from pydantic import BaseModel
-from typing import List, Optional
-
-
-class AskData(BaseModel):
-    date: str
-    departure: str
-    destination: str
-    highSpeed: bool
-    studentTicket: bool
-    askTime: int = None
-    strictmode: bool = False
-
-
+from pydantic import BaseModel, field_validator, model_validator
+from typing import List, Optional
+from datetime import datetime, timedelta
+from crawler.poll_interval import interval_bounds
+
+
+def check_adaptive_bounds(item):
+    # 在请求阶段校验，否则要等爬虫线程里 AdaptiveInterval 报错，而 SSE 已经返回 200
+    if item.adaptive and item.askTime is not None:
+        interval_bounds(item.askTime, item.minAskTime, item.maxAskTime)
+    return item
+
+
+class AskData(BaseModel):
+    date: str
+    departure: str
+    destination: str
+    highSpeed: bool
+    studentTicket: bool
+    askTime: int = None
+    strictmode: bool = False
+    adaptive: bool = False
+    minAskTime: Optional[int] = None
+    maxAskTime: Optional[int] = None
+
+    @model_validator(mode="after")
+    def check_adaptive(self):
+        return check_adaptive_bounds(self)
+
+
+class AskRangeData(BaseModel):
+    startDate: str
+    endDate: str
+    departure: str
+    destination: str
+    highSpeed: bool
+    studentTicket: bool
+    askTime: int = None
+    strictmode: bool = False
+    adaptive: bool = False
+    minAskTime: Optional[int] = None
+    maxAskTime: Optional[int] = None
+
+    @model_validator(mode="after")
+    def check_adaptive(self):
+        return check_adaptive_bounds(self)
+
+    def dates(self, max_days: int = 14) -> List[str]:
+        start = datetime.strptime(self.startDate, "%Y-%m-%d").date()
+        end = datetime.strptime(self.endDate, "%Y-%m-%d").date()
+        if end < start:
+            raise ValueError("endDate must not be earlier than startDate")
+        days = (end - start).days + 1
+        if days > max_days:
+            raise ValueError(f"Date range too long: {days} days (max {max_days})")
+        return [(start + timedelta(days=i)).isoformat() for i in range(days)]
+
+
+class AlertRuleData(BaseModel):
+    date: str
+    departure: str
+    destination: str
+    highSpeed: bool = False
+    studentTicket: bool = False
+    askTime: int = 10
+    strictmode: bool = False
+    trainPrefix: str = ""
+    departAfter: Optional[str] = None
+    departBefore: Optional[str] = None
+    seatClasses: List[str] = []
+
+    @field_validator("departAfter", "departBefore")
+    @classmethod
+    def normalize_time(cls, value):
+        # 规则按字符串与 CSV 中的 "HH:MM" 比较，"9:00" 需补齐为 "09:00"
+        if value is None or not value.strip():
+            return None
+        try:
+            return datetime.strptime(value.strip(), "%H:%M").strftime("%H:%M")
+        except ValueError:
+            raise ValueError(f"Invalid time {value!r}, expected HH:MM")
@@ -0,0 +1,129 @@
+import atexit
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+# 通过环境变量调整，无需改代码
+LOG_LEVEL = os.environ.get("TRANSIT_LOG_LEVEL", "INFO").upper()
+# DEBUG 日志的采样比例
+DEBUG_SAMPLE_RATE = float(os.environ.get("TRANSIT_LOG_DEBUG_SAMPLE", "0.1"))
+# 每条路线每个窗口内最多输出的 INFO/DEBUG 条数
+ROUTE_RATE_LIMIT = int(os.environ.get("TRANSIT_LOG_ROUTE_RATE", "20"))
+ROUTE_RATE_WINDOW = float(os.environ.get("TRANSIT_LOG_ROUTE_WINDOW", "60"))
+QUEUE_SIZE = 10000
+
+
+class RouteRateLimitFilter(logging.Filter):
+    """Caps INFO/DEBUG records per route (record.route) per time window; warnings always pass."""
+
+    def __init__(self, limit=ROUTE_RATE_LIMIT, window=ROUTE_RATE_WINDOW):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self.lock = threading.Lock()
+        self.windows = {}
+
+    def filter(self, record):
+        route = getattr(record, "route", None)
+        if route is None or record.levelno >= logging.WARNING:
+            return True
+        now = time.monotonic()
+        with self.lock:
+            start, count = self.windows.get(route, (now, 0))
+            if now - start >= self.window:
+                start, count = now, 0
+            self.windows[route] = (start, count + 1)
+        return count < self.limit
+
+
+class DebugSamplingFilter(logging.Filter):
+    def __init__(self, rate=DEBUG_SAMPLE_RATE):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the background writer without ever blocking the caller.
+
+    Only the cheap %-merge happens on the calling thread; formatting and I/O
+    run on the listener thread. When the queue is full the record is dropped.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_setup_lock = threading.Lock()
+_listener = None
+_handler = None
+
+
+def setup_logging(stream=None, level=LOG_LEVEL):
+    """Install the queue-backed handler on the "transit" logger (idempotent)."""
+    global _listener, _handler
+    with _setup_lock:
+        root = logging.getLogger("transit")
+        if _listener is not None:
+            return root
+
+        output = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s"))
+
+        log_queue = queue.Queue(QUEUE_SIZE)
+        _handler = NonBlockingQueueHandler(log_queue)
+        _handler.addFilter(DebugSamplingFilter())
+        _handler.addFilter(RouteRateLimitFilter())
+
+        root.setLevel(level)
+        root.addHandler(_handler)
+        root.propagate = False
+
+        _listener = QueueListener(log_queue, output)
+        _listener.start()
+        atexit.register(shutdown_logging)
+        return root
+
+
+def shutdown_logging():
+    """Flush pending records and stop the writer thread."""
+    global _listener, _handler
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            logging.getLogger("transit").removeHandler(_handler)
+            _listener = None
+            _handler = None
+
+
+def get_logger(name):
+    setup_logging()
+    return logging.getLogger(f"transit.{name}")
+
+
+def route_extra(*route):
+    """`extra=` for per-route rate limiting: logger.info(..., extra=route_extra(a, b, date))."""
+    return {"route": route}
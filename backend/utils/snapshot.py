@@ -0,0 +1,296 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from email.utils import formatdate
+
+try:
+    import fcntl
+except ImportError:  # Windows 没有 fcntl，此时每条路线只能有一个写入进程
+    fcntl = None
+
+
+class RouteSnapshot:
+    """
+    Latest poll result of one route; immutable once published.
+
+    Snapshots read back from a SharedSnapshotStore carry only the serialized
+    body (rows is None); records() decodes it on first use.
+    """
+    __slots__ = ("route", "seq", "generation", "updated_at", "interval", "rows", "_body", "_records")
+
+    def __init__(self, route, seq, generation, updated_at, interval, rows, body=None):
+        self.route = route
+        self.seq = seq
+        self.generation = generation
+        self.updated_at = updated_at
+        self.interval = interval
+        self.rows = rows
+        self._body = body
+        self._records = None
+
+    @property
+    def etag(self):
+        # generation 区分爬虫重启后重新从 1 开始的 count
+        return f'"{self.generation}-{self.seq}"'
+
+    @property
+    def last_modified(self):
+        return formatdate(self.updated_at, usegmt=True)
+
+    @property
+    def no_data(self):
+        """True for the __NO_DATA__ marker poll (query finished, no trains)."""
+        return len(self.records()) == 1 and self.records()[0].get("train_code") == "__NO_DATA__"
+
+    def records(self):
+        """Rows as JSON-ready dicts (empty strings -> None)."""
+        if self._records is None:
+            if self.rows is not None:
+                self._records = [
+                    {key: (None if value == "" else value) for key, value in row.items()}
+                    for row in self.rows
+                ]
+            else:
+                payload = json.loads(self._body)
+                self._records = payload.get("data") or [{"count": self.seq, "train_code": "__NO_DATA__"}]
+        return self._records
+
+    def body(self):
+        """Serialized JSON body, built once per snapshot and shared by every reader."""
+        if self._body is None:
+            departure, destination, date = self.route
+            payload = {
+                "departure": departure,
+                "destination": destination,
+                "date": date,
+                "seq": self.seq,
+                "updated_at": self.updated_at,
+            }
+            if self.no_data:
+                payload["__NO_DATA__"] = True
+            else:
+                payload["data"] = self.records()
+            self._body = json.dumps(payload, ensure_ascii=False)
+        return self._body
+
+
+class SnapshotStore:
+    """Process-local map of route -> latest RouteSnapshot, written by crawler threads."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self.snapshots = {}
+
+    def publish(self, route, seq, rows, interval):
+        with self.lock:
+            previous = self.snapshots.get(route)
+            if previous is None or seq <= previous.seq:
+                generation = int(time.time() * 1000)
+            else:
+                generation = previous.generation
+            snapshot = RouteSnapshot(route, seq, generation, time.time(), interval, list(rows))
+            self.snapshots[route] = snapshot
+            self.changed.notify_all()
+        return snapshot
+
+    def get(self, route):
+        return self.snapshots.get(route)
+
+    def reset(self, route):
+        """Forget the route's snapshot (its crawler restarts from count 1 on a fresh CSV)."""
+        with self.lock:
+            self.snapshots.pop(route, None)
+
+    def wait(self, route, seq, timeout):
+        """Block until the route has a snapshot with seq >= `seq` (or timeout); True if it does."""
+        with self.changed:
+            return self.changed.wait_for(lambda: self._reached(route, seq), timeout)
+
+    def _reached(self, route, seq):
+        snapshot = self.snapshots.get(route)
+        return snapshot is not None and snapshot.seq >= seq
+
+
+# 共享快照文件头：magic, 格式版本, 写入计数(seqlock，奇数表示正在写), seq, generation,
+# updated_at, interval, body 长度；body 紧随其后
+HEADER = struct.Struct("<4sIQQQddQ")
+MAGIC = b"TSNP"
+FORMAT_VERSION = 1
+COUNTER_OFFSET = 8
+SEQ = struct.Struct("<QQ")  # (写入计数, seq)
+PAGE = mmap.PAGESIZE
+# 超过该秒数无人读取的路线：关闭映射（及其文件描述符）并丢弃缓存的快照
+IDLE_CLOSE = 300
+
+
+class SharedSnapshotStore:
+    """
+    Route snapshots in mmap'd files shared by every worker process on a host.
+
+    The crawler serializes each poll once into <directory>/<route hash>.snap
+    behind a seqlock header; other workers map the same file, so the body
+    lives once in the page cache instead of once per worker. Readers check
+    the 16-byte counter/seq word on every tick and only copy and decode the
+    body when the write counter moved; until then get() returns the cached
+    snapshot. Mappings and cached snapshots of routes nobody read for
+    IDLE_CLOSE seconds, or that were reset, are dropped. Point `directory`
+    at tmpfs (/dev/shm) to keep it off disk.
+    """
+
+    def __init__(self, directory, poll_interval=0.1):
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self.lock = threading.Lock()
+        self.maps = {}  # route -> mmap（只读映射，按需打开）
+        self.cache = {}  # route -> (写入计数, RouteSnapshot)，计数不变时直接复用
+        self.used = {}  # route -> 最近一次读取的 monotonic 时间
+        self.swept = time.monotonic()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, route):
+        digest = hashlib.sha1("\0".join(route).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.snap")
+
+    def publish(self, route, seq, rows, interval):
+        local = RouteSnapshot(route, seq, 0, time.time(), interval, list(rows))
+        body = local.body().encode("utf-8")
+
+        with open(self.path(route), "a+b") as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            size = os.fstat(f.fileno()).st_size
+            needed = HEADER.size + len(body)
+            if size < needed:
+                # 只增不减：读者的旧映射不会越界，发现 body 变长时自行重新映射
+                size = max(needed, 2 * size, PAGE)
+                size = (size + PAGE - 1) // PAGE * PAGE
+                f.truncate(size)
+
+            with mmap.mmap(f.fileno(), size) as mm:
+                magic, version, counter, previous_seq, generation = HEADER.unpack_from(mm)[:5]
+                if magic != MAGIC or version != FORMAT_VERSION:
+                    counter, previous_seq, generation = 0, 0, 0
+                # 上一个写入者中途崩溃会留下奇数计数，先补齐为偶数，否则本次写完后仍是奇数
+                counter += counter % 2
+                if generation == 0 or seq <= previous_seq:
+                    generation = int(time.time() * 1000)
+
+                # seqlock：计数置为奇数 -> 写 body 和字段 -> 置为偶数
+                struct.pack_into("<Q", mm, COUNTER_OFFSET, counter + 1)
+                mm[HEADER.size:needed] = body
+                HEADER.pack_into(mm, 0, MAGIC, FORMAT_VERSION, counter + 1, seq, generation,
+                                 local.updated_at, interval, len(body))
+                struct.pack_into("<Q", mm, COUNTER_OFFSET, counter + 2)
+
+        local.generation = generation
+        return local
+
+    def reset(self, route):
+        """Mark the route empty (seq 0) in place; other workers keep their mapping."""
+        try:
+            with open(self.path(route), "r+b") as f:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                with mmap.mmap(f.fileno(), 0) as mm:
+                    counter = struct.unpack_from("<Q", mm, COUNTER_OFFSET)[0]
+                    counter += counter % 2
+                    struct.pack_into("<Q", mm, COUNTER_OFFSET, counter + 1)
+                    HEADER.pack_into(mm, 0, MAGIC, FORMAT_VERSION, counter + 1, 0, 0, 0.0, 0.0, 0)
+                    struct.pack_into("<Q", mm, COUNTER_OFFSET, counter + 2)
+        except (FileNotFoundError, ValueError):
+            pass
+        with self.lock:
+            self._forget(route)
+
+    def _forget(self, route):
+        """Close this process's mapping of the route and drop its cached snapshot (lock held)."""
+        mm = self.maps.pop(route, None)
+        if mm is not None:
+            mm.close()
+        self.cache.pop(route, None)
+        self.used.pop(route, None)
+
+    def _map(self, route, min_size=0):
+        """Read-only mapping of the route's file, remapped when the writer grew it."""
+        with self.lock:
+            now = time.monotonic()
+            if now - self.swept > IDLE_CLOSE / 10:
+                self.swept = now
+                for idle in [r for r, used in self.used.items() if now - used > IDLE_CLOSE]:
+                    self._forget(idle)
+            self.used[route] = now
+            mm = self.maps.get(route)
+            if mm is not None and len(mm) >= min_size:
+                return mm
+            try:
+                with open(self.path(route), "rb") as f:
+                    size = os.fstat(f.fileno()).st_size
+                    if size < HEADER.size:
+                        return None
+                    mm = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+            except FileNotFoundError:
+                return None
+            if route in self.maps:
+                self.maps[route].close()
+            self.maps[route] = mm
+            return mm
+
+    def _head(self, route):
+        """(write counter, seq) of a route, or None; no copy of the body."""
+        mm = self._map(route)
+        return SEQ.unpack_from(mm, COUNTER_OFFSET) if mm is not None else None
+
+    def get(self, route):
+        mm = self._map(route)
+        for _ in range(1000):
+            if mm is None:
+                return None
+            counter = struct.unpack_from("<Q", mm, COUNTER_OFFSET)[0]
+            if counter == 0:
+                return None
+            if counter % 2:
+                time.sleep(0)  # 写入中，让出 CPU 后重试
+                continue
+            cached = self.cache.get(route)
+            if cached is not None and cached[0] == counter:
+                return cached[1]
+
+            magic, version, _, seq, generation, updated_at, interval, length = HEADER.unpack_from(mm)
+            if magic != MAGIC or version != FORMAT_VERSION or seq == 0:
+                return None
+            if HEADER.size + length > len(mm):
+                mm = self._map(route, HEADER.size + length)
+                continue
+            body = mm[HEADER.size:HEADER.size + length]
+            if struct.unpack_from("<Q", mm, COUNTER_OFFSET)[0] == counter:
+                snapshot = RouteSnapshot(route, seq, generation, updated_at, interval, None, body.decode("utf-8"))
+                self.cache[route] = (counter, snapshot)
+                return snapshot
+        return None
+
+    def wait(self, route, seq, timeout):
+        """Poll the shared header until seq >= `seq` or timeout; True if reached. Never copies the body."""
+        deadline = time.monotonic() + timeout
+        while True:
+            head = self._head(route)
+            if head is not None and head[1] >= seq and head[0] % 2 == 0:
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(self.poll_interval, remaining))
+
+
+def create_store():
+    """SharedSnapshotStore when TRANSIT_SNAPSHOT_DIR is set (multi-worker deployments), else in-process."""
+    directory = os.environ.get("TRANSIT_SNAPSHOT_DIR")
+    return SharedSnapshotStore(directory) if directory else SnapshotStore()
+
+
+# Global instance
+snapshot_store = create_store()
@@ -0,0 +1,79 @@
+import base64
+import json
+import zlib
+
+try:
+    import msgpack
+except ImportError:  # 可选依赖，仅 encoding=msgpack 时需要
+    msgpack = None
+
+ENCODINGS = ("json", "columns", "msgpack")
+
+
+class SSEEncoder:
+    """
+    Per-stream SSE frame encoder.
+
+    json    - today's default, one JSON object per row
+    columns - header-once schema event, then rows as JSON arrays
+    msgpack - header-once schema event, then base64 MessagePack arrays
+    """
+
+    def __init__(self, encoding="json", columns=None):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown encoding: {encoding}")
+        if encoding == "msgpack" and msgpack is None:
+            raise ValueError("msgpack encoding requested but msgpack is not installed")
+        self.encoding = encoding
+        self.columns = list(columns or [])
+        self.schema_sent = False
+
+    def _data(self, payload):
+        if self.encoding == "msgpack":
+            packed = base64.b64encode(msgpack.packb(payload, use_bin_type=True)).decode("ascii")
+            return f"data: {packed}\n\n"
+        return f"data: {json.dumps(payload, ensure_ascii=False, separators=self._separators())}\n\n"
+
+    def _separators(self):
+        # 紧凑模式顺便去掉 JSON 里的多余空格
+        return (",", ":") if self.encoding != "json" else None
+
+    def schema(self):
+        """Emit the column schema once per stream (compact modes only)."""
+        if self.encoding == "json" or self.schema_sent:
+            return ""
+        self.schema_sent = True
+        return f"event: schema\ndata: {json.dumps(self.columns, ensure_ascii=False)}\n\n"
+
+    def event(self, name, payload):
+        """Named event with a JSON body; default `message` listeners ignore it."""
+        return f"event: {name}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+    def table(self, records):
+        """Rows as dicts (json) or as arrays ordered by the schema (compact modes)."""
+        if self.encoding == "json":
+            return records
+        return [[row.get(col) for col in self.columns] for row in records]
+
+    def rows(self, records):
+        return self.message(self.table(records))
+
+    def message(self, payload):
+        return self.schema() + self._data(payload)
+
+
+def gzip_stream(frames):
+    """Gzip a frame generator, flushing at every frame boundary so the stream stays live."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for frame in frames:
+        chunk = compressor.compress(frame.encode("utf-8")) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if chunk:
+            yield chunk
+    yield compressor.flush(zlib.Z_FINISH)
+
+
+def negotiate(args, headers):
+    """Return (encoding, use_gzip) for a stream request."""
+    encoding = args.get("encoding", "json")
+    use_gzip = args.get("compress") == "gzip" and "gzip" in headers.get("Accept-Encoding", "")
+    return encoding, use_gzip